@@ -0,0 +1,164 @@
+import os
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# BATCHING CONFIGURATION
+# ============================================================
+# Concurrent /analyze calls are gathered into one forward pass per model.
+# A batch is dispatched as soon as it is full or the oldest request has
+# waited MAX_WAIT_MS, whichever comes first.
+BATCHING_ENABLED = os.getenv("CLEARIFY_BATCHING", "1") == "1"
+MAX_BATCH_SIZE = int(os.getenv("CLEARIFY_BATCH_MAX_SIZE", "16"))
+MAX_WAIT_MS = float(os.getenv("CLEARIFY_BATCH_MAX_WAIT_MS", "5"))
+
+# Requests whose token lengths fall in the same bucket are padded together,
+# so one long article does not force short texts to be padded to 512.
+BUCKET_WIDTH = int(os.getenv("CLEARIFY_BATCH_BUCKET_WIDTH", "64"))
+
+
+# ============================================================
+# MICRO-BATCHER
+# ============================================================
+class MicroBatcher:
+    """Collects single-item requests from many threads into model batches.
+
+    `run_batch` receives a list of items that share a length bucket and must
+    return one result per item, in the same order; a batch that returns
+    any other number of results fails every caller in it. An item may stand
+    for several sequences (e.g. all windows of one article); `size` counts
+    them towards the batch limit so every window of a document stays in one
+    pass, and no batch goes over the limit unless one item alone does.
+    """
+
+    def __init__(self, name, run_batch, max_batch_size=MAX_BATCH_SIZE,
+                 max_wait_ms=MAX_WAIT_MS, bucket_width=BUCKET_WIDTH):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.bucket_width = max(1, bucket_width)
+        self._queue = queue.Queue()
+        # An entry taken off the queue that did not fit the last batch; it
+        # opens the next one.
+        self._held = None
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+
+    def submit(self, item, length: int, size: int = 1):
+        """Queue one item and block until its result is ready."""
+        if not BATCHING_ENABLED:
+            return self.run_batch([item])[0]
+
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, length, future, size))
+        return future.result()
+
+    def submit_many(self, items, lengths, sizes=None):
+        """Queue many items at once (e.g. a bulk request) and wait for all."""
+        sizes = sizes or [1] * len(items)
+        if not BATCHING_ENABLED:
+            return self._run_direct(items, lengths, sizes)
+
+        self._ensure_worker()
+        futures = []
+        for item, length, size in zip(items, lengths, sizes):
+            future = Future()
+            self._queue.put((item, length, future, size))
+            futures.append(future)
+        return [future.result() for future in futures]
+
+    def _run_direct(self, items, lengths, sizes):
+        # Same length-sorted, size-capped batches as the dispatcher, run on
+        # the calling thread.
+        order = sorted(range(len(items)), key=lambda i: lengths[i])
+        results = [None] * len(items)
+        batch, total = [], 0
+        for i in order + [None]:
+            if i is None or (batch and total + sizes[i] > self.max_batch_size):
+                for j, result in zip(batch, self._run([items[j] for j in batch])):
+                    results[j] = result
+                batch, total = [], 0
+            if i is not None:
+                batch.append(i)
+                total += sizes[i]
+        return results
+
+    def _ensure_worker(self):
+        # Started lazily so gunicorn workers forked after import each get
+        # their own dispatcher thread.
+        pid = os.getpid()
+        if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker_pid == pid and self._worker.is_alive():
+                return
+            if self._worker_pid != pid:
+                # Entries queued before a fork belong to the parent's callers.
+                # A dead dispatcher in this process is simply replaced, so
+                # what its callers queued is still served.
+                self._queue = queue.Queue()
+                self._held = None
+            self._worker = threading.Thread(
+                target=self._loop, name=f"batcher-{self.name}", daemon=True
+            )
+            self._worker_pid = pid
+            self._worker.start()
+
+    def _run(self, items):
+        results = list(self.run_batch(items))
+        if len(results) != len(items):
+            # Results are matched to items by position, so none can be trusted.
+            raise RuntimeError(f"run_batch returned {len(results)} results for {len(items)} items")
+        return results
+
+    def _collect(self):
+        if self._held is not None:
+            pending, self._held = [self._held], None
+        else:
+            pending = [self._queue.get()]
+        total = pending[0][3]
+        deadline = time.monotonic() + self.max_wait
+        while total < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                entry = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if total + entry[3] > self.max_batch_size:
+                self._held = entry
+                break
+            pending.append(entry)
+            total += entry[3]
+        return pending
+
+    def _buckets(self, pending):
+        buckets = {}
+        for entry in pending:
+            key = entry[1] // self.bucket_width
+            buckets.setdefault(key, []).append(entry)
+        return [buckets[key] for key in sorted(buckets)]
+
+    def _loop(self):
+        while True:
+            pending = self._collect()
+            for bucket in self._buckets(pending):
+                items = [entry[0] for entry in bucket]
+                try:
+                    results = self._run(items)
+                except Exception as e:
+                    logger.exception("Batch for %s failed: %s", self.name, e)
+                    for entry in bucket:
+                        entry[2].set_exception(e)
+                    continue
+                for entry, result in zip(bucket, results):
+                    entry[2].set_result(result)
@@ -0,0 +1,119 @@
+import sys
+import json
+import time
+import logging
+import argparse
+
+from cascade import CASCADE_STAGES, DECIDED_BY_CHEAP, CascadeStage, split_decision, split_examples, train
+from evaluate import resolve_model_source
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CASCADE BENCHMARK
+# ============================================================
+# Trains the cheap models on the training part of the bundled datasets and
+# runs the held-out part through the full transformer and through the
+# cascade at each threshold, reporting skip rate, speedup and agreement:
+#
+#   python benchmark_cascade.py --thresholds 0.8 0.9 0.95 --output cascade_report.json
+#
+# As in evaluate.py, tiny random transformers stand in when the real
+# artifacts are unavailable (--models tiny forces this); agreement with
+# them is meaningless.
+STAGE_MODELS = {"fake_news": "fake_news", "social": "sbic"}
+
+
+def _full_analyzer(stage: str):
+    import ml_analysis
+    if stage == "fake_news":
+        return ml_analysis.analyze_fake_news_batch
+    return ml_analysis.analyze_social_bias_batch
+
+
+def _label(stage: str, value) -> str:
+    if stage == "fake_news":
+        return "fake" if value >= 50 else "real"
+    return value["bias_category"]
+
+
+def _timed(analyzer, texts, batch_size: int):
+    results, started = [], time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        results.extend(analyzer(texts[start:start + batch_size]))
+    return results, time.perf_counter() - started
+
+
+def _accuracy(gold, predicted):
+    return round(sum(g == p for g, p in zip(gold, predicted)) / len(gold), 4) if gold else None
+
+
+def benchmark_stage(stage: str, thresholds, batch_size: int, limit: int = None) -> dict:
+    train_set, holdout = split_examples(stage)
+    holdout = holdout[:limit] if limit else holdout
+    cheap = train(stage, train_set)
+    texts = [text for text, _ in holdout]
+    gold = [label for _, label in holdout]
+
+    full_analyzer = _full_analyzer(stage)
+    full_analyzer(texts[:1])  # warm-up outside the timings
+    full_results, full_seconds = _timed(full_analyzer, texts, batch_size)
+    full_labels = [_label(stage, value) for value in full_results]
+    _, cheap_seconds = _timed(cheap.predict, texts, batch_size)
+
+    report = {
+        "stage": stage,
+        "train_documents": len(train_set),
+        "holdout_documents": len(texts),
+        "cheap_model": cheap.version,
+        "full_seconds": round(full_seconds, 3),
+        "cheap_seconds": round(cheap_seconds, 3),
+        "full_accuracy": _accuracy(gold, full_labels),
+        "thresholds": [],
+    }
+    for min_confidence in thresholds:
+        cascade = CascadeStage(stage, full_analyzer, min_confidence, cheap)
+        decisions, cascade_seconds = _timed(cascade, texts, batch_size)
+        values, deciders = zip(*(split_decision(result) for result in decisions)) if decisions else ((), ())
+        labels = [_label(stage, value) for value in values]
+        skipped = [i for i, decider in enumerate(deciders) if decider == DECIDED_BY_CHEAP]
+        report["thresholds"].append({
+            "threshold": min_confidence,
+            "skip_rate": round(len(skipped) / len(texts), 4) if texts else None,
+            "cascade_seconds": round(cascade_seconds, 3),
+            "speedup": round(full_seconds / cascade_seconds, 2) if cascade_seconds > 0 else None,
+            # How often the cheap answer matches the transformer where it replaced it.
+            "agreement_on_skipped": _accuracy([full_labels[i] for i in skipped], [labels[i] for i in skipped]),
+            "agreement_overall": _accuracy(full_labels, labels),
+            "cascade_accuracy": _accuracy(gold, labels),
+        })
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cheap-model cascade against the full transformers.")
+    parser.add_argument("--stages", nargs="+", choices=list(CASCADE_STAGES), default=list(CASCADE_STAGES))
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[0.8, 0.9, 0.95])
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--limit", type=int, default=None, help="max held-out documents per stage")
+    parser.add_argument("--models", choices=["auto", "real", "tiny"], default="auto")
+    parser.add_argument("--output", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    source = resolve_model_source(args.models, [STAGE_MODELS[stage] for stage in args.stages])
+    report = {
+        "models": source,
+        "batch_size": args.batch_size,
+        "stages": [benchmark_stage(stage, args.thresholds, args.batch_size, args.limit) for stage in args.stages],
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import os
+import re
+import sys
+import glob
+import json
+import time
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from extractor import MIN_FAST_CHARS, extract_fast, extract_newspaper
+
+# ============================================================
+# EXTRACTION BENCHMARK
+# ============================================================
+# Runs the lxml fast path and newspaper3k over saved HTML pages and reports
+# per-page time and how much of newspaper's text the fast path recovers:
+#
+#   python benchmark_extraction.py
+#   python benchmark_extraction.py --fixtures pages/ --fetch https://... https://...
+#
+# By default it runs over the committed pages in tests/fixtures/extraction,
+# so results are comparable between runs and machines.
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tests", "fixtures", "extraction")
+_TOKEN = re.compile(r"\w+")
+
+
+def _tokens(text: str) -> Counter:
+    return Counter(_TOKEN.findall(text.lower()))
+
+
+def text_overlap(candidate: str, reference: str) -> float:
+    """Token-level F1 between two extractions (1.0 means the same bag of words)."""
+    cand, ref = _tokens(candidate), _tokens(reference)
+    common = sum((cand & ref).values())
+    if not common:
+        return 1.0 if not cand and not ref else 0.0
+    precision = common / sum(cand.values())
+    recall = common / sum(ref.values())
+    return 2 * precision * recall / (precision + recall)
+
+
+def _timed(fn, *args, repeat: int = 1):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+
+def save_fixtures(urls, directory: str):
+    from fetcher import Fetcher
+
+    os.makedirs(directory, exist_ok=True)
+    fetcher = Fetcher(cache_dir="")
+    for i, url in enumerate(urls):
+        html = fetcher.fetch(url).html
+        with open(os.path.join(directory, f"page_{i:03d}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
+
+
+def benchmark(paths, repeat: int = 3) -> dict:
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        fast_text, fast_ms = _timed(extract_fast, html, repeat=repeat)
+        try:
+            newspaper_text, newspaper_ms = _timed(extract_newspaper, html, repeat=repeat)
+        except Exception as e:
+            pages.append({"file": os.path.basename(path), "error": str(e)})
+            continue
+        pages.append({
+            "file": os.path.basename(path),
+            "fast_ms": round(fast_ms, 2),
+            "newspaper_ms": round(newspaper_ms, 2),
+            "fast_chars": len(fast_text),
+            "newspaper_chars": len(newspaper_text),
+            "overlap_f1": round(text_overlap(fast_text, newspaper_text), 4),
+            "would_fall_back": len(fast_text) < MIN_FAST_CHARS,
+        })
+
+    measured = [page for page in pages if "error" not in page]
+    fast_ms = np.asarray([page["fast_ms"] for page in measured])
+    newspaper_ms = np.asarray([page["newspaper_ms"] for page in measured])
+    summary = {"pages": len(pages), "errors": len(pages) - len(measured)}
+    if measured:
+        summary.update({
+            "fast_ms_p50": round(float(np.percentile(fast_ms, 50)), 2),
+            "newspaper_ms_p50": round(float(np.percentile(newspaper_ms, 50)), 2),
+            "speedup_total": round(float(newspaper_ms.sum() / max(fast_ms.sum(), 1e-9)), 2),
+            "overlap_f1_mean": round(float(np.mean([page["overlap_f1"] for page in measured])), 4),
+            "fallbacks": sum(page["would_fall_back"] for page in measured),
+        })
+    return {"summary": summary, "pages": pages}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare lxml fast extraction with newspaper3k.")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="directory of saved *.html pages")
+    parser.add_argument("--fetch", nargs="*", default=[], help="download these URLs into --fixtures first")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs per page (best is kept)")
+    parser.add_argument("--output", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.fetch:
+        save_fixtures(args.fetch, args.fixtures)
+    paths = sorted(glob.glob(os.path.join(args.fixtures, "*.html")))
+    if not paths:
+        print(f"No *.html fixtures found in {args.fixtures}", file=sys.stderr)
+        return 1
+
+    report = benchmark(paths, repeat=args.repeat)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
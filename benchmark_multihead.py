@@ -0,0 +1,131 @@
+import sys
+import json
+import time
+import logging
+import argparse
+
+import numpy as np
+
+from cascade import split_examples
+from multihead import HEADS, MULTIHEAD_DIR
+from evaluate import resolve_model_source
+from result_cache import fingerprint_directory
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# MULTI-HEAD AGREEMENT REPORT
+# ============================================================
+# Runs the held-out part of the bundled fake-news and SBIC sets through the
+# four separate classifiers and through the multi-head model, and reports
+# per head how often their labels agree, how far their probabilities are
+# apart, and, where the dataset has gold labels, the accuracy delta; plus
+# the time each side takes:
+#
+#   python benchmark_multihead.py --model-dir /tmp/huggingface_models/multihead --output multihead_report.json
+#
+# Distill with the same --models setting (distill_multihead.py) so teachers
+# and student come from the same artifacts.
+
+# Head -> cascade stage whose holdout has gold labels for it.
+GOLD_STAGES = {"fake_news": "fake_news", "sbic": "social"}
+
+
+def _label(name: str, probs) -> str:
+    import ml_analysis
+    index = int(np.argmax(probs))
+    if name == "fake_news":
+        return "fake" if index == 1 else "real"
+    if name == "sbic":
+        return ml_analysis.sbic_label_map[index]
+    return str(index)
+
+
+def _timed(run, texts, batch_size: int):
+    results, started = [], time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        results.extend(run(texts[start:start + batch_size]))
+    return results, time.perf_counter() - started
+
+
+def _accuracy(gold, predicted):
+    return round(sum(g == p for g, p in zip(gold, predicted)) / len(gold), 4) if gold else None
+
+
+def run(model_dir: str, batch_size: int, limit: int = None) -> dict:
+    import ml_analysis
+
+    texts, gold_spans = [], {}
+    for stage in sorted(set(GOLD_STAGES.values())):
+        holdout = split_examples(stage)[1][:limit]
+        gold_spans[stage] = (len(texts), [label for _, label in holdout])
+        texts.extend(text for text, _ in holdout)
+
+    ml_analysis.load_models(HEADS, use_multihead=False)
+    ml_analysis.load_multihead(model_dir)
+    # Warm-up outside the timings.
+    for name in HEADS:
+        ml_analysis.predict_probs_batch(name, texts[:1])
+    ml_analysis.multihead_probs_batch(texts[:1])
+
+    teacher, teacher_seconds = {}, 0.0
+    for name in HEADS:
+        teacher[name], seconds = _timed(lambda batch: ml_analysis.predict_probs_batch(name, batch), texts, batch_size)
+        teacher_seconds += seconds
+    # Plain strings, so nothing is memoized between batches or with the teachers.
+    student, student_seconds = _timed(ml_analysis.multihead_probs_batch, [str(text) for text in texts], batch_size)
+
+    heads = []
+    for name in HEADS:
+        teacher_probs = np.asarray(teacher[name])
+        student_probs = np.asarray([probs[name] for probs in student])
+        teacher_labels = [_label(name, probs) for probs in teacher_probs]
+        student_labels = [_label(name, probs) for probs in student_probs]
+        head = {
+            "head": name,
+            "label_agreement": _accuracy(teacher_labels, student_labels),
+            # Half the L1 distance: the largest probability any label gains or loses.
+            "mean_total_variation": round(float(0.5 * np.abs(teacher_probs - student_probs).sum(axis=1).mean()), 4),
+        }
+        if name in GOLD_STAGES:
+            start, gold = gold_spans[GOLD_STAGES[name]]
+            head["teacher_accuracy"] = _accuracy(gold, teacher_labels[start:start + len(gold)])
+            head["student_accuracy"] = _accuracy(gold, student_labels[start:start + len(gold)])
+            if head["teacher_accuracy"] is not None:
+                head["accuracy_delta"] = round(head["student_accuracy"] - head["teacher_accuracy"], 4)
+        heads.append(head)
+
+    return {
+        "documents": len(texts),
+        "teacher_versions": {name: ml_analysis.MODEL_VERSIONS[name] for name in HEADS},
+        "student_version": fingerprint_directory(model_dir),
+        "encoder_passes_per_document": {"separate": len(HEADS), "multihead": 1},
+        "teacher_seconds": round(teacher_seconds, 3),
+        "student_seconds": round(student_seconds, 3),
+        "speedup": round(teacher_seconds / student_seconds, 2) if student_seconds > 0 else None,
+        "heads": heads,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the multi-head model with the separate classifiers.")
+    parser.add_argument("--model-dir", default=MULTIHEAD_DIR)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--limit", type=int, default=None, help="max held-out documents per dataset")
+    parser.add_argument("--models", choices=["auto", "real", "tiny"], default="auto")
+    parser.add_argument("--output", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    report = {"models": resolve_model_source(args.models, list(HEADS)), "batch_size": args.batch_size}
+    report.update(run(args.model_dir, args.batch_size, args.limit))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
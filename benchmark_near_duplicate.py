@@ -0,0 +1,138 @@
+import sys
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+
+from datasets_io import iter_fake_news
+from result_cache import text_digest
+from near_duplicate import SIMILARITY_THRESHOLD, NearDuplicateIndex, fingerprint, similarity
+
+# ============================================================
+# NEAR-DUPLICATE BENCHMARK
+# ============================================================
+# Indexes the bundled fake-news articles, then queries perturbed copies of
+# them (what syndication does to a story) and articles that were never
+# indexed, and reports recall, false matches and lookup latency:
+#
+#   python benchmark_near_duplicate.py --threshold 0.8 --output near_dup_report.json
+#
+# Every fifth article is kept out of the index to measure false matches.
+HEADERS = [
+    "Breaking News | World | Politics | Business | Sign in to read more",
+    "Advertisement. Continue reading the main story below.",
+    "This story was originally published by a partner wire service.",
+]
+FOOTERS = [
+    "Share this article on Facebook Twitter Email. Related coverage: more from our newsroom.",
+    "Copyright 2024 all rights reserved. This material may not be published, broadcast or redistributed.",
+    "Sign up for our daily newsletter to get the top stories delivered to your inbox every morning.",
+]
+AD_TEXT = "Advertisement. Shop the best deals of the season with free shipping on orders over fifty dollars."
+
+
+def _sentences(text: str):
+    return [sentence for sentence in text.replace("\n", " ").split(" . ") if sentence.strip()]
+
+
+def perturb(text: str, kind: str, rng: random.Random) -> str:
+    if kind == "header_footer":
+        return f"{rng.choice(HEADERS)}\n{text}\n{rng.choice(FOOTERS)}"
+    if kind == "ad_insert":
+        sentences = _sentences(text)
+        sentences.insert(rng.randrange(len(sentences) + 1), AD_TEXT)
+        return " . ".join(sentences)
+    if kind == "drop_sentence":
+        sentences = _sentences(text)
+        if len(sentences) > 3:
+            sentences.pop(rng.randrange(len(sentences)))
+        return " . ".join(sentences)
+    if kind == "word_edits":
+        # Typos and wording changes in ~2% of the words.
+        words = text.split()
+        for i in rng.sample(range(len(words)), max(1, len(words) // 50)):
+            words[i] = words[i][::-1]
+        return " ".join(words)
+    if kind == "whitespace_case":
+        return " ".join(text.split()).upper()
+    raise ValueError(f"Unknown perturbation: {kind}")
+
+
+PERTURBATIONS = ("header_footer", "ad_insert", "drop_sentence", "word_edits", "whitespace_case")
+
+
+def _percentiles_ms(seconds):
+    values = np.asarray(seconds) * 1000
+    return {
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+    } if len(values) else None
+
+
+def run(threshold: float, limit: int = None, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    index = NearDuplicateIndex(threshold=threshold, persistent=False)
+    indexed, unseen, add_seconds = [], [], []
+    for position, (text, _) in enumerate(iter_fake_news(limit=limit)):
+        if fingerprint(text) is None:
+            continue
+        if position % 5 == 4:
+            unseen.append(text)
+            continue
+        digest = text_digest(text)
+        started = time.perf_counter()
+        index.add(digest, text)
+        add_seconds.append(time.perf_counter() - started)
+        indexed.append((digest, text))
+
+    report = {"threshold": threshold, "indexed": len(indexed), "unseen": len(unseen), "perturbations": []}
+    lookup_seconds = []
+    for kind in PERTURBATIONS:
+        found, similarities = 0, []
+        for digest, text in indexed:
+            copy = perturb(text, kind, rng)
+            started = time.perf_counter()
+            match = index.lookup(copy)
+            lookup_seconds.append(time.perf_counter() - started)
+            found += bool(match and match.doc_id == digest)
+            similarities.append(similarity(fingerprint(copy), fingerprint(text)))
+        report["perturbations"].append({
+            "kind": kind,
+            "recall": round(found / len(indexed), 4) if indexed else None,
+            "similarity_mean": round(float(np.mean(similarities)), 4) if similarities else None,
+        })
+
+    false_matches = 0
+    for text in unseen:
+        started = time.perf_counter()
+        false_matches += index.lookup(text) is not None
+        lookup_seconds.append(time.perf_counter() - started)
+
+    report["false_match_rate"] = round(false_matches / len(unseen), 4) if unseen else None
+    report["add_ms"] = _percentiles_ms(add_seconds)
+    # Includes the MinHash of the query text, as in /analyze.
+    report["lookup_ms"] = _percentiles_ms(lookup_seconds)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure near-duplicate recall and lookup latency.")
+    parser.add_argument("--threshold", type=float, nargs="+", default=[SIMILARITY_THRESHOLD])
+    parser.add_argument("--limit", type=int, default=None, help="max articles from the dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    report = {"runs": [run(threshold, args.limit, args.seed) for threshold in args.threshold]}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+from datasets_io import iter_fake_news, iter_sbic
+from prompt_builder import PROMPT_TOKEN_BUDGET, build_summary_prompt, regex_sentences, spacy_sentences
+
+# ============================================================
+# PROMPT COMPACTION HARNESS
+# ============================================================
+# Builds the Gemini summary prompt for every document of the bundled
+# datasets, without calling Gemini or the classifiers, and reports how much
+# the token budget shrinks it compared to the old full-text prompt:
+#
+#   python benchmark_prompt.py --budget 1200 --limit 500 --output prompt_report.json
+#
+# Scores in the analysis block are placeholders of realistic size.
+DATASETS = {
+    "fake_news": iter_fake_news,
+    "sbic": iter_sbic,
+}
+
+PLACEHOLDER_ANALYSIS = {
+    "political_bias": {"prediction": "center", "confidence": 0.5123},
+    "social_bias": {"bias_category": "none", "confidence": 0.8731},
+    "fake_news_score": 12.34,
+    "dbias": {"score": 41.27, "label": "not bias"},
+    "weighted_votes": {"left": 0.1, "center": 0.7123, "right": 0.1},
+    "final_verdict": "center",
+}
+
+
+def _splitter(name: str):
+    if name == "regex":
+        return regex_sentences
+    if name == "spacy":
+        return spacy_sentences
+    try:
+        spacy_sentences("Probe sentence.")
+        return spacy_sentences
+    except Exception:
+        return regex_sentences
+
+
+def measure(dataset: str, budget: int, limit: int, splitter) -> dict:
+    original, compacted, build_ms, kept_ratio = [], [], [], []
+    for text, _ in DATASETS[dataset](limit=limit):
+        started = time.perf_counter()
+        _, stats = build_summary_prompt(text, PLACEHOLDER_ANALYSIS, budget, sentence_splitter=splitter)
+        build_ms.append((time.perf_counter() - started) * 1000)
+        original.append(stats["original_tokens"])
+        compacted.append(stats["prompt_tokens"])
+        if stats["sentences_total"]:
+            kept_ratio.append(stats["sentences_kept"] / stats["sentences_total"])
+
+    if not original:
+        return {"dataset": dataset, "documents": 0}
+    original, compacted = np.asarray(original), np.asarray(compacted)
+    return {
+        "dataset": dataset,
+        "documents": len(original),
+        "compacted_documents": len(kept_ratio),
+        "original_tokens_mean": round(float(original.mean()), 1),
+        "prompt_tokens_mean": round(float(compacted.mean()), 1),
+        "prompt_tokens_max": int(compacted.max()),
+        "over_budget": int((compacted > budget).sum()),
+        "token_reduction": round(float(1 - compacted.sum() / original.sum()), 4),
+        "sentences_kept_mean": round(float(np.mean(kept_ratio)), 4) if kept_ratio else None,
+        "build_ms_p50": round(float(np.percentile(build_ms, 50)), 3),
+        "build_ms_p95": round(float(np.percentile(build_ms, 95)), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Gemini prompt compaction on the bundled datasets.")
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument("--budget", type=int, default=PROMPT_TOKEN_BUDGET, help="prompt token budget")
+    parser.add_argument("--limit", type=int, default=None, help="max documents per dataset")
+    parser.add_argument("--splitter", choices=["auto", "spacy", "regex"], default="auto")
+    parser.add_argument("--output", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    splitter = _splitter(args.splitter)
+    report = {
+        "budget": args.budget,
+        "splitter": "spacy" if splitter is spacy_sentences else "regex",
+        "datasets": [measure(dataset, args.budget, args.limit, splitter) for dataset in args.datasets],
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
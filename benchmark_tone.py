@@ -0,0 +1,97 @@
+import sys
+import json
+import time
+import logging
+import argparse
+
+from datasets_io import iter_fake_news
+from evaluate import resolve_model_source
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# TONE MODE BENCHMARK
+# ============================================================
+# Builds articles of increasing length from the bundled fake-news set and
+# times the tone stage on them in document and sentence mode, reporting
+# articles per second, how many sentences the prefilter let through, and
+# how often the two modes agree on the primary emotion:
+#
+#   python benchmark_tone.py --words 250 500 1000 2000 4000 --output tone_report.json
+#
+# In sentence mode the time per article should stay roughly flat once
+# articles have more emotional sentences than CLEARIFY_TONE_MAX_SENTENCES.
+
+
+def build_articles(words: int, count: int):
+    """`count` texts of about `words` words, each made of consecutive articles."""
+    articles, current = [], []
+    for text, _ in iter_fake_news():
+        current.extend(text.split())
+        while len(current) >= words:
+            articles.append(" ".join(current[:words]))
+            current = current[words:]
+            if len(articles) == count:
+                return articles
+    return articles
+
+
+def _timed(texts, mode: str, batch_size: int):
+    from spacyanalyzer import analyze_tone_batch
+    results, started = [], time.perf_counter()
+    for start in range(0, len(texts), batch_size):
+        results.extend(analyze_tone_batch(texts[start:start + batch_size], mode=mode))
+    return results, time.perf_counter() - started
+
+
+def run(words_list, count: int, batch_size: int) -> list:
+    from spacyanalyzer import analyze_tone_batch
+    analyze_tone_batch(build_articles(50, 1), mode="sentence")  # warm-up outside the timings
+
+    rows = []
+    for words in words_list:
+        texts = build_articles(words, count)
+        document_results, document_seconds = _timed(texts, "document", batch_size)
+        sentence_results, sentence_seconds = _timed(texts, "sentence", batch_size)
+        agree = sum(
+            a["primary_emotion"] == b["primary_emotion"] for a, b in zip(document_results, sentence_results)
+        )
+        rows.append({
+            "words": words,
+            "articles": len(texts),
+            "document_articles_per_second": round(len(texts) / document_seconds, 2) if document_seconds else None,
+            "sentence_articles_per_second": round(len(texts) / sentence_seconds, 2) if sentence_seconds else None,
+            "mean_sentences": round(sum(r["sentences"] for r in sentence_results) / len(texts), 1) if texts else None,
+            "mean_sentences_scored": (
+                round(sum(r["sentences_scored"] for r in sentence_results) / len(texts), 1) if texts else None
+            ),
+            "primary_emotion_agreement": round(agree / len(texts), 4) if texts else None,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare document and sentence tone modes by article length.")
+    parser.add_argument("--words", type=int, nargs="+", default=[250, 500, 1000, 2000, 4000])
+    parser.add_argument("--articles", type=int, default=20, help="articles per length")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--models", choices=["auto", "real", "tiny"], default="auto")
+    parser.add_argument("--output", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    report = {
+        "models": resolve_model_source(args.models, ["emotion"]),
+        "batch_size": args.batch_size,
+        "lengths": run(args.words, args.articles, args.batch_size),
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+import os
+import sys
+import json
+import time
+import pickle
+import hashlib
+import logging
+import argparse
+import threading
+
+from datasets_io import iter_fake_news, iter_sbic
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CASCADE CONFIGURATION
+# ============================================================
+# With CLEARIFY_CASCADE=1, a linear model on hashed word n-grams scores
+# each text before the transformer of its stage. When it is at least
+# CLEARIFY_CASCADE_THRESHOLD confident (per stage:
+# CLEARIFY_CASCADE_THRESHOLD_<STAGE>), its answer is used and the
+# transformer pass is skipped. Only stages with a bundled training set
+# (fake news, SBIC) have a cheap model.
+CASCADE_ENABLED = os.getenv("CLEARIFY_CASCADE", "0") == "1"
+#
+# The models are trained offline with `python cascade.py train` and saved
+# as pickles, so CASCADE_DIR must be owned by the serving user with mode
+# 0700: anyone who can write a .pkl there runs code in every worker.
+CASCADE_DIR = os.getenv("CLEARIFY_CASCADE_DIR", "/tmp/clearify_cascade")
+DEFAULT_THRESHOLD = float(os.getenv("CLEARIFY_CASCADE_THRESHOLD", "0.9"))
+# Train from the bundled datasets on first use when no model is saved yet
+# (each worker process trains its own copy; for development only).
+AUTO_TRAIN = os.getenv("CLEARIFY_CASCADE_AUTOTRAIN", "0") == "1"
+# Value of the fake-news `label` field that marks a fake article.
+FAKE_LABEL = os.getenv("CLEARIFY_CASCADE_FAKE_LABEL", "true") == "true"
+
+N_FEATURES = 2 ** 18
+NGRAM_RANGE = (1, 2)
+# Every HOLDOUT_EVERY-th document (by text hash) is kept out of training, so
+# the benchmark measures the cascade on unseen text.
+HOLDOUT_EVERY = 5
+
+DECIDED_BY_CHEAP = "linear"
+DECIDED_BY_FULL = "transformer"
+
+_models = {}
+_models_lock = threading.Lock()
+
+
+def threshold(stage: str) -> float:
+    return float(os.getenv(f"CLEARIFY_CASCADE_THRESHOLD_{stage.upper()}", DEFAULT_THRESHOLD))
+
+
+def _fake_news_examples():
+    for text, label in iter_fake_news():
+        yield text, "fake" if label == FAKE_LABEL else "real"
+
+
+def _fake_news_result(label: str, probs: dict):
+    # Same scale as ml_analysis.analyze_fake_news: probability of "fake" x 100.
+    return round(probs.get("fake", 0.0) * 100, 2)
+
+
+def _social_result(label: str, probs: dict):
+    return {"bias_category": label, "confidence": round(probs[label], 3)}
+
+
+# Stage name in main -> training data and result shape of that stage.
+CASCADE_STAGES = {
+    "fake_news": {"examples": _fake_news_examples, "result": _fake_news_result},
+    "social": {"examples": iter_sbic, "result": _social_result},
+}
+
+
+def is_holdout(text: str) -> bool:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16) % HOLDOUT_EVERY == 0
+
+
+def split_examples(stage: str):
+    """(train, holdout) lists of (text, label) for a cascade stage."""
+    train, holdout = [], []
+    for text, label in CASCADE_STAGES[stage]["examples"]():
+        (holdout if is_holdout(text) else train).append((text, label))
+    return train, holdout
+
+
+# ============================================================
+# CHEAP CLASSIFIER
+# ============================================================
+def make_vectorizer():
+    from sklearn.feature_extraction.text import HashingVectorizer
+    # Stateless: nothing to fit or store besides the linear weights.
+    return HashingVectorizer(
+        n_features=N_FEATURES, ngram_range=NGRAM_RANGE, alternate_sign=False, norm="l2", lowercase=True
+    )
+
+
+class CheapClassifier:
+    """Hashed n-grams + logistic regression for one stage."""
+
+    def __init__(self, stage: str, model, version: str):
+        self.stage = stage
+        self.model = model
+        self.version = version
+        self.vectorizer = make_vectorizer()
+
+    def predict(self, texts):
+        """[(label, {label: probability})] per text."""
+        probs = self.model.predict_proba(self.vectorizer.transform(texts))
+        classes = [str(label) for label in self.model.classes_]
+        results = []
+        for row in probs:
+            by_label = {label: float(p) for label, p in zip(classes, row)}
+            results.append((max(by_label, key=by_label.get), by_label))
+        return results
+
+
+def train(stage: str, examples=None) -> CheapClassifier:
+    from sklearn.linear_model import LogisticRegression
+
+    if examples is None:
+        examples, _ = split_examples(stage)
+    texts = [text for text, _ in examples]
+    labels = [label for _, label in examples]
+    started = time.monotonic()
+    model = LogisticRegression(max_iter=1000, C=4.0)
+    model.fit(make_vectorizer().transform(texts), labels)
+
+    digest = hashlib.sha256()
+    for text, label in examples:
+        digest.update(f"{label}\t{text}\n".encode("utf-8"))
+    version = f"hash{N_FEATURES}-ng{NGRAM_RANGE[0]}{NGRAM_RANGE[1]}-{digest.hexdigest()[:12]}"
+    logger.info("Trained the %s cascade model on %d texts in %.2fs.", stage, len(texts), time.monotonic() - started)
+    return CheapClassifier(stage, model, version)
+
+
+def model_path(stage: str) -> str:
+    return os.path.join(CASCADE_DIR, f"{stage}.pkl")
+
+
+def _check_owner(path: str, forbidden_mode: int):
+    info = os.stat(path)
+    if info.st_uid != os.getuid() or info.st_mode & forbidden_mode:
+        raise PermissionError(f"{path} must be owned by this user with mode {0o777 & ~forbidden_mode:o} or stricter.")
+
+
+def _private_directory() -> str:
+    """Creates CASCADE_DIR, or checks an existing one, so that only this
+    user can put models in it."""
+    os.makedirs(CASCADE_DIR, mode=0o700, exist_ok=True)
+    _check_owner(CASCADE_DIR, 0o077)
+    return CASCADE_DIR
+
+
+def _load(path: str) -> CheapClassifier:
+    # Unpickling runs code, so the file and its directory must be private.
+    _private_directory()
+    _check_owner(path, 0o022)
+    with open(path, "rb") as f:
+        saved = pickle.load(f)
+    return CheapClassifier(saved["stage"], saved["model"], saved["version"])
+
+
+def save(classifier: CheapClassifier):
+    _private_directory()
+    path = model_path(classifier.stage)
+    tmp_path = f"{path}.tmp"
+    # A plain dict, so models saved by `python cascade.py train` (where this
+    # module is __main__) load from the app; the vectorizer is rebuilt on load.
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump({"stage": classifier.stage, "model": classifier.model, "version": classifier.version}, f)
+    os.replace(tmp_path, path)
+
+
+def get_cheap_model(stage: str) -> CheapClassifier:
+    """Saved model for `stage`, trained (and saved) on first use if allowed."""
+    if stage in _models:
+        return _models[stage]
+    with _models_lock:
+        if stage not in _models:
+            path = model_path(stage)
+            if os.path.exists(path):
+                _models[stage] = _load(path)
+            elif AUTO_TRAIN:
+                _models[stage] = train(stage)
+                save(_models[stage])
+            else:
+                raise FileNotFoundError(f"No cascade model at {path}; run python cascade.py train.")
+    return _models[stage]
+
+
+# ============================================================
+# CASCADED STAGE
+# ============================================================
+def decision(value, decided_by: str) -> dict:
+    return {"value": value, "decided_by": decided_by}
+
+
+def split_decision(result):
+    """(value, decided_by) of a cascaded stage result; (result, None) otherwise."""
+    if isinstance(result, dict) and set(result) == {"value", "decided_by"}:
+        return result["value"], result["decided_by"]
+    return result, None
+
+
+class CascadeStage:
+    """Batch analyzer answering confident texts with the cheap model and
+    sending the rest to `full_analyzer`. Results are decision() dicts."""
+
+    def __init__(self, stage: str, full_analyzer, min_confidence: float = None, cheap: CheapClassifier = None):
+        self.stage = stage
+        self.full_analyzer = full_analyzer
+        self.min_confidence = threshold(stage) if min_confidence is None else min_confidence
+        self.cheap = get_cheap_model(stage) if cheap is None else cheap
+        self.to_result = CASCADE_STAGES[stage]["result"]
+
+    @property
+    def signature(self) -> str:
+        """Part of the stage's cache version."""
+        return f"cascade-{self.cheap.version}-{self.min_confidence:g}"
+
+    def __call__(self, texts):
+        texts = list(texts)
+        results, deferred = [None] * len(texts), []
+        for i, (label, probs) in enumerate(self.cheap.predict(texts)):
+            if probs[label] >= self.min_confidence:
+                results[i] = decision(self.to_result(label, probs), DECIDED_BY_CHEAP)
+            else:
+                deferred.append(i)
+        if deferred:
+            full = self.full_analyzer([texts[i] for i in deferred])
+            for i, value in zip(deferred, full):
+                results[i] = decision(value, DECIDED_BY_FULL)
+        return results
+
+
+def cascade_analyzers(analyzers: dict, versions: dict):
+    """Wraps the cascade stages of `analyzers` in place (and extends their
+    cache versions) when CLEARIFY_CASCADE=1."""
+    if not CASCADE_ENABLED:
+        return
+    for stage in CASCADE_STAGES:
+        if stage not in analyzers:
+            continue
+        try:
+            analyzers[stage] = CascadeStage(stage, analyzers[stage])
+        except Exception as e:
+            logger.warning("Cascade for %s disabled: %s", stage, e)
+            continue
+        versions[stage] = f"{versions[stage]}|{analyzers[stage].signature}"
+        logger.info("Cascade enabled for %s (threshold %g).", stage, analyzers[stage].min_confidence)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the cheap first-stage cascade models.")
+    parser.add_argument("command", choices=["train"])
+    parser.add_argument("--stages", nargs="+", choices=list(CASCADE_STAGES), default=list(CASCADE_STAGES))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    report = {}
+    for stage in args.stages:
+        classifier = train(stage)
+        save(classifier)
+        report[stage] = {"path": model_path(stage), "version": classifier.version}
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import os
+import numpy as np
+
+from document import token_ids
+from metrics import INPUT_TOKENS, METRICS_ENABLED, TRUNCATED_INPUTS
+
+# ============================================================
+# CHUNKING CONFIGURATION
+# ============================================================
+# Long articles are split into overlapping token windows instead of being
+# silently truncated to their first 512 tokens. The overlap and the number
+# of windows are capped so latency on very long articles stays bounded.
+CHUNKING_ENABLED = os.getenv("CLEARIFY_CHUNKING", "1") == "1"
+WINDOW_TOKENS = int(os.getenv("CLEARIFY_CHUNK_WINDOW_TOKENS", "512"))
+WINDOW_OVERLAP = int(os.getenv("CLEARIFY_CHUNK_OVERLAP", "64"))
+MAX_WINDOWS = int(os.getenv("CLEARIFY_CHUNK_MAX_WINDOWS", "8"))
+AGGREGATION = os.getenv("CLEARIFY_CHUNK_AGGREGATION", "mean")  # mean | max | length_weighted
+
+AGGREGATION_METHODS = ("mean", "max", "length_weighted")
+
+# Part of every model's cache version: the same model scores a long text
+# differently under different windowing settings.
+CHUNKING_SIGNATURE = (
+    f"chunk-{WINDOW_TOKENS}-{WINDOW_OVERLAP}-{MAX_WINDOWS}-{AGGREGATION}"
+    if CHUNKING_ENABLED else "truncate-512"
+)
+
+
+# ============================================================
+# WINDOWING
+# ============================================================
+def window_starts(n_tokens: int, body: int, overlap: int, max_windows: int):
+    """Start offsets of windows of `body` tokens covering `n_tokens` tokens.
+
+    When more than `max_windows` windows would be needed, evenly spaced
+    windows are kept (always including the first and the last one).
+    """
+    overlap = max(0, min(overlap, body // 2))
+    step = body - overlap
+    starts = list(range(0, max(n_tokens - overlap, 1), step))
+
+    if max_windows > 0 and len(starts) > max_windows:
+        if max_windows == 1:
+            return [0]
+        last = len(starts) - 1
+        picks = sorted({round(i * last / (max_windows - 1)) for i in range(max_windows)})
+        starts = [starts[i] for i in picks]
+    return starts
+
+
+def _record_tokens(model: str, n_tokens: int, body: int, overlap: int, n_windows: int):
+    """Token count and, when windows were dropped, a truncation (metrics only)."""
+    if not METRICS_ENABLED or model is None:
+        return
+    INPUT_TOKENS.labels(model=model).observe(n_tokens)
+    if n_windows < len(window_starts(n_tokens, body, overlap, 0)):
+        TRUNCATED_INPUTS.labels(model=model).inc()
+
+
+def split_windows(tokenizer, text: str, max_length: int = WINDOW_TOKENS,
+                  overlap: int = WINDOW_OVERLAP, max_windows: int = MAX_WINDOWS, model: str = None):
+    """Tokenizes `text` into overlapping windows ready for a forward pass.
+
+    Returns a list of encodings (each with special tokens added and at most
+    `max_length` tokens) and the number of text tokens in each window.
+    `model` only labels the token metrics. A Document reuses its token IDs.
+    """
+    ids = token_ids(tokenizer, text)
+    body = max_length - tokenizer.num_special_tokens_to_add(pair=False)
+    starts = window_starts(len(ids), body, overlap, max_windows)
+    _record_tokens(model, len(ids), body, overlap, len(starts))
+
+    encodings, lengths = [], []
+    for start in starts:
+        chunk = ids[start:start + body]
+        encodings.append(tokenizer.prepare_for_model(chunk, add_special_tokens=True))
+        lengths.append(max(len(chunk), 1))
+    return encodings, lengths
+
+
+def split_text_windows(tokenizer, text: str, max_length: int = WINDOW_TOKENS,
+                       overlap: int = WINDOW_OVERLAP, max_windows: int = MAX_WINDOWS, model: str = None):
+    """Same as split_windows, but returns each window decoded back to text.
+
+    Used for transformers pipelines, which take raw strings.
+    """
+    ids = token_ids(tokenizer, text)
+    body = max_length - tokenizer.num_special_tokens_to_add(pair=False)
+
+    starts = window_starts(len(ids), body, overlap, max_windows)
+    _record_tokens(model, len(ids), body, overlap, len(starts))
+
+    texts, lengths = [], []
+    for start in starts:
+        chunk = ids[start:start + body]
+        texts.append(tokenizer.decode(chunk, skip_special_tokens=True))
+        lengths.append(max(len(chunk), 1))
+    return texts, lengths
+
+
+# ============================================================
+# AGGREGATION
+# ============================================================
+def aggregate_probs(window_probs, lengths=None, method: str = AGGREGATION):
+    """Combines per-window probability vectors into one distribution.
+
+    `lengths` (one per window) is required for "length_weighted".
+    """
+    if method not in AGGREGATION_METHODS:
+        raise ValueError(f"Unknown chunk aggregation method: {method}")
+    probs = np.asarray(window_probs, dtype=np.float64)
+    probs = probs.reshape(-1, probs.shape[-1])
+    if method == "length_weighted":
+        if lengths is None:
+            raise ValueError("length_weighted aggregation needs the window lengths")
+        if len(lengths) != len(probs):
+            raise ValueError(f"{len(lengths)} lengths for {len(probs)} windows")
+    if len(probs) == 1:
+        return probs[0]
+
+    if method == "max":
+        combined = probs.max(axis=0)
+        return combined / combined.sum()
+    if method == "length_weighted":
+        weights = np.asarray(lengths, dtype=np.float64)
+        return (probs * weights[:, None]).sum(axis=0) / weights.sum()
+    return probs.mean(axis=0)
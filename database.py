@@ -1,7 +1,11 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
 import logging
 import os
+import time
+import atexit
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
 
 # ---------------- Logging Setup ---------------- #
 logging.basicConfig(
@@ -11,45 +15,342 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # ---------------- Database URL ---------------- #
+# postgres://... in production; sqlite:///path/to/file.db (or sqlite:///:memory:)
+# is a local stand-in that needs no server.
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# ---------------- Pool / Buffer Settings ---------------- #
+POOL_MAX_SIZE = int(os.getenv("CLEARIFY_DB_POOL_MAX", "5"))
+POOL_TIMEOUT_SECONDS = float(os.getenv("CLEARIFY_DB_POOL_TIMEOUT_S", "5"))
+# Idle connections older than this are pinged before being handed out.
+POOL_HEALTHCHECK_IDLE_SECONDS = float(os.getenv("CLEARIFY_DB_HEALTHCHECK_IDLE_S", "30"))
+
+FEEDBACK_BUFFERED = os.getenv("CLEARIFY_FEEDBACK_BUFFER", "1") == "1"
+FEEDBACK_BUFFER_MAX_ROWS = int(os.getenv("CLEARIFY_FEEDBACK_BUFFER_MAX", "1000"))
+FEEDBACK_FLUSH_ROWS = int(os.getenv("CLEARIFY_FEEDBACK_FLUSH_ROWS", "50"))
+FEEDBACK_FLUSH_INTERVAL_SECONDS = float(os.getenv("CLEARIFY_FEEDBACK_FLUSH_INTERVAL_S", "2"))
+FEEDBACK_RETRY_MAX_INTERVAL_SECONDS = float(os.getenv("CLEARIFY_FEEDBACK_RETRY_MAX_S", "60"))
+
+
+def is_sqlite() -> bool:
+    return bool(DATABASE_URL) and DATABASE_URL.startswith("sqlite:")
+
+# ---------------- SQL Dialect ---------------- #
+# Queries are written for Postgres; for the SQLite stand-in the placeholders
+# and the few Postgres-only time expressions are rewritten.
+_SQLITE_REWRITES = (
+    ("TIMESTAMPTZ NOT NULL DEFAULT NOW()", "REAL NOT NULL DEFAULT (strftime('%s', 'now'))"),
+    ("NOW() - (? * INTERVAL '1 second')", "strftime('%s', 'now') - ?"),
+    ("NOW()", "strftime('%s', 'now')"),
+)
+
+SQLITE_FEEDBACK_DDL = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    rating INTEGER,
+    feedback_text TEXT,
+    submitted_text TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+def _sql(query: str) -> str:
+    if not is_sqlite():
+        return query
+    query = query.replace("%s", "?")
+    for postgres, sqlite in _SQLITE_REWRITES:
+        query = query.replace(postgres, sqlite)
+    return query
+
 # ---------------- DB Connection ---------------- #
 def get_db_connection():
     """
-    Establishes a database connection using the securely provided DATABASE_URL.
-    Raises an error if the URL is not available.
+    Establishes a new database connection using the securely provided DATABASE_URL.
+    Raises an error if the URL is not available. Request handlers should use
+    pooled_connection() instead.
     """
     if not DATABASE_URL:
         raise ConnectionError("DATABASE_URL environment variable is not set. Cannot connect to the database.")
+    if is_sqlite():
+        path = DATABASE_URL[len("sqlite:///"):] or ":memory:"
+        if path == ":memory:":
+            # Shared in-memory database, alive while the pool holds a connection.
+            conn = sqlite3.connect("file:clearify?mode=memory&cache=shared", uri=True, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(path, check_same_thread=False, timeout=POOL_TIMEOUT_SECONDS)
+        conn.row_factory = sqlite3.Row
+        conn.execute(SQLITE_FEEDBACK_DDL)
+        conn.commit()
+        return conn
+
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
     conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
     return conn
 
-# ---------------- Save Feedback ---------------- #
-def save_feedback(rating: int, feedback_text: str, submitted_text: str):
-    """Save user feedback and log success/failure."""
-    conn = None
+# ---------------- Connection Pool ---------------- #
+class PoolTimeout(ConnectionError):
+    pass
+
+
+class ConnectionPool:
+    """Bounded connection pool.
+
+    At most `max_size` connections exist; checkout waits up to `timeout`
+    seconds for one to be returned. Connections idle for longer than
+    `healthcheck_idle` seconds are pinged at checkout and replaced if dead.
+    """
+
+    def __init__(self, connect, max_size: int = POOL_MAX_SIZE, timeout: float = POOL_TIMEOUT_SECONDS,
+                 healthcheck_idle: float = POOL_HEALTHCHECK_IDLE_SECONDS):
+        self._connect = connect
+        self.max_size = max(1, max_size)
+        self.timeout = timeout
+        self.healthcheck_idle = healthcheck_idle
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def acquire(self, check: bool = False):
+        deadline = time.monotonic() + self.timeout
+        conn, last_used = None, None
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"No database connection available within {self.timeout:g}s")
+                self._cond.wait(remaining)
+
+        if conn is not None and (check or time.monotonic() - last_used > self.healthcheck_idle):
+            if not self._ping(conn):
+                logger.warning("Discarding dead pooled database connection.")
+                self._close(conn)
+                conn = None
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                self._forget()
+                raise
+        return conn
+
+    def release(self, conn, discard: bool = False):
+        if discard or getattr(conn, "closed", 0):
+            self._close(conn)
+            self._forget()
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Process-wide pool, created lazily (and again in each forked worker)."""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = ConnectionPool(get_db_connection)
+                _pool_pid = os.getpid()
+    return _pool
+
+@contextmanager
+def pooled_connection(check: bool = False):
+    """Checks a connection out of the pool; rolls back and returns it on error."""
+    pool = get_pool()
+    conn = pool.acquire(check=check)
     try:
-        conn = get_db_connection()
+        yield conn
+    except Exception:
+        try:
+            conn.rollback()
+            broken = False
+        except Exception:
+            broken = True
+        pool.release(conn, discard=broken)
+        raise
+    pool.release(conn)
+
+# ---------------- Save Feedback ---------------- #
+FEEDBACK_INSERT = "INSERT INTO feedback (rating, feedback_text, submitted_text) VALUES %s"
+
+def write_feedback_rows(rows):
+    """Insert (rating, feedback_text, submitted_text) rows in one statement."""
+    if not rows:
+        return
+    with pooled_connection() as conn:
         cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO feedback (rating, feedback_text, submitted_text)
-            VALUES (%s, %s, %s)
-            """,
-            (rating, feedback_text, submitted_text)
-        )
+        if is_sqlite():
+            cur.executemany(_sql(FEEDBACK_INSERT % "(%s, %s, %s)"), rows)
+        else:
+            from psycopg2.extras import execute_values
+            execute_values(cur, FEEDBACK_INSERT, rows, page_size=max(len(rows), 1))
         conn.commit()
         cur.close()
-        logger.info("Feedback saved successfully: rating=%s", rating)
-    except ConnectionError as e:
-        logger.exception("Database connection error when saving feedback: %s", e)
-    except Exception as e:
-        logger.exception("Database error when saving feedback: %s", e)
-        if conn:
-            conn.rollback()
-    finally:
-        if conn:
-            conn.close()
+
+
+class FeedbackBufferFull(ConnectionError):
+    pass
+
+
+class FeedbackBuffer:
+    """Bounded in-process buffer of feedback rows.
+
+    A background thread writes the buffer as one multi-row insert whenever
+    it reaches `flush_rows` or every `flush_interval` seconds. Rows that
+    fail to write are put back and retried, with the wait doubling after
+    each consecutive failure (up to `max_retry_interval`). Accepted rows are
+    never dropped: once `max_rows` are waiting, add() raises
+    FeedbackBufferFull so the caller can report the failure.
+    """
+
+    def __init__(self, max_rows: int = FEEDBACK_BUFFER_MAX_ROWS, flush_rows: int = FEEDBACK_FLUSH_ROWS,
+                 flush_interval: float = FEEDBACK_FLUSH_INTERVAL_SECONDS, writer=write_feedback_rows,
+                 max_retry_interval: float = FEEDBACK_RETRY_MAX_INTERVAL_SECONDS):
+        self.max_rows = max(1, max_rows)
+        self.flush_rows = max(1, flush_rows)
+        self.flush_interval = flush_interval
+        self.max_retry_interval = max(flush_interval, max_retry_interval)
+        self._writer = writer
+        self._rows = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+        self._worker_pid = None
+        self._failures = 0
+        self._last_error = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        self._worker = threading.Thread(target=self._loop, name="feedback-flush", daemon=True)
+        self._worker_pid = os.getpid()
+        self._worker.start()
+
+    def add(self, row):
+        with self._lock:
+            if len(self._rows) >= self.max_rows:
+                raise FeedbackBufferFull(
+                    f"{len(self._rows)} feedback rows are waiting to be written; last error: {self._last_error}"
+                )
+            self._rows.append(row)
+            self._ensure_worker()
+            if len(self._rows) >= self.flush_rows:
+                self._wake.set()
+
+    def flush(self) -> int:
+        """Writes everything buffered so far; returns the number of rows written."""
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._rows)
+                self._rows.clear()
+            if not batch:
+                return 0
+            try:
+                self._writer(batch)
+            except Exception as e:
+                with self._lock:
+                    # Back in front of anything added meanwhile, in order.
+                    self._rows.extendleft(reversed(batch))
+                    self._failures += 1
+                    self._last_error = str(e)
+                logger.exception(
+                    "Database error when saving feedback (%d rows kept for retry, attempt %d): %s",
+                    len(batch), self._failures, e
+                )
+                return 0
+            with self._lock:
+                self._failures = 0
+                self._last_error = None
+            logger.info("Feedback saved successfully: %d rows", len(batch))
+            return len(batch)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pending_rows": len(self._rows),
+                "consecutive_failures": self._failures,
+                "last_error": self._last_error,
+            }
+
+    def _retry_wait(self) -> float:
+        if not self._failures:
+            return self.flush_interval
+        return min(self.flush_interval * 2 ** self._failures, self.max_retry_interval)
+
+    def _loop(self):
+        while True:
+            if self._failures:
+                # Backing off: rows arriving meanwhile do not trigger a write.
+                time.sleep(self._retry_wait())
+            else:
+                self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+feedback_buffer = FeedbackBuffer()
+
+def save_feedback(rating: int, feedback_text: str, submitted_text: str) -> str:
+    """Save user feedback; returns "saved" once written or "queued" when
+    buffered. Raises when the row cannot be written (or buffered)."""
+    row = (rating, feedback_text, submitted_text)
+    if FEEDBACK_BUFFERED:
+        feedback_buffer.add(row)
+        logger.info("Feedback queued: rating=%s", rating)
+        return "queued"
+    write_feedback_rows([row])
+    logger.info("Feedback saved successfully: rating=%s", rating)
+    return "saved"
 
 # ---------------- Database Health Check ---------------- #
 def check_db_health():
@@ -57,17 +358,157 @@ def check_db_health():
     Simple database health check.
     Returns True if the DB is reachable, False otherwise.
     """
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT 1")  # Simple query to test connectivity
-        cur.close()
+        with pooled_connection(check=True) as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")  # Simple query to test connectivity
+            cur.close()
+            conn.rollback()
         logger.info("Database health check passed.")
         return True
     except Exception as e:
         logger.exception("Database health check failed: %s", e)
         return False
-    finally:
-        if conn:
-            conn.close()
+
+# ---------------- Analysis Result Cache ---------------- #
+ANALYSIS_CACHE_DDL = """
+CREATE TABLE IF NOT EXISTS analysis_cache (
+    cache_key CHAR(64) PRIMARY KEY,
+    stage TEXT NOT NULL,
+    result TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+_analysis_cache_ready = False
+
+def ensure_analysis_cache_table(conn):
+    """Create the analysis_cache table on first use."""
+    global _analysis_cache_ready
+    if _analysis_cache_ready:
+        return
+    cur = conn.cursor()
+    cur.execute(_sql(ANALYSIS_CACHE_DDL))
+    conn.commit()
+    cur.close()
+    _analysis_cache_ready = True
+
+def load_cached_result(cache_key: str, max_age_seconds: float):
+    """Return the cached JSON payload for a key, or None if absent or expired."""
+    try:
+        with pooled_connection() as conn:
+            ensure_analysis_cache_table(conn)
+            cur = conn.cursor()
+            cur.execute(
+                _sql("""
+                SELECT result FROM analysis_cache
+                WHERE cache_key = %s AND created_at > NOW() - (%s * INTERVAL '1 second')
+                """),
+                (cache_key, max_age_seconds)
+            )
+            row = cur.fetchone()
+            cur.close()
+            conn.rollback()
+        return row["result"] if row else None
+    except Exception as e:
+        logger.warning("Analysis cache lookup failed: %s", e)
+        return None
+
+def store_cached_result(cache_key: str, stage: str, payload: str):
+    """Insert or refresh a cached JSON payload."""
+    try:
+        with pooled_connection() as conn:
+            ensure_analysis_cache_table(conn)
+            cur = conn.cursor()
+            cur.execute(
+                _sql("""
+                INSERT INTO analysis_cache (cache_key, stage, result)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (cache_key) DO UPDATE
+                SET result = EXCLUDED.result, created_at = NOW()
+                """),
+                (cache_key, stage, payload)
+            )
+            conn.commit()
+            cur.close()
+    except Exception as e:
+        logger.warning("Analysis cache write failed: %s", e)
+
+# ---------------- Near-Duplicate Fingerprints ---------------- #
+# MinHash signatures of analyzed texts (a version tag and the base64 of the
+# uint32 values), so a restarted worker can recognise syndicated copies of
+# earlier articles.
+NEAR_DUPLICATE_DDL = """
+CREATE TABLE IF NOT EXISTS near_duplicate_fingerprints (
+    doc_id CHAR(64) PRIMARY KEY,
+    signature TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+)
+"""
+
+_near_duplicate_ready = False
+
+def ensure_near_duplicate_table(conn):
+    """Create the near_duplicate_fingerprints table on first use."""
+    global _near_duplicate_ready
+    if _near_duplicate_ready:
+        return
+    cur = conn.cursor()
+    cur.execute(_sql(NEAR_DUPLICATE_DDL))
+    conn.commit()
+    cur.close()
+    _near_duplicate_ready = True
+
+def load_fingerprints(limit: int, max_age_seconds: float):
+    """Newest stored (doc_id, signature) pairs, oldest first; [] on failure."""
+    try:
+        with pooled_connection() as conn:
+            ensure_near_duplicate_table(conn)
+            cur = conn.cursor()
+            cur.execute(
+                _sql("""
+                SELECT doc_id, signature FROM near_duplicate_fingerprints
+                WHERE created_at > NOW() - (%s * INTERVAL '1 second')
+                ORDER BY created_at DESC
+                LIMIT %s
+                """),
+                (max_age_seconds, limit)
+            )
+            rows = cur.fetchall()
+            cur.close()
+            conn.rollback()
+        return [(row["doc_id"], row["signature"]) for row in reversed(rows)]
+    except Exception as e:
+        logger.warning("Near-duplicate fingerprint load failed: %s", e)
+        return []
+
+def store_fingerprint(doc_id: str, signature: str):
+    """Insert a fingerprint; an existing doc_id is left as it is."""
+    try:
+        with pooled_connection() as conn:
+            ensure_near_duplicate_table(conn)
+            cur = conn.cursor()
+            cur.execute(
+                _sql("""
+                INSERT INTO near_duplicate_fingerprints (doc_id, signature)
+                VALUES (%s, %s)
+                ON CONFLICT (doc_id) DO NOTHING
+                """),
+                (doc_id, signature)
+            )
+            conn.commit()
+            cur.close()
+    except Exception as e:
+        logger.warning("Near-duplicate fingerprint write failed: %s", e)
+
+# ---------------- Shutdown ---------------- #
+def shutdown():
+    """Flush buffered feedback, then close pooled connections."""
+    if len(feedback_buffer):
+        feedback_buffer.flush()
+        if len(feedback_buffer):
+            logger.error("Exiting with %d feedback rows unwritten.", len(feedback_buffer))
+    if _pool is not None and _pool_pid == os.getpid():
+        _pool.close_all()
+
+atexit.register(shutdown)
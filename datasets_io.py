@@ -0,0 +1,43 @@
+import os
+import csv
+import json
+import itertools
+from collections import Counter
+
+# ============================================================
+# BUNDLED DATASETS
+# ============================================================
+# Both readers stream their file record by record; neither loads a whole
+# dataset into memory.
+DATASETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "datasets")
+FAKE_NEWS_PATH = os.path.join(DATASETS_DIR, "Fake news dataset", "test.jsonl")
+SBIC_PATH = os.path.join(DATASETS_DIR, "sbic_data", "SBIC.v2.dev.csv")
+
+
+def iter_fake_news(path: str = FAKE_NEWS_PATH, limit: int = None):
+    """Yields (text, label) from the fake-news JSONL (`txt`, `label` fields)."""
+    with open(path, encoding="utf-8") as f:
+        records = (json.loads(line) for line in f if line.strip())
+        for record in itertools.islice(records, limit):
+            yield record["txt"], record["label"]
+
+
+def iter_sbic(path: str = SBIC_PATH, limit: int = None):
+    """Yields (post, target_category) from the SBIC CSV.
+
+    SBIC has one row per annotator; consecutive rows for the same post are
+    merged and the majority targetCategory wins (blank means "none").
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        rows = csv.DictReader(f)
+        posts = itertools.groupby(rows, key=lambda row: row["post"])
+        merged = (
+            (post, Counter(row["targetCategory"] or "none" for row in group).most_common(1)[0][0])
+            for post, group in posts
+        )
+        yield from itertools.islice(merged, limit)
+
+
+def sample_texts(limit: int):
+    """First `limit` articles of the bundled fake-news set, for parity checks."""
+    return [text for text, _ in iter_fake_news(limit=limit)]
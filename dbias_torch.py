@@ -0,0 +1,161 @@
+import os
+import sys
+import json
+import logging
+import shutil
+import argparse
+import subprocess
+import numpy as np
+
+from model_store import LOCAL_MODEL_BASE_PATH
+from result_cache import fingerprint_directory
+from datasets_io import sample_texts
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# DBIAS PYTORCH CONFIGURATION
+# ============================================================
+# Dbias ships as a TensorFlow checkpoint. Converting it once to PyTorch
+# lets the serving process run it through the same path as the other
+# classifiers and never import TensorFlow.
+#   auto  - PyTorch if a converted artifact exists or can be produced, else TF
+#   torch - PyTorch only (fail if the conversion is unavailable)
+#   tf    - the original TensorFlow model
+DBIAS_BACKEND = os.getenv("CLEARIFY_DBIAS_BACKEND", "auto")
+CONVERTED_BASE_PATH = os.path.join(LOCAL_MODEL_BASE_PATH, "dbias_model_pt")
+
+PYTORCH_WEIGHT_FILES = ("model.safetensors", "pytorch_model.bin")
+
+
+def has_pytorch_weights(path: str) -> bool:
+    return any(os.path.isfile(os.path.join(path, name)) for name in PYTORCH_WEIGHT_FILES)
+
+
+def converted_dir(tf_path: str) -> str:
+    # Keyed by a hash of the TF checkpoint's content, so a retrained model is
+    # reconverted even when its file sizes did not change.
+    return os.path.join(CONVERTED_BASE_PATH, fingerprint_directory(tf_path))
+
+
+# ============================================================
+# CONVERSION
+# ============================================================
+def convert_to_pytorch(tf_path: str, out_dir: str):
+    """Loads the TF weights into the PyTorch model class and saves them.
+
+    Needs TensorFlow, so it normally runs in a subprocess (see
+    ensure_pytorch_dbias) or once at image build time.
+    """
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    model = AutoModelForSequenceClassification.from_pretrained(tf_path, from_tf=True)
+    tokenizer = AutoTokenizer.from_pretrained(tf_path)
+    tmp_dir = out_dir + ".tmp"
+    model.save_pretrained(tmp_dir)
+    tokenizer.save_pretrained(tmp_dir)
+    os.makedirs(os.path.dirname(out_dir), exist_ok=True)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+
+
+def ensure_pytorch_dbias(tf_path: str):
+    """Returns a directory with PyTorch Dbias weights, or None if unavailable.
+
+    The conversion runs in a child process so TensorFlow is never imported
+    into the serving process.
+    """
+    if has_pytorch_weights(tf_path):
+        return tf_path
+    out_dir = converted_dir(tf_path)
+    if has_pytorch_weights(out_dir):
+        return out_dir
+
+    logger.info("Converting Dbias TF checkpoint to PyTorch: %s -> %s", tf_path, out_dir)
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--convert", tf_path, out_dir],
+        capture_output=True, text=True,
+    )
+    if result.returncode != 0 or not has_pytorch_weights(out_dir):
+        logger.warning("Dbias PyTorch conversion unavailable: %s", result.stderr.strip()[-500:])
+        return None
+    return out_dir
+
+
+def resolve_dbias_backend(tf_path: str):
+    """Returns ("torch", pytorch_dir) or ("tf", tf_path) per CLEARIFY_DBIAS_BACKEND."""
+    if DBIAS_BACKEND == "tf":
+        return "tf", tf_path
+    pt_path = ensure_pytorch_dbias(tf_path)
+    if pt_path is not None:
+        return "torch", pt_path
+    if DBIAS_BACKEND == "torch":
+        raise RuntimeError("CLEARIFY_DBIAS_BACKEND=torch but the Dbias conversion is unavailable.")
+    return "tf", tf_path
+
+
+# ============================================================
+# PARITY CHECK
+# ============================================================
+def parity_report(tf_path: str, pt_path: str, texts, tolerance: float = 1e-3) -> dict:
+    """Compares Dbias probabilities between the TF original and PyTorch."""
+    import torch
+    import tensorflow as tf
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification, TFAutoModelForSequenceClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(tf_path)
+    tf_model = TFAutoModelForSequenceClassification.from_pretrained(tf_path)
+    pt_model = AutoModelForSequenceClassification.from_pretrained(pt_path)
+    pt_model.eval()
+
+    deltas, agree = [], 0
+    for text in texts:
+        tf_probs = tf.nn.softmax(
+            tf_model(tokenizer(text, truncation=True, max_length=512, return_tensors="tf")).logits, axis=-1
+        ).numpy()[0]
+        with torch.no_grad():
+            pt_probs = torch.softmax(
+                pt_model(**tokenizer(text, truncation=True, max_length=512, return_tensors="pt")).logits, dim=-1
+            ).numpy()[0]
+        deltas.append(float(np.abs(tf_probs - pt_probs).max()))
+        agree += int(tf_probs.argmax() == pt_probs.argmax())
+
+    n = max(len(texts), 1)
+    max_delta = max(deltas, default=0.0)
+    return {
+        "samples": len(texts),
+        "max_prob_delta": round(max_delta, 6),
+        "mean_prob_delta": round(sum(deltas) / n, 6),
+        "label_agreement": round(agree / n, 4),
+        "tolerance": tolerance,
+        "within_tolerance": max_delta <= tolerance,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert Dbias to PyTorch and check parity with TF.")
+    parser.add_argument("--convert", nargs=2, metavar=("TF_DIR", "OUT_DIR"),
+                        help="convert a TF checkpoint directory (used by ensure_pytorch_dbias)")
+    parser.add_argument("--samples", type=int, default=50, help="texts from the bundled fake-news set")
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    if args.convert:
+        convert_to_pytorch(*args.convert)
+        return 0
+
+    from model_store import prepare_models
+    tf_path = prepare_models(["dbias"])["dbias"]
+    pt_path = ensure_pytorch_dbias(tf_path)
+    if pt_path is None:
+        print("Dbias conversion unavailable; see log above.", file=sys.stderr)
+        return 1
+    report = parity_report(tf_path, pt_path, sample_texts(args.samples), args.tolerance)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0 if report["within_tolerance"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+import os
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# DEADLINE CONFIGURATION
+# ============================================================
+# Every /analyze request gets one end-to-end deadline. Scraping, the
+# analysis stages and the Gemini call each take their timeout from what is
+# left of it, so the response has a hard latency ceiling; whatever does not
+# finish in time is replaced by its fallback.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("CLEARIFY_REQUEST_DEADLINE_S", "30"))
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class Deadline:
+    """A point in time work must finish by."""
+
+    def __init__(self, seconds: float = REQUEST_DEADLINE_SECONDS):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def cap(self, timeout: float = None) -> float:
+        """`timeout` limited to the time left (just the time left if None)."""
+        remaining = self.remaining()
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+def cap_timeout(timeout: float, deadline: Deadline = None) -> float:
+    return timeout if deadline is None else deadline.cap(timeout)
+
+
+# ============================================================
+# CIRCUIT BREAKER
+# ============================================================
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` consecutive failures; after
+    `reset_timeout` seconds one trial call is let through (half-open), whose
+    outcome closes or re-opens the circuit."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = "closed"
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._total_successes = 0
+        self._total_failures = 0
+        self._total_rejected = 0
+        self._last_error = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = "half_open"
+            self._trial_in_flight = False
+        return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self._total_rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._total_successes += 1
+            self._consecutive_failures = 0
+            self._trial_in_flight = False
+            if self._state != "closed":
+                logger.info("Circuit %s closed.", self.name)
+            self._state = "closed"
+
+    def record_failure(self, error=None):
+        with self._lock:
+            self._total_failures += 1
+            self._consecutive_failures += 1
+            self._last_error = str(error) if error is not None else None
+            self._trial_in_flight = False
+            if self._state == "half_open" or self._consecutive_failures >= self.failure_threshold:
+                if self._state != "open":
+                    logger.warning("Circuit %s opened after %d consecutive failures.",
+                                   self.name, self._consecutive_failures)
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            retry_in = None
+            if state == "open":
+                retry_in = round(max(self.reset_timeout - (time.monotonic() - self._opened_at), 0.0), 2)
+            return {
+                "state": state,
+                "consecutive_failures": self._consecutive_failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_seconds": self.reset_timeout,
+                "retry_in_seconds": retry_in,
+                "total_successes": self._total_successes,
+                "total_failures": self._total_failures,
+                "total_rejected": self._total_rejected,
+                "last_error": self._last_error,
+            }
+
+
+# ============================================================
+# RETRIES
+# ============================================================
+def call_with_retries(fn, attempts: int = 3, attempt_timeout: float = None, deadline: Deadline = None,
+                      breaker: CircuitBreaker = None, base_delay: float = 0.5, max_delay: float = 4.0):
+    """Calls `fn(timeout)` up to `attempts` times with full-jitter
+    exponential backoff between failures.
+
+    Each attempt's timeout is `attempt_timeout` capped by the deadline;
+    no attempt starts, and no backoff sleeps, past the deadline. With a
+    breaker, every attempt is gated by it and reports its outcome to it.
+    Raises the last error, CircuitOpenError or DeadlineExceeded.
+    """
+    last_error = None
+    for attempt in range(max(1, attempts)):
+        timeout = cap_timeout(attempt_timeout, deadline)
+        if timeout is not None and timeout <= 0:
+            raise DeadlineExceeded("Request deadline reached") from last_error
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpenError(f"Circuit {breaker.name} is open") from last_error
+
+        try:
+            result = fn(timeout)
+        except Exception as e:
+            last_error = e
+            if breaker is not None:
+                breaker.record_failure(e)
+            logger.warning("Attempt %d/%d failed: %s", attempt + 1, attempts, e)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+        if attempt + 1 < attempts:
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            if deadline is not None and delay >= deadline.remaining():
+                break
+            time.sleep(delay)
+    raise last_error
@@ -0,0 +1,153 @@
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+
+import numpy as np
+
+from cascade import split_examples
+from multihead import HEADS, MULTIHEAD_DIR, MultiHeadClassifier, save_multihead
+from evaluate import resolve_model_source
+import model_store
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# MULTI-HEAD DISTILLATION
+# ============================================================
+# Trains the shared-encoder multi-head model to reproduce the four separate
+# classifiers. The teachers label the training part of the bundled
+# fake-news and SBIC sets (every text gets all four heads' targets); the
+# student starts from one teacher's encoder and learns from the teachers'
+# temperature-softened probabilities:
+#
+#   python distill_multihead.py --base political --epochs 2 --output /tmp/huggingface_models/multihead
+#
+# The held-out part is left for benchmark_multihead.py.
+DEFAULT_TEMPERATURE = 2.0
+
+
+def training_texts(limit: int = None):
+    """Training texts of both bundled sets, holdout excluded."""
+    texts = []
+    for stage in ("fake_news", "social"):
+        train, _ = split_examples(stage)
+        texts.extend(text for text, _ in train[:limit])
+    return texts
+
+
+def teacher_probs(texts, batch_size: int) -> dict:
+    """{head: array of shape (len(texts), labels)} from the separate models."""
+    import ml_analysis
+
+    ml_analysis.load_models(HEADS, use_multihead=False)
+    targets = {}
+    for name in HEADS:
+        started = time.monotonic()
+        rows = []
+        for start in range(0, len(texts), batch_size):
+            rows.extend(ml_analysis.predict_probs_batch(name, texts[start:start + batch_size]))
+        targets[name] = np.asarray(rows, dtype=np.float32)
+        logger.info("Teacher %s labelled %d texts in %.1fs", name, len(texts), time.monotonic() - started)
+    return targets
+
+
+def distillation_loss(logits, teacher, temperature: float):
+    """KL(teacher || student) on temperature-softened distributions, scaled by T^2."""
+    import torch.nn.functional as F
+
+    soft = teacher ** (1.0 / temperature)
+    soft = soft / soft.sum(dim=-1, keepdim=True)
+    log_student = F.log_softmax(logits / temperature, dim=-1)
+    return F.kl_div(log_student, soft, reduction="batchmean") * temperature ** 2
+
+
+def distill(base_path: str, texts, targets: dict, epochs: int = 2, batch_size: int = 16, lr: float = 5e-5,
+            temperature: float = DEFAULT_TEMPERATURE, max_length: int = 512, seed: int = 0):
+    """Returns (tokenizer, student) trained on `texts` against `targets`."""
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    torch.manual_seed(seed)
+    rng = random.Random(seed)
+    tokenizer = AutoTokenizer.from_pretrained(base_path)
+    # A sequence-classification checkpoint loads as its bare encoder.
+    model = MultiHeadClassifier(AutoModel.from_pretrained(base_path), {
+        name: targets[name].shape[1] for name in HEADS
+    })
+    model.train()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=lr)
+    target_tensors = {name: torch.from_numpy(targets[name]) for name in HEADS}
+
+    order = list(range(len(texts)))
+    for epoch in range(epochs):
+        rng.shuffle(order)
+        total, steps = 0.0, 0
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            inputs = tokenizer([texts[i] for i in batch], truncation=True, max_length=max_length,
+                               padding=True, return_tensors="pt")
+            logits = model(**inputs)
+            loss = sum(
+                distillation_loss(logits[name], target_tensors[name][batch], temperature) for name in HEADS
+            )
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += float(loss)
+            steps += 1
+            if steps % 50 == 0:
+                logger.info("Epoch %d step %d: loss %.4f", epoch + 1, steps, total / steps)
+        logger.info("Epoch %d finished: mean loss %.4f", epoch + 1, total / max(steps, 1))
+    model.eval()
+    return tokenizer, model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Distill the four classifiers into one multi-head model.")
+    parser.add_argument("--base", default="political",
+                        help="model whose encoder the student starts from (a model name or a directory)")
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--lr", type=float, default=5e-5)
+    parser.add_argument("--temperature", type=float, default=DEFAULT_TEMPERATURE)
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--limit", type=int, default=None, help="max training texts per dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--models", choices=["auto", "real", "tiny"], default="auto")
+    parser.add_argument("--output", default=MULTIHEAD_DIR)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    import ml_analysis
+
+    base_is_model = args.base in model_store.MODELS
+    source = resolve_model_source(args.models, list(HEADS) + ([args.base] if base_is_model else []))
+    base_path = model_store.prepare_models([args.base])[args.base] if base_is_model else args.base
+
+    texts = training_texts(args.limit)
+    targets = teacher_probs(texts, args.batch_size)
+    started = time.monotonic()
+    tokenizer, model = distill(base_path, texts, targets, args.epochs, args.batch_size, args.lr,
+                               args.temperature, args.max_length, args.seed)
+    metadata = {
+        "base": args.base,
+        "teachers": {name: ml_analysis.MODEL_VERSIONS[name] for name in HEADS},
+        "models": source,
+        "train_documents": len(texts),
+        "epochs": args.epochs,
+        "temperature": args.temperature,
+        "max_length": args.max_length,
+    }
+    save_multihead(model, tokenizer, args.output, metadata)
+
+    report = dict(metadata, output=args.output, train_seconds=round(time.monotonic() - started, 1))
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
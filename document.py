@@ -0,0 +1,194 @@
+import os
+import re
+import hashlib
+import threading
+import weakref
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+
+from result_cache import normalize_text, text_digest
+
+# ============================================================
+# PER-REQUEST DOCUMENT
+# ============================================================
+# A Document is the request text (it *is* a str, so every analyzer accepts
+# it unchanged) plus what the stages derive from it: the normalized text,
+# the word stream and its counts, and token IDs per tokenizer. Each is
+# computed once, by whichever stage asks first, and shared by the others;
+# stages running concurrently wait for that first computation instead of
+# repeating it.
+WORD_PATTERN = re.compile(r"\b\w+\b")
+
+# Tokenizer settings that change the IDs produced from the same vocab files.
+_TOKENIZER_SETTINGS = ("do_lower_case", "add_prefix_space", "strip_accents", "tokenize_chinese_chars")
+
+_tokenizer_keys = weakref.WeakKeyDictionary()
+_tokenizer_keys_lock = threading.Lock()
+
+
+class Document(str):
+
+    def __new__(cls, text: str):
+        if isinstance(text, Document):
+            return text
+        document = super().__new__(cls, text)
+        document._memo = {}
+        document._key_locks = {}
+        document._lock = threading.Lock()
+        return document
+
+    def __reduce__(self):
+        # Pickles (e.g. to spaCy worker processes) as the bare text.
+        return Document, (str(self),)
+
+    def memo(self, key, compute):
+        """compute() once per key; concurrent callers wait for the first.
+
+        A computation that raises is not stored, so the next caller retries.
+        """
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            if key not in self._memo:
+                self._memo[key] = compute()
+        return self._memo[key]
+
+    def forget(self, key):
+        """Drops a memoized value so the next memo() call computes it again."""
+        self._memo.pop(key, None)
+
+    @property
+    def text(self) -> str:
+        return str(self)
+
+    @property
+    def normalized(self) -> str:
+        return self.memo("normalized", lambda: normalize_text(self))
+
+    @property
+    def digest(self) -> str:
+        return self.memo("digest", lambda: text_digest(self))
+
+    @property
+    def words(self):
+        """Lowercased \\w+ words, as word repetition and tone count them."""
+        return self.memo("words", lambda: WORD_PATTERN.findall(self.lower()))
+
+    @property
+    def word_counts(self) -> Counter:
+        return self.memo("word_counts", lambda: Counter(self.words))
+
+    def token_ids(self, tokenizer):
+        """IDs of the whole text without special tokens; tokenizers with the
+        same vocab files share one tokenization."""
+        return self.memo(
+            ("token_ids", tokenizer_key(tokenizer)),
+            lambda: tokenizer(str(self), add_special_tokens=False, verbose=False)["input_ids"]
+        )
+
+
+def as_document(text) -> Document:
+    return text if isinstance(text, Document) else Document(text)
+
+
+class RecentDocuments:
+    """The last `max_entries` Documents by text, so separate calls for the
+    same text (e.g. stage batches arriving over the inference socket) share
+    one Document."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text) -> Document:
+        key = str(text)
+        with self._lock:
+            document = self._documents.get(key)
+            if document is None:
+                document = self._documents[key] = as_document(text)
+                while len(self._documents) > self.max_entries:
+                    self._documents.popitem(last=False)
+            else:
+                self._documents.move_to_end(key)
+            return document
+
+
+def memo_batch(documents, key, compute_many):
+    """Document.memo for a batch: one compute_many(documents) call covers
+    every document no other caller has claimed yet; the rest wait for
+    whoever claimed them first. compute_many returns one value per document,
+    in order. Values under `key` are Futures, so only read them through here.
+    """
+    futures, owned = [], []
+    for document in documents:
+        claimed = []
+        future = document.memo(key, lambda: claimed.append(True) or Future())
+        if claimed:
+            owned.append((document, future))
+        futures.append(future)
+
+    if owned:
+        try:
+            results = compute_many([document for document, _ in owned])
+        except BaseException as e:
+            for document, future in owned:
+                document.forget(key)
+                future.set_exception(e)
+            raise
+        for (_, future), result in zip(owned, results):
+            future.set_result(result)
+    return [future.result() for future in futures]
+
+
+def token_ids(tokenizer, text):
+    """Document.token_ids, or a one-off tokenization for a plain str."""
+    if isinstance(text, Document):
+        return text.token_ids(tokenizer)
+    return tokenizer(text, add_special_tokens=False, verbose=False)["input_ids"]
+
+
+# ============================================================
+# TOKENIZER IDENTITY
+# ============================================================
+def _hash_tokenizer(tokenizer) -> str:
+    digest = hashlib.sha256(type(tokenizer).__name__.encode("utf-8"))
+    init_kwargs = getattr(tokenizer, "init_kwargs", {}) or {}
+    for setting in _TOKENIZER_SETTINGS:
+        digest.update(f"{setting}={init_kwargs.get(setting)!r};".encode("utf-8"))
+
+    directory = getattr(tokenizer, "name_or_path", "") or ""
+    found = False
+    files = getattr(tokenizer, "vocab_files_names", {}) or {}
+    for name in sorted(set(files.values()) | {"tokenizer.json"}):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            found = True
+            digest.update(name.encode("utf-8"))
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+    if not found:
+        # No vocab on disk to compare: this tokenizer only matches itself.
+        return f"object-{id(tokenizer)}"
+    return digest.hexdigest()[:16]
+
+
+def tokenizer_key(tokenizer) -> str:
+    """Identifies a tokenizer by its vocab files (hashed once per tokenizer)."""
+    try:
+        return _tokenizer_keys[tokenizer]
+    except (KeyError, TypeError):
+        pass
+    key = _hash_tokenizer(tokenizer)
+    with _tokenizer_keys_lock:
+        try:
+            _tokenizer_keys[tokenizer] = key
+        except TypeError:
+            # Not weak-referenceable; hashed again next time.
+            pass
+    return key
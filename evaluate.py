@@ -0,0 +1,169 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import itertools
+import tempfile
+import numpy as np
+
+from datasets_io import iter_fake_news, iter_sbic
+import model_store
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# OFFLINE EVALUATION AND THROUGHPUT BENCHMARK
+# ============================================================
+# Streams the bundled datasets through the fake-news and SBIC classifiers
+# and writes quality (accuracy / macro F1) and performance (docs/sec,
+# per-batch latency, peak RSS) to one JSON file, so model or backend
+# changes can be compared run to run:
+#
+#   python evaluate.py --batch-size 16 --output eval_report.json
+#
+# When the real artifacts are unavailable, tiny random models stand in
+# (--models tiny forces this); their quality numbers are meaningless.
+TASKS = {
+    "fake_news": {"model": "fake_news", "reader": iter_fake_news},
+    "sbic": {"model": "sbic", "reader": iter_sbic},
+}
+
+TINY_MODELS_DIR = os.path.join(tempfile.gettempdir(), "clearify_tiny_models")
+
+
+def _batches(iterable, size: int):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def _gold_label(task: str, label, fake_label: bool) -> str:
+    if task == "fake_news":
+        return "fake" if label == fake_label else "real"
+    return label
+
+
+def _predicted_labels(task: str, probs_list):
+    import ml_analysis
+    if task == "fake_news":
+        return ["fake" if int(probs.argmax()) == 1 else "real" for probs in probs_list]
+    return [ml_analysis.sbic_label_map[int(probs.argmax())] for probs in probs_list]
+
+
+def _quality(gold, predicted) -> dict:
+    from sklearn.metrics import accuracy_score, f1_score
+    if not gold:
+        return {"accuracy": None, "macro_f1": None}
+    return {
+        "accuracy": round(float(accuracy_score(gold, predicted)), 4),
+        "macro_f1": round(float(f1_score(gold, predicted, average="macro", zero_division=0)), 4),
+    }
+
+
+def evaluate_task(task: str, batch_size: int, limit: int = None, fake_label: bool = True) -> dict:
+    import ml_analysis
+
+    spec = TASKS[task]
+    load_started = time.monotonic()
+    ml_analysis.load_models((spec["model"],))
+    load_seconds = time.monotonic() - load_started
+
+    gold, predicted, latencies = [], [], []
+    started = time.monotonic()
+    for batch in _batches(spec["reader"](limit=limit), batch_size):
+        texts = [text for text, _ in batch]
+        batch_started = time.monotonic()
+        probs_list = ml_analysis.predict_probs_batch(spec["model"], texts)
+        latencies.append(time.monotonic() - batch_started)
+        predicted.extend(_predicted_labels(task, probs_list))
+        gold.extend(_gold_label(task, label, fake_label) for _, label in batch)
+    elapsed = time.monotonic() - started
+
+    latencies_ms = np.asarray(latencies) * 1000
+    report = {
+        "task": task,
+        "model_version": ml_analysis.MODEL_VERSIONS.get(spec["model"]),
+        "documents": len(gold),
+        "batches": len(latencies),
+        "model_load_seconds": round(load_seconds, 3),
+        "docs_per_second": round(len(gold) / elapsed, 2) if elapsed > 0 else None,
+        "batch_latency_ms": {
+            "p50": round(float(np.percentile(latencies_ms, 50)), 2) if len(latencies) else None,
+            "p95": round(float(np.percentile(latencies_ms, 95)), 2) if len(latencies) else None,
+        },
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+    report.update(_quality(gold, predicted))
+    return report
+
+
+def resolve_model_source(mode: str, names) -> str:
+    """Returns "real" or "tiny"; switches model_store to tiny models if needed."""
+    if mode != "tiny":
+        try:
+            model_store.prepare_models(names)
+            return "real"
+        except Exception as e:
+            if mode == "real":
+                raise
+            logger.warning("Real model artifacts unavailable (%s); using tiny random models.", e)
+
+    from tiny_models import build_tiny_models
+    model_store.use_source(build_tiny_models(TINY_MODELS_DIR, names))
+    model_store.prepare_models(names)
+    return "tiny"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate classifiers on the bundled datasets.")
+    parser.add_argument("--tasks", nargs="+", choices=list(TASKS), default=list(TASKS))
+    parser.add_argument("--batch-size", type=int, default=16, help="sequences per forward pass")
+    parser.add_argument("--limit", type=int, default=None, help="max documents per task")
+    parser.add_argument("--models", choices=["auto", "real", "tiny"], default="auto")
+    parser.add_argument("--fake-label", choices=["true", "false"], default="true",
+                        help="value of the fake-news `label` field that marks a fake article")
+    parser.add_argument("--output", default="eval_report.json")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    # The micro-batcher reads its limit at import, so set it before ml_analysis loads.
+    os.environ["CLEARIFY_BATCH_MAX_SIZE"] = str(args.batch_size)
+
+    model_names = [TASKS[task]["model"] for task in args.tasks]
+    source = resolve_model_source(args.models, model_names)
+
+    from chunking import CHUNKING_SIGNATURE
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "models": source,
+        "batch_size": args.batch_size,
+        "limit": args.limit,
+        "chunking": CHUNKING_SIGNATURE,
+        "backends": os.getenv("CLEARIFY_MODEL_BACKENDS", ""),
+        "tasks": [
+            evaluate_task(task, args.batch_size, args.limit, args.fake_label == "true")
+            for task in args.tasks
+        ],
+    }
+    report["peak_rss_mb"] = _peak_rss_mb()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,171 @@
+import os
+import re
+import logging
+
+import lxml.html
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# EXTRACTOR CONFIGURATION
+# ============================================================
+# The fast path goes straight from HTML to body text with lxml and a
+# readability-style text/link density score. newspaper3k is only used when
+# the fast path returns fewer than MIN_FAST_CHARS characters.
+MIN_FAST_CHARS = int(os.getenv("CLEARIFY_EXTRACT_MIN_CHARS", "400"))
+FAST_EXTRACTION_ENABLED = os.getenv("CLEARIFY_FAST_EXTRACT", "1") != "0"
+
+# Never part of the article body.
+DROP_TAGS = (
+    "script", "style", "noscript", "template", "iframe", "svg", "canvas",
+    "button", "input", "select", "nav", "header", "footer", "aside",
+)
+# Words that mark page chrome rather than content. They are matched at the
+# start of a class name or id, or of one of its "-"/"_" separated parts
+# ("sidebar", "share-tools", "post_comments"), never in the middle of one.
+BOILERPLATE_PATTERN = re.compile(
+    r"comment(?!ary)|footer|sidebar|sidenav|nav|menu|share|sharing|social|related|promo|"
+    r"ads?$|advert|sponsor|cookie|consent|newsletter|subscribe|signup|"
+    r"breadcrumb|masthead|popup|modal|outbrain|taboola",
+    re.IGNORECASE,
+)
+CONTENT_PATTERN = re.compile(r"article|body|content|entry|main|post|story|text", re.IGNORECASE)
+
+BLOCK_TAGS = ("p", "h2", "h3", "h4", "li", "blockquote", "pre")
+MIN_BLOCK_CHARS = 25
+MAX_LINK_DENSITY = 0.5
+
+_WHITESPACE = re.compile(r"\s+")
+_NAME_PARTS = re.compile(r"[\s_-]+")
+
+
+def _clean(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _attributes(element) -> str:
+    return f"{element.get('class', '')} {element.get('id', '')}"
+
+
+def _link_density(element, text_length: int) -> float:
+    if not text_length:
+        return 0.0
+    link_chars = sum(len(_clean(a.text_content())) for a in element.iter("a"))
+    return link_chars / text_length
+
+
+def _inside_block(block, container) -> bool:
+    for ancestor in block.iterancestors():
+        if ancestor is container:
+            return False
+        if ancestor.tag in BLOCK_TAGS:
+            return True
+    return False
+
+
+def _is_boilerplate(attributes: str) -> bool:
+    if CONTENT_PATTERN.search(attributes):
+        return False
+    return any(BOILERPLATE_PATTERN.match(part) for part in _NAME_PARTS.split(attributes) if part)
+
+
+def _paragraph_chars(element) -> int:
+    total = 0
+    for paragraph in element.iter("p"):
+        length = len(_clean(paragraph.text_content()))
+        if length >= MIN_BLOCK_CHARS:
+            total += length
+    return total
+
+
+def _strip_boilerplate(root):
+    """Drops chrome by tag and by class/id. An element holding most of the
+    page's paragraph text is the article's wrapper, whatever its class says
+    ("layout has-sidebar"), and is kept."""
+    etree.strip_elements(root, etree.Comment, *DROP_TAGS, with_tail=False)
+    page_chars = _paragraph_chars(root)
+    for element in list(root.iter()):
+        if not isinstance(element.tag, str) or element.tag in ("html", "body"):
+            continue
+        if not _is_boilerplate(_attributes(element)):
+            continue
+        if page_chars and _paragraph_chars(element) * 2 > page_chars:
+            continue
+        element.drop_tree()
+
+
+def _best_container(root):
+    """Scores each paragraph's parent (and half to the grandparent) by
+    text length and comma count; returns the highest-scoring element."""
+    scores = {}
+    for paragraph in root.iter("p", "pre", "blockquote"):
+        text = _clean(paragraph.text_content())
+        if len(text) < MIN_BLOCK_CHARS:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = paragraph.getparent()
+        if parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0.0) + score
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0.0) + score / 2
+
+    best, best_score = None, 0.0
+    for element, score in scores.items():
+        if CONTENT_PATTERN.search(_attributes(element)):
+            score *= 1.25
+        text_length = len(_clean(element.text_content()))
+        score *= 1 - _link_density(element, text_length)
+        if score > best_score:
+            best, best_score = element, score
+    return best
+
+
+def extract_fast(html: str) -> str:
+    """Main body text of an HTML page via lxml density heuristics ("" if none)."""
+    if not html or not html.strip():
+        return ""
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return ""
+
+    _strip_boilerplate(root)
+    container = _best_container(root)
+    if container is None:
+        return ""
+
+    blocks = []
+    for block in container.iter(*BLOCK_TAGS):
+        # Nested blocks (a <p> inside an <li>) are emitted by the outer one.
+        if _inside_block(block, container):
+            continue
+        text = _clean(block.text_content())
+        if len(text) < MIN_BLOCK_CHARS and block.tag not in ("h2", "h3", "h4"):
+            continue
+        if _link_density(block, len(text)) > MAX_LINK_DENSITY:
+            continue
+        blocks.append(text)
+    return "\n\n".join(blocks)
+
+
+def extract_newspaper(html: str, url: str = "") -> str:
+    """The original newspaper3k path, parsing already-downloaded HTML."""
+    from newspaper import Article
+
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+    return article.text
+
+
+def extract_article_text(html: str, url: str = ""):
+    """Returns (text, method) where method is "fast" or "newspaper"."""
+    if FAST_EXTRACTION_ENABLED:
+        text = extract_fast(html)
+        if len(text) >= MIN_FAST_CHARS:
+            return text, "fast"
+        logger.debug("Fast extraction gave %d chars for %s; falling back to newspaper.", len(text), url)
+    return extract_newspaper(html, url), "newspaper"
@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import codecs
+import time
+import hashlib
+import logging
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# FETCHER CONFIGURATION
+# ============================================================
+CONNECT_TIMEOUT = float(os.getenv("CLEARIFY_FETCH_CONNECT_TIMEOUT_S", "5"))
+READ_TIMEOUT = float(os.getenv("CLEARIFY_FETCH_READ_TIMEOUT_S", "10"))
+# Wall-clock cap for the whole download; the read timeout alone only bounds
+# the gap between two packets, so a slow-dripping server could hold a
+# worker indefinitely.
+TOTAL_TIMEOUT = float(os.getenv("CLEARIFY_FETCH_TOTAL_TIMEOUT_S", "20"))
+MAX_BYTES = int(os.getenv("CLEARIFY_FETCH_MAX_BYTES", str(5 * 1024 * 1024)))
+
+POOL_SIZE = int(os.getenv("CLEARIFY_FETCH_POOL_SIZE", "32"))
+PER_HOST_LIMIT = int(os.getenv("CLEARIFY_FETCH_PER_HOST", "4"))
+FETCH_WORKERS = int(os.getenv("CLEARIFY_FETCH_WORKERS", "16"))
+
+# On-disk cache of responses that carry an ETag or Last-Modified header;
+# they are revalidated with a conditional request. Empty string disables it.
+CACHE_DIR = os.getenv("CLEARIFY_FETCH_CACHE_DIR", "/tmp/clearify_http_cache")
+
+USER_AGENT = os.getenv(
+    "CLEARIFY_FETCH_USER_AGENT",
+    "Mozilla/5.0 (compatible; ClearifyBot/1.0; +https://github.com/peter5454/Clearify)"
+)
+
+
+# Bytes searched for a <meta charset> declaration (HTML puts it first in <head>).
+META_SCAN_BYTES = 4096
+
+_HEADER_CHARSET = re.compile(r"charset\s*=\s*[\"']?([\w.:-]+)", re.I)
+_META_CHARSET = re.compile(
+    rb"<meta[^>]+charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I
+)
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"), (codecs.BOM_UTF16_BE, "utf-16"))
+
+
+class FetchError(Exception):
+    pass
+
+
+class FetchResult:
+    def __init__(self, url: str, status: int, html: str, from_cache: bool):
+        self.url = url
+        self.status = status
+        self.html = html
+        self.from_cache = from_cache
+
+
+# ============================================================
+# DECODING
+# ============================================================
+def _codec(label):
+    if not label:
+        return None
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
+
+
+def decode_body(body: bytes, content_type: str = "") -> str:
+    """Decodes an HTML body: byte-order mark, then an explicit charset in
+    the Content-Type header, then <meta charset>, then UTF-8, and finally
+    windows-1252.
+
+    requests assumes ISO-8859-1 for any text/html response without a
+    charset, which turns UTF-8 pages into mojibake, so its guess is not used.
+    """
+    for bom, encoding in _BOMS:
+        if body.startswith(bom):
+            return body.decode(encoding, errors="replace")
+
+    header_match = _HEADER_CHARSET.search(content_type or "")
+    meta_match = _META_CHARSET.search(body[:META_SCAN_BYTES])
+    declared = _codec(header_match.group(1) if header_match else None) or _codec(
+        meta_match.group(1).decode("ascii", "ignore") if meta_match else None
+    )
+    if declared:
+        return body.decode(declared, errors="replace")
+    try:
+        return body.decode("utf-8")
+    except UnicodeDecodeError:
+        return body.decode("cp1252", errors="replace")
+
+
+# ============================================================
+# FETCHER
+# ============================================================
+class Fetcher:
+    """Pooled HTTP client with per-host concurrency limits and a
+    conditional-request disk cache."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, total_timeout: float = TOTAL_TIMEOUT,
+                 per_host_limit: int = PER_HOST_LIMIT, pool_size: int = POOL_SIZE):
+        self.cache_dir = cache_dir
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.per_host_limit = per_host_limit
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = USER_AGENT
+
+        self._host_limits = {}
+        self._host_lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _host_semaphore(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        with self._host_lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_limits[host]
+
+    # ---------------- Disk cache ---------------- #
+    def _cache_paths(self, url: str):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key + ".json"), os.path.join(self.cache_dir, key + ".html")
+
+    def _cache_load(self, url: str):
+        if not self.cache_dir:
+            return None
+        meta_path, body_path = self._cache_paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, encoding="utf-8") as f:
+                meta["html"] = f.read()
+            return meta
+        except (OSError, ValueError):
+            return None
+
+    def _cache_store(self, url: str, etag, last_modified, html: str):
+        if not self.cache_dir or not (etag or last_modified):
+            return
+        meta_path, body_path = self._cache_paths(url)
+        for path, content in ((body_path, html),
+                              (meta_path, json.dumps({"url": url, "etag": etag, "last_modified": last_modified}))):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+    # ---------------- Fetch ---------------- #
+    @staticmethod
+    def _chunks(response, chunk_size: int = 64 * 1024):
+        # iter_content() waits for a full chunk, so a server dripping a few
+        # bytes at a time would only be noticed at the next read timeout;
+        # read1() (urllib3 2) returns whatever has arrived.
+        raw = response.raw
+        if not hasattr(raw, "read1"):
+            yield from response.iter_content(chunk_size=chunk_size)
+            return
+        while True:
+            chunk = raw.read1(chunk_size, decode_content=True)
+            if not chunk:
+                return
+            yield chunk
+
+    def _read_body(self, response, deadline: float) -> bytes:
+        chunks, size = [], 0
+        for chunk in self._chunks(response):
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > MAX_BYTES:
+                raise FetchError(f"Response larger than {MAX_BYTES} bytes")
+            if time.monotonic() > deadline:
+                raise FetchError(f"Download exceeded {self.total_timeout:g}s")
+        return b"".join(chunks)
+
+    def fetch(self, url: str, total_timeout: float = None) -> FetchResult:
+        """Downloads `url`, revalidating a cached copy when there is one."""
+        total_timeout = self.total_timeout if total_timeout is None else total_timeout
+        deadline = time.monotonic() + total_timeout
+        cached = self._cache_load(url)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        semaphore = self._host_semaphore(url)
+        if not semaphore.acquire(timeout=total_timeout):
+            raise FetchError(f"Timed out waiting for a connection slot for {url}")
+        try:
+            read_timeout = min(self.read_timeout, max(deadline - time.monotonic(), 0.1))
+            with self.session.get(url, headers=headers, stream=True,
+                                  timeout=(self.connect_timeout, read_timeout)) as response:
+                if response.status_code == 304 and cached:
+                    logger.debug("Not modified, serving cached copy of %s", url)
+                    return FetchResult(url, 304, cached["html"], from_cache=True)
+                response.raise_for_status()
+                body = self._read_body(response, deadline)
+                html = decode_body(body, response.headers.get("Content-Type", ""))
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                status = response.status_code
+        finally:
+            semaphore.release()
+
+        self._cache_store(url, etag, last_modified, html)
+        return FetchResult(url, status, html, from_cache=False)
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def get_fetcher() -> Fetcher:
+    """Process-wide Fetcher, created on first use (after any gunicorn fork)."""
+    global _default_fetcher
+    if _default_fetcher is None:
+        with _default_lock:
+            if _default_fetcher is None:
+                _default_fetcher = Fetcher()
+    return _default_fetcher
@@ -0,0 +1,23 @@
+import os
+import shutil
+
+# ============================================================
+# GUNICORN HOOKS
+# ============================================================
+# gunicorn reads this file from the working directory. With
+# PROMETHEUS_MULTIPROC_DIR set, the workers' metric files live there
+# (see metrics.py): samples left by a previous run are cleared before the
+# first worker starts, and a worker's live gauges are dropped when it exits.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+
+def on_starting(server):
+    if MULTIPROC_DIR:
+        shutil.rmtree(MULTIPROC_DIR, ignore_errors=True)
+        os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
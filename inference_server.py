@@ -0,0 +1,328 @@
+import os
+import sys
+import time
+import logging
+import secrets
+import argparse
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# INFERENCE SERVER CONFIGURATION
+# ============================================================
+# With CLEARIFY_INFERENCE_SOCKET set, the web workers do not load any model:
+# one inference process (python inference_server.py) holds spaCy, the
+# emotion pipeline and the four classifiers, and every gunicorn worker sends
+# its stage batches over this UNIX socket. Web concurrency then scales
+# without multiplying model memory. Unset, everything runs in-process as
+# before (the development default).
+#
+# Messages are pickles, so only authenticated peers may connect. The socket
+# lives in a private (0700) directory, and the handshake key is
+# CLEARIFY_INFERENCE_AUTHKEY or, when unset, a random key the server writes
+# next to the socket on each start (readable by its owner only).
+INFERENCE_SOCKET = os.getenv("CLEARIFY_INFERENCE_SOCKET", "")
+INFERENCE_AUTHKEY = os.getenv("CLEARIFY_INFERENCE_AUTHKEY", "").encode()
+DEFAULT_SOCKET = "/tmp/clearify_inference/inference.sock"
+AUTHKEY_FILE_NAME = "authkey"
+# How long a web worker waits for the server to come up (it loads the models first).
+CONNECT_TIMEOUT_SECONDS = float(os.getenv("CLEARIFY_INFERENCE_CONNECT_TIMEOUT_S", "300"))
+# "1": load the models in-process when the server cannot be reached at startup.
+INFERENCE_FALLBACK = os.getenv("CLEARIFY_INFERENCE_FALLBACK", "0") == "1"
+
+# Stage batches of one request arrive on separate connections; the server
+# keeps its most recent Documents so they still share tokenizations and the
+# multi-head encoder pass.
+RECENT_DOCUMENTS = int(os.getenv("CLEARIFY_INFERENCE_RECENT_DOCUMENTS", "256"))
+
+WARMUP_TEXT = "Clearify warm-up sentence about the economy and the election."
+
+
+class InferenceError(RuntimeError):
+    pass
+
+
+# ============================================================
+# LOCAL ANALYZERS
+# ============================================================
+def load_local_analyzers():
+    """Syncs and loads every model in this process.
+
+    Returns (analyzers, versions): stage name -> batch analyzer taking a list
+    of texts, and stage name -> cache version.
+    """
+    from model_store import prepare_models
+    from ml_analysis import (
+        analyze_political_bias_batch,
+        analyze_social_bias_batch,
+        analyze_fake_news_batch,
+        get_dbias_score_batch,
+        load_models,
+        MODEL_VERSIONS
+    )
+    from spacyanalyzer import (
+        analyze_entities_and_sentiment_batch,
+        analyze_word_repetition,
+        analyze_tone_batch,
+        SPACY_MODEL_VERSION,
+        emotion_model_version
+    )
+
+    prepare_models()
+    load_models()
+
+    analyzers = {
+        # Entities and sentiment come from a single spaCy parse.
+        "spacy": analyze_entities_and_sentiment_batch,
+        "political": analyze_political_bias_batch,
+        "social": analyze_social_bias_batch,
+        "dbias": get_dbias_score_batch,
+        "fake_news": analyze_fake_news_batch,
+        "repetition": lambda texts: [analyze_word_repetition(text) for text in texts],
+        "tone": analyze_tone_batch,
+    }
+    # Bump "repetition" when its logic changes.
+    versions = {
+        "spacy": SPACY_MODEL_VERSION,
+        "political": MODEL_VERSIONS["political"],
+        "social": MODEL_VERSIONS["sbic"],
+        "dbias": MODEL_VERSIONS["dbias"],
+        "fake_news": MODEL_VERSIONS["fake_news"],
+        "repetition": "v1",
+        "tone": emotion_model_version(),
+    }
+    return analyzers, versions
+
+
+# ============================================================
+# SOCKET DIRECTORY AND AUTHKEY
+# ============================================================
+def _socket_directory(path: str) -> str:
+    return os.path.dirname(os.path.abspath(path))
+
+
+def authkey_path(path: str) -> str:
+    return os.path.join(_socket_directory(path), AUTHKEY_FILE_NAME)
+
+
+def _private_directory(path: str) -> str:
+    """Creates the socket's directory, or checks an existing one, so that
+    only this user can reach the socket and the key file."""
+    directory = _socket_directory(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.stat(directory)
+    if info.st_uid != os.getuid() or info.st_mode & 0o077:
+        raise PermissionError(f"Socket directory {directory} must be owned by this user with mode 0700.")
+    return directory
+
+
+def _write_authkey(path: str) -> bytes:
+    key = secrets.token_hex(32).encode()
+    key_path = authkey_path(path)
+    tmp_path = key_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.unlink(tmp_path)
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    os.replace(tmp_path, key_path)
+    return key
+
+
+def read_authkey(path: str) -> bytes:
+    """CLEARIFY_INFERENCE_AUTHKEY, else the key the server wrote next to `path`."""
+    if INFERENCE_AUTHKEY:
+        return INFERENCE_AUTHKEY
+    try:
+        with open(authkey_path(path), "rb") as f:
+            key = f.read().strip()
+    except OSError as e:
+        raise InferenceError(f"No inference authkey (set CLEARIFY_INFERENCE_AUTHKEY or start the server): {e}") from e
+    if not key:
+        raise InferenceError(f"Empty inference authkey in {authkey_path(path)}")
+    return key
+
+
+# ============================================================
+# SERVER
+# ============================================================
+def _handle(conn, ops, versions):
+    """Answers one worker connection: (op, args) in, ("ok"|"error", value) out."""
+    with conn:
+        while True:
+            try:
+                op, args = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if op == "versions":
+                    reply = ("ok", versions)
+                else:
+                    reply = ("ok", ops[op](*args))
+            except Exception as e:
+                logger.exception("Inference op %s failed: %s", op, e)
+                reply = ("error", f"{type(e).__name__}: {e}")
+            try:
+                conn.send(reply)
+            except (EOFError, OSError):
+                return
+
+
+def serve(path: str = INFERENCE_SOCKET):
+    """Loads the models once and serves them on a UNIX socket until killed.
+
+    Each connection (one per worker thread) gets its own handler thread;
+    concurrent requests for the same model are merged into one forward
+    pass by the micro-batchers in ml_analysis.
+    """
+    if not path:
+        raise ValueError("No socket path; set CLEARIFY_INFERENCE_SOCKET or pass --socket.")
+    from prompt_builder import spacy_sentences
+    from document import RecentDocuments
+
+    started = time.monotonic()
+    analyzers, versions = load_local_analyzers()
+    # One pass per stage builds the lazy pipelines before the first request.
+    for name, analyzer in analyzers.items():
+        try:
+            analyzer([WARMUP_TEXT])
+        except Exception as e:
+            logger.warning("Warm-up of stage %s failed: %s", name, e)
+    # Texts become Documents shared by every stage asking about them, as in-process.
+    documents = RecentDocuments(RECENT_DOCUMENTS)
+    ops = {name: (lambda texts, analyzer=analyzer: analyzer([documents.get(text) for text in texts]))
+           for name, analyzer in analyzers.items()}
+    # The summary's sentence split reuses the parse the spacy stage made.
+    ops["sentences"] = lambda text: spacy_sentences(documents.get(text))
+    logger.info("Inference models ready in %.2fs.", time.monotonic() - started)
+
+    _private_directory(path)
+    authkey = INFERENCE_AUTHKEY or _write_authkey(path)
+    if os.path.exists(path):
+        os.unlink(path)
+    # The socket file is created 0600 rather than restricted after the fact.
+    old_umask = os.umask(0o177)
+    try:
+        listener = Listener(path, family="AF_UNIX", authkey=authkey)
+    finally:
+        os.umask(old_umask)
+    logger.info("Inference server listening on %s", path)
+    try:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                # A client that fails the handshake must not stop the server.
+                logger.warning("Rejected inference connection: %s", e)
+                continue
+            threading.Thread(target=_handle, args=(conn, ops, versions), daemon=True).start()
+    finally:
+        listener.close()
+
+
+# ============================================================
+# CLIENT
+# ============================================================
+class InferenceClient:
+    """Calls the inference server; safe to share between threads.
+
+    Connections are not thread-safe, so each thread keeps its own, and a
+    forked worker never reuses one opened by its parent.
+    """
+
+    def __init__(self, path: str = INFERENCE_SOCKET, authkey: bytes = None):
+        self.path = path
+        # None: read per connection, so a restarted server's new key is picked up.
+        self.authkey = authkey
+        self._local = threading.local()
+
+    def _connection(self):
+        conn, pid = getattr(self._local, "conn", None), getattr(self._local, "pid", None)
+        if conn is None or pid != os.getpid():
+            conn = Client(self.path, family="AF_UNIX", authkey=self.authkey or read_authkey(self.path))
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None and getattr(self._local, "pid", None) == os.getpid():
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def call(self, op: str, *args):
+        # Inference is idempotent, so a request on a broken connection (e.g.
+        # the server restarted) is sent once more on a fresh one.
+        for attempt in range(2):
+            try:
+                conn = self._connection()
+                conn.send((op, args))
+                status, value = conn.recv()
+                break
+            except (EOFError, OSError, AuthenticationError) as e:
+                self._drop_connection()
+                if attempt:
+                    raise InferenceError(f"Inference server unavailable at {self.path}: {e}") from e
+        if status == "error":
+            raise InferenceError(value)
+        return value
+
+    def versions(self) -> dict:
+        return self.call("versions")
+
+    def sentences(self, text: str):
+        return self.call("sentences", text)
+
+    def analyzers(self, names) -> dict:
+        # Documents travel as plain text; the server builds its own.
+        return {name: (lambda texts, name=name: self.call(name, [str(text) for text in texts])) for name in names}
+
+    def wait_until_ready(self, timeout: float = None) -> dict:
+        """Stage versions, once the server answers; raises InferenceError
+        after `timeout` (default CONNECT_TIMEOUT_SECONDS)."""
+        give_up_at = time.monotonic() + (CONNECT_TIMEOUT_SECONDS if timeout is None else timeout)
+        while True:
+            try:
+                return self.versions()
+            except InferenceError as e:
+                if time.monotonic() >= give_up_at:
+                    raise
+                logger.info("Waiting for the inference server: %s", e)
+                time.sleep(1.0)
+
+
+def load_analysis_backend():
+    """(analyzers, versions) for the web app: the inference server when
+    CLEARIFY_INFERENCE_SOCKET is set, otherwise models loaded in-process."""
+    if INFERENCE_SOCKET:
+        client = InferenceClient(INFERENCE_SOCKET)
+        try:
+            versions = client.wait_until_ready()
+        except InferenceError as e:
+            if not INFERENCE_FALLBACK:
+                raise
+            logger.warning("Inference server unreachable (%s); loading the models in-process.", e)
+        else:
+            from prompt_builder import use_sentence_splitter
+            use_sentence_splitter(client.sentences)
+            logger.info("Using the inference server at %s", INFERENCE_SOCKET)
+            return client.analyzers(versions), versions
+    return load_local_analyzers()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Clearify models to the web workers over a UNIX socket.")
+    parser.add_argument("--socket", default=INFERENCE_SOCKET or DEFAULT_SOCKET)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    serve(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,31 @@
 import os
 import re
 import json
+import time
 import logging
-from flask import Flask, render_template, request, jsonify
-from scraper import scrape_article
-from spacyanalyzer import extract_entities, analyze_sentiment, analyze_word_repetition, analyze_tone
-from ml_analysis import (
-    analyze_political_bias,
-    analyze_social_bias,
-    analyze_fake_news,
-    get_dbias_score
+from flask import Flask, render_template, request, jsonify, Response, stream_with_context, g, url_for
+from scraper import scrape_article, scrape_articles
+from inference_server import load_analysis_backend
+from cascade import cascade_analyzers, split_decision
+from database import FeedbackBufferFull, check_db_health, feedback_buffer, save_feedback
+from stages import run_stages, iter_stages, map_concurrent
+from result_cache import result_cache
+from document import Document
+from sse import sse_comment, sse_event
+from near_duplicate import NEAR_DUP_ENABLED, near_duplicates
+from summarizer import (
+    SUMMARY_MODEL_ID,
+    GEMINI_ATTEMPTS,
+    GEMINI_ATTEMPT_TIMEOUT_SECONDS,
+    derive_final_verdict,
+    gemini_breaker,
+    is_fallback_summary,
+    summarize_clearify_results,
+    summary_tickets
 )
-from database import save_feedback, check_db_health
-import google.genai as genai
+from deadline import REQUEST_DEADLINE_SECONDS, Deadline
+from metrics import (CONTENT_TYPE as METRICS_CONTENT_TYPE, METRICS_ENABLED, REQUEST_SECONDS, STAGE_SECONDS,
+                     refresh_process_metrics, render_metrics)
 
 from database import get_db_connection
 
@@ -27,150 +40,467 @@ logger = logging.getLogger(__name__)
 os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
 
-# ---------------- Gemini Client ---------------- #
-gemini_api_key = os.getenv("GOOGLE_API_KEY")
-genai_client = None
-
-if not gemini_api_key:
-    logger.error("GOOGLE_API_KEY not found in environment. Gemini functionality will fail.")
-else:
-    try:
-        # Note: You were using genai.Client(api_key=...) which is the correct syntax for google-genai
-        genai_client = genai.Client(api_key=gemini_api_key)
-        logger.info("Gemini client initialized successfully.")
-    except Exception as e:
-        logger.exception(f"Failed to initialize Gemini Client: {e}")
-        genai_client = None
-
-def get_gemini_client():
-    if genai_client is None:
-        raise RuntimeError("Gemini Client not configured or failed to initialize.")
-    return genai_client
+# ---------------- Model Preparation ---------------- #
+# Sync every model artifact (skipping files that are already current) and
+# load the classifiers before serving. With gunicorn --preload this runs once
+# in the master process. With CLEARIFY_INFERENCE_SOCKET set, the models live
+# in the inference server instead and this only waits for it to answer.
+ANALYZERS, ANALYZER_VERSIONS = load_analysis_backend()
 
 # ---------------- Flask App ---------------- #
 app = Flask(__name__)
 
-# ---------------- Analysis Functions ---------------- #
-def derive_final_verdict(political, social, fake_news, dbias_score):
-    votes = {"left": 0, "center": 0, "right": 0}
-
-    p_label = political.get("prediction", "center")
-    p_conf = political.get("confidence", 0)
-    votes[p_label] += p_conf
+# ---------------- Analysis Stages ---------------- #
+# Used in place of a stage's result when it fails or times out, so one slow
+# analyzer does not take down the whole response.
+STAGE_FALLBACKS = {
+    "spacy": {"entities": [], "sentiment": ("Neutral", 50.0)},
+    "political": {"prediction": "center", "confidence": 0.0},
+    "social": {"bias_category": "none", "confidence": 0.0},
+    "dbias": (0.0, "error"),
+    "fake_news": 0.0,
+    "repetition": [],
+    "tone": {},
+}
+
+# Cache version of each stage: the model artifact behind it, or a code
+# version for the pure-Python analyzers (see inference_server.load_local_analyzers).
+STAGE_VERSIONS = dict(ANALYZER_VERSIONS)
+
+def _is_cacheable(stage, result):
+    # get_dbias_score reports its own failures as a result; don't keep those.
+    return not (stage == "dbias" and result[1] == "error")
+
+# Every analyzer takes a list of texts, so a single /analyze request and a
+# chunk of /analyze_batch share one code path; within a stage the texts go
+# through the models as real batches (in the inference server, if one is used).
+BATCH_ANALYZERS = {name: ANALYZERS[name] for name in STAGE_FALLBACKS}
+# CLEARIFY_CASCADE=1: a cheap linear model answers the confident texts of the
+# fake news and social stages; their results then carry who decided (see
+# cascade.split_decision), reported as "decided_by" in the response.
+cascade_analyzers(BATCH_ANALYZERS, STAGE_VERSIONS)
+
+def _cached_stage(name, analyzer, texts, digests, cache_status):
+    """A stage callable that only computes the texts its model version has
+    not already scored; records "hit"/"miss" per text in `cache_status`."""
+    def run():
+        results, misses = [None] * len(texts), []
+        for i, digest in enumerate(digests):
+            hit, value = result_cache.get(name, STAGE_VERSIONS[name], digest)
+            if hit:
+                results[i], cache_status[i][name] = value, "hit"
+            else:
+                misses.append(i)
+        if misses:
+            with STAGE_SECONDS.labels(stage=name).time():
+                computed = analyzer([texts[i] for i in misses])
+            for i, value in zip(misses, computed):
+                results[i], cache_status[i][name] = value, "miss"
+                if _is_cacheable(name, value):
+                    result_cache.put(name, STAGE_VERSIONS[name], digests[i], value)
+        return results
+    return run
+
+def run_analysis_stages_batch(texts, digests, deadline=None):
+    """Runs all independent analyzers concurrently over a list of texts.
+
+    Returns one (results, errors, cache_status) tuple per text; each stage
+    only computes the texts its model version has not already scored.
+    Stages still running at the request deadline get their fallback. The
+    texts become Documents, so stages share the words and tokenizations.
+    """
+    texts = [Document(text) for text in texts]
+    cache_status = [{} for _ in texts]
+    results, errors = run_stages({
+        name: _cached_stage(name, fn, texts, digests, cache_status) for name, fn in BATCH_ANALYZERS.items()
+    }, deadline)
+    per_text = []
+    for i in range(len(texts)):
+        text_results, decided_by = {}, {}
+        for name in BATCH_ANALYZERS:
+            if name in errors:
+                text_results[name] = STAGE_FALLBACKS[name]
+                cache_status[i].setdefault(name, "miss")
+            else:
+                text_results[name], decider = split_decision(results[name][i])
+                if decider:
+                    decided_by[name] = decider
+        if decided_by:
+            text_results["decided_by"] = decided_by
+        remember_analysis(texts[i], digests[i], text_results, errors)
+        per_text.append((text_results, dict(errors), cache_status[i]))
+    return per_text
+
+# ---------------- Near-Duplicate Reuse ---------------- #
+# The stage results of every fully analyzed text are kept under its digest;
+# a later text that the MinHash index finds near-identical (a syndicated
+# copy with other headers or ads) reuses them instead of running the models.
+def analysis_version():
+    return "|".join(STAGE_VERSIONS[name] for name in BATCH_ANALYZERS)
+
+def remember_analysis(text, digest, stage_results, stage_errors):
+    # Results the per-stage cache would refuse (e.g. a Dbias "error") are
+    # not handed on to near-duplicates either.
+    if not NEAR_DUP_ENABLED or stage_errors:
+        return
+    if all(_is_cacheable(name, result) for name, result in stage_results.items()):
+        result_cache.put("analysis", analysis_version(), digest, stage_results)
+        near_duplicates.add(digest, text)
+
+def reuse_near_duplicate(text):
+    """(match, stage_results) of an earlier near-identical text, or (None, None)."""
+    if not NEAR_DUP_ENABLED:
+        return None, None
+    match = near_duplicates.lookup(text)
+    if match is None:
+        return None, None
+    hit, stage_results = result_cache.get("analysis", analysis_version(), match.doc_id)
+    if not hit:
+        return None, None
+    logger.info("Reusing analysis %s (similarity %.3f).", match.doc_id[:12], match.similarity)
+    return match, stage_results
+
+def near_duplicate_info(match):
+    return {"doc_id": match.doc_id, "similarity": round(match.similarity, 4)}
+
+def run_analysis_stages(text, digest, deadline=None):
+    """Single-text run_analysis_stages_batch; returns (results, errors, cache_status)."""
+    return run_analysis_stages_batch([text], [digest], deadline)[0]
+
+def iter_analysis_stages(text, digest, deadline=None):
+    """Runs the analyzers for one text, yielding (name, result, error,
+    cache_status, decided_by) as each stage finishes; failed stages yield
+    their fallback. decided_by is None outside cascaded stages."""
+    text, cache_status = Document(text), [{}]
+    stages = {
+        name: _cached_stage(name, fn, [text], [digest], cache_status) for name, fn in BATCH_ANALYZERS.items()
+    }
+    for name, results, error in iter_stages(stages, deadline):
+        if error is None:
+            result, decider = split_decision(results[0])
+            yield name, result, None, cache_status[0][name], decider
+        else:
+            yield name, STAGE_FALLBACKS[name], error, cache_status[0].get(name, "miss"), None
+
+def summary_version():
+    """The summary depends on Gemini and on every score fed into it."""
+    parts = [SUMMARY_MODEL_ID] + [STAGE_VERSIONS[name] for name in ("political", "social", "dbias", "fake_news")]
+    return "|".join(parts)
+
+def summary_signal_words(stage_results):
+    """Words behind the scores, used to rank sentences when the prompt is compacted."""
+    words = [item["word"] for item in stage_results.get("repetition") or []]
+    category = stage_results["social"].get("bias_category")
+    if category and category != "none":
+        words.append(category)
+    return words
+
+def cached_summary(text, digest, political, social, fake_news, dbias_score, dbias_label, signal_words=(),
+                   deadline=None):
+    """summarize_clearify_results behind the result cache.
+
+    Returns (gemini_summary, final_verdict, votes, "hit" | "miss" | "fallback").
+    Local fallback summaries (Gemini failed, circuit open or deadline
+    reached) are not cached.
+    """
+    hit, gemini_summary = result_cache.get("summary", summary_version(), digest)
+    if hit:
+        final_verdict, votes = derive_final_verdict(political, social, fake_news, dbias_score)
+        return gemini_summary, final_verdict, votes, "hit"
 
-    if social.get("bias_category") in ["race", "gender", "social", "culture"]:
-        votes["center"] -= 0.2
-        votes["left"] += 0.1
-        votes["right"] += 0.1
-    else:
-        votes["center"] += 0.2
-
-    if dbias_score > 60:
-        votes["center"] -= 0.3
-        votes["left"] += 0.2
-        votes["right"] += 0.2
-
-    if fake_news > 70:
-        votes["center"] -= 0.2
-        votes["left"] += 0.1
-        votes["right"] += 0.1
-
-    final_verdict = max(votes, key=votes.get)
-    return final_verdict, votes
-
-def summarize_clearify_results(text, political, social, fake_news, dbias_score, dbias_label):
-    client = get_gemini_client()
-    final_verdict, votes = derive_final_verdict(political, social, fake_news, dbias_score)
-
-    analysis = {
-        "input_text": text,
-        "political_bias": political,
-        "social_bias": social,
-        "fake_news_score": fake_news,
-        "dbias": {"score": dbias_score, "label": dbias_label},
+    with STAGE_SECONDS.labels(stage="summary").time():
+        gemini_summary, final_verdict, votes = summarize_clearify_results(
+            text, political, social, fake_news, dbias_score, dbias_label, signal_words, deadline
+        )
+    if is_fallback_summary(gemini_summary):
+        return gemini_summary, final_verdict, votes, "fallback"
+    result_cache.put("summary", summary_version(), digest, gemini_summary)
+    return gemini_summary, final_verdict, votes, "miss"
+
+def build_final_result(text, stage_results, stage_errors, cache_status, gemini_summary, final_verdict, votes):
+    """Assembles the /analyze response body from the stage outputs."""
+    bias_score, bias_label = stage_results["dbias"]
+    tone_result = stage_results["tone"]
+    sentiment_label, sentiment_percentage = stage_results["spacy"]["sentiment"]
+
+    final_result = {
+        "words_analyzed": len(text.split()),
+        "bias_score": bias_score,
+        "bias_label": bias_label,
+        "fake_news_risk": stage_results["fake_news"],
+        "emotional_words_percentage": tone_result.get("emotional_words_percentage", 0),
+        "positive_sentiment": sentiment_percentage if sentiment_label == "Positive" else 0,
+        "negative_sentiment": sentiment_percentage if sentiment_label == "Negative" else 0,
+        "word_repetition": stage_results["repetition"],
+        "overall_tone": tone_result.get("tone", ""),
+        "political_analysis": stage_results["political"],
+        "social_bias_analysis": stage_results["social"],
+        "final_verdict": final_verdict,
         "weighted_votes": votes,
-        "final_verdict": final_verdict
+        "gemini_summary": gemini_summary,
+        "cache": cache_status
     }
+    if stage_results.get("decided_by"):
+        final_result["decided_by"] = stage_results["decided_by"]
+    # Sentence tone mode (CLEARIFY_TONE_MODE=sentence) adds per-sentence emotions.
+    if tone_result.get("trajectory") is not None:
+        final_result["tone_trajectory"] = tone_result["trajectory"]
+    if stage_errors:
+        final_result["stage_errors"] = stage_errors
+    return final_result
+
+def summarize_stage_results(text, digest, stage_results, cache_status, include_summary=True, deadline=None):
+    """Runs (or skips) the Gemini summary; returns (gemini_summary, final_verdict, votes)."""
+    political_result = stage_results["political"]
+    sbic_result = stage_results["social"]
+    fake_news_score = stage_results["fake_news"]
+    bias_score, bias_label = stage_results["dbias"]
+
+    if not include_summary:
+        final_verdict, votes = derive_final_verdict(political_result, sbic_result, fake_news_score, bias_score)
+        return None, final_verdict, votes
+
+    gemini_summary, final_verdict, votes, cache_status["summary"] = cached_summary(
+        text,
+        digest,
+        political_result,
+        sbic_result,
+        fake_news_score,
+        bias_score,
+        bias_label,
+        summary_signal_words(stage_results),
+        deadline
+    )
+    return gemini_summary, final_verdict, votes
 
-    prompt = f"""
-    You are an unbiased political content summarizer.
-    Here is raw analysis data from Clearify (including weighted votes):
-
-    {analysis}
-
-    Generate a concise summary with:
-    - overall_summary
-    - political_bias_summary
-    - social_bias_summary
-    - fake_news_summary
-    - final_verdict
-
-    Return ONLY JSON.
+# ---------------- Async Summary ---------------- #
+# "sync" blocks /analyze on Gemini as before; "async" returns the local
+# scores at once with a summary ticket. Requests may override the default
+# with a summary_mode form field or query parameter.
+SUMMARY_MODE = os.getenv("CLEARIFY_SUMMARY_MODE", "sync")
+SUMMARY_EVENTS_TIMEOUT_SECONDS = float(os.getenv("CLEARIFY_SUMMARY_EVENTS_TIMEOUT_S", "120"))
+SUMMARY_EVENTS_KEEPALIVE_SECONDS = 15.0
+_TICKET_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def start_summary(text, digest, stage_results, cache_status):
+    """Async counterpart of summarize_stage_results.
+
+    Returns (gemini_summary, final_verdict, votes, ticket): a cached summary
+    comes back immediately with no ticket; otherwise the summary is queued
+    and gemini_summary is None. The text digest doubles as the ticket id.
     """
-
+    political_result = stage_results["political"]
+    sbic_result = stage_results["social"]
+    fake_news_score = stage_results["fake_news"]
+    bias_score, bias_label = stage_results["dbias"]
+    final_verdict, votes = derive_final_verdict(political_result, sbic_result, fake_news_score, bias_score)
+
+    hit, gemini_summary = result_cache.get("summary", summary_version(), digest)
+    if hit:
+        cache_status["summary"] = "hit"
+        return gemini_summary, final_verdict, votes, None
+
+    cache_status["summary"] = "pending"
+    ticket = summary_tickets.submit(
+        lambda: cached_summary(
+            text, digest, political_result, sbic_result, fake_news_score, bias_score, bias_label,
+            summary_signal_words(stage_results)
+        )[0],
+        ticket_id=digest
+    )
+    return None, final_verdict, votes, ticket
+
+def summary_state(ticket):
+    """Ticket state from this worker, or from the result cache when the
+    summary was produced (or the ticket issued) by another worker."""
+    state = summary_tickets.get(ticket)
+    if state is None and _TICKET_PATTERN.match(ticket):
+        hit, gemini_summary = result_cache.get("summary", summary_version(), ticket)
+        if hit:
+            state = {"ticket": ticket, "status": "done", "gemini_summary": gemini_summary}
+    return state
+
+# ---------------- Streamed Analysis ---------------- #
+VERDICT_STAGES = ("political", "social", "fake_news", "dbias")
+
+def _stage_events(name, result):
+    """(event, payload) pairs announcing one finished stage."""
+    if name == "spacy":
+        return [("entities", result["entities"]), ("sentiment", result["sentiment"])]
+    return [(name, result)]
+
+def _stream_analysis(text, include_summary, deadline=None):
+    """Yields the SSE messages of /analyze/stream."""
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash", # Switched to 2.5-flash since 2.0-flash is not a standard name
-            contents=[prompt]
+        text = Document(text)
+        digest = text.digest
+        yield sse_event("start", {"words_analyzed": len(text.split())})
+
+        match, prior = reuse_near_duplicate(text)
+        if match:
+            summary_digest = match.doc_id
+            stage_events = (
+                (name, prior[name], None, "near_duplicate", (prior.get("decided_by") or {}).get(name))
+                for name in BATCH_ANALYZERS
+            )
+        else:
+            summary_digest = digest
+            stage_events = iter_analysis_stages(text, digest, deadline)
+
+        stage_results, stage_errors, cache_status = {}, {}, {}
+        for name, result, error, status, decider in stage_events:
+            stage_results[name], cache_status[name] = result, status
+            if error is not None:
+                stage_errors[name] = error
+            if decider:
+                stage_results.setdefault("decided_by", {})[name] = decider
+            for event, payload in _stage_events(name, result):
+                data = {"stage": event, "result": payload, "cache": status}
+                if decider:
+                    data["decided_by"] = decider
+                if error is not None:
+                    data["error"] = error
+                yield sse_event(event, data)
+
+            if name in VERDICT_STAGES and all(stage in stage_results for stage in VERDICT_STAGES):
+                bias_score, _ = stage_results["dbias"]
+                final_verdict, votes = derive_final_verdict(
+                    stage_results["political"], stage_results["social"], stage_results["fake_news"], bias_score
+                )
+                yield sse_event("verdict", {"final_verdict": final_verdict, "weighted_votes": votes})
+
+        if not match:
+            remember_analysis(text, digest, stage_results, stage_errors)
+        gemini_summary, final_verdict, votes = summarize_stage_results(
+            text, summary_digest, stage_results, cache_status, include_summary, deadline
         )
-        # Note: Using .text property for robustness, which is standard on the response object
-        gemini_text = getattr(response, "text", "").strip() 
-        logger.info("Gemini API call successful.")
+        if include_summary:
+            yield sse_event("summary", {"gemini_summary": gemini_summary, "cache": cache_status.get("summary")})
+
+        final_result = build_final_result(
+            text, stage_results, stage_errors, cache_status, gemini_summary, final_verdict, votes
+        )
+        if match:
+            final_result["near_duplicate"] = near_duplicate_info(match)
+        yield sse_event("result", final_result)
+        logger.info("Streamed analysis completed.")
     except Exception as e:
-        logger.exception(f"Gemini API call failed: {e}")
-        return {
-            "overall_summary": f"Error: Gemini API call failed: {e}",
-            "political_bias_summary": "N/A",
-            "social_bias_summary": "N/A",
-            "fake_news_summary": "N/A",
-            "final_verdict": final_verdict
-        }, final_verdict, votes
-
-    # ------------------ DEBUG LOGGING ADDED HERE ------------------
-    # The full output is logged, allowing us to see why JSON parsing failed.
-    logger.info("DEBUG: Gemini Raw Text Length: %d", len(gemini_text))
-    # Log the full text (up to 2000 chars to avoid overwhelming logs)
-    logger.info("DEBUG: Gemini Full Raw Text: \n%s", gemini_text[:2000]) 
-    # --------------------------------------------------------------
-
-    parsed = None
+        logger.exception("Error during streamed analysis: %s", e)
+        yield sse_event("error", {"error": f"Analysis failed: {e}"})
+
+# ---------------- Bulk Analysis ---------------- #
+BATCH_CHUNK_SIZE = int(os.getenv("CLEARIFY_ANALYZE_BATCH_CHUNK", "32"))
+
+def _iter_jsonl(stream):
+    """Yields one item per non-empty JSONL line; bad lines become error items."""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield {"_error": f"Invalid JSON on line {line_number}: {e}"}
+
+def _iter_chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _result_line(item_id, result=None, error=None):
+    line = {"id": item_id, "result": result}
+    if error:
+        line["error"] = error
+    return json.dumps(line) + "\n"
+
+def _analyze_chunk(chunk, include_summary, deadline=None):
+    """Yields one JSONL line per item of the chunk as soon as it is ready.
+
+    Scraping, the stages and the summaries of the chunk share `deadline`,
+    so one slow URL or model cannot hold the batch past it.
+    """
+    ids, texts, errors, urls = [], [None] * len(chunk), [None] * len(chunk), {}
+    for i, item in enumerate(chunk):
+        if not isinstance(item, dict):
+            ids.append(None)
+            errors[i] = "Item must be a JSON object."
+            continue
+        ids.append(item.get("id"))
+        if item.get("_error"):
+            errors[i] = item["_error"]
+        elif item.get("text"):
+            texts[i] = item["text"]
+        elif item.get("url"):
+            urls[i] = item["url"]
+        else:
+            errors[i] = "Item needs a text or url field."
+
+    url_indices = list(urls)
+    for i, text in zip(url_indices, scrape_articles([urls[i] for i in url_indices], deadline=deadline)):
+        if text:
+            texts[i] = text
+        else:
+            errors[i] = "Failed to scrape text from the provided URL."
+
+    for i, text in enumerate(texts):
+        if errors[i] is None and not (text and text.strip()):
+            errors[i] = "Empty text provided."
+        if errors[i] is not None:
+            yield _result_line(ids[i], error=errors[i])
+
+    ready = [i for i in range(len(chunk)) if errors[i] is None]
+    if not ready:
+        return
+
+    for i in ready:
+        texts[i] = Document(texts[i])
+    digests = {i: texts[i].digest for i in ready}
     try:
-        # First attempt: parse the whole response
-        parsed = json.loads(gemini_text)
+        per_text = run_analysis_stages_batch([texts[i] for i in ready], [digests[i] for i in ready], deadline)
     except Exception as e:
-        logger.warning("JSON direct parse failed: %s", e)
-        try:
-            # Second attempt: use regex to strip out everything before the first { and after the last }
-            # This handles markdown code fences (```json ... ```) and leading/trailing text.
-            match = re.search(r"(\{[\s\S]*\})", gemini_text)
-            if match:
-                parsed = json.loads(match.group(1))
-                logger.info("JSON regex parse succeeded.")
-            else:
-                logger.warning("JSON regex failed to find JSON object.")
-        except Exception as e:
-            logger.warning("JSON regex parse also failed: %s", e)
-            parsed = None
-
-    if isinstance(parsed, dict):
-        gemini_summary = {
-            "overall_summary": parsed.get("overall_summary"),
-            "political_bias_summary": parsed.get("political_bias_summary"),
-            "social_bias_summary": parsed.get("social_bias_summary"),
-            "fake_news_summary": parsed.get("fake_news_summary"),
-            "final_verdict": parsed.get("final_verdict", final_verdict)
-        }
-    else:
-        logger.warning("Final JSON parsing failed. Returning raw text as summary.")
-        gemini_summary = {
-            "overall_summary": gemini_text, # Return the raw text so we can see it in the final result
-            "political_bias_summary": None,
-            "social_bias_summary": None,
-            "fake_news_summary": None,
-            "final_verdict": final_verdict
-        }
+        logger.exception("Batch analysis failed: %s", e)
+        for i in ready:
+            yield _result_line(ids[i], error=f"Analysis failed: {e}")
+        return
+    outputs = dict(zip(ready, per_text))
+
+    def finish(i):
+        stage_results, stage_errors, cache_status = outputs[i]
+        gemini_summary, final_verdict, votes = summarize_stage_results(
+            texts[i], digests[i], stage_results, cache_status, include_summary, deadline
+        )
+        return build_final_result(
+            texts[i], stage_results, stage_errors, cache_status, gemini_summary, final_verdict, votes
+        )
 
-    return gemini_summary, final_verdict, votes
+    for j, result, error in map_concurrent(finish, ready):
+        i = ready[j]
+        yield _result_line(ids[i], result=result, error=error and f"Analysis failed: {error}")
+
+def _stream_batch_results(items, include_summary):
+    # Each chunk gets a full request deadline of its own: a long batch is
+    # bounded per chunk, not cut off after the first.
+    for chunk in _iter_chunks(items, BATCH_CHUNK_SIZE):
+        yield from _analyze_chunk(chunk, include_summary, Deadline())
+
+# ---------------- Request Metrics ---------------- #
+@app.before_request
+def _start_request_timer():
+    if METRICS_ENABLED:
+        g.request_started = time.perf_counter()
+
+@app.teardown_request
+def _observe_request_time(exc):
+    started = g.pop("request_started", None)
+    if started is not None:
+        REQUEST_SECONDS.labels(endpoint=request.endpoint or "unknown").observe(time.perf_counter() - started)
+        # Keeps this worker's memory gauge current for scrapes answered by another worker.
+        refresh_process_metrics()
 
 # ---------------- Routes ---------------- #
 @app.route('/')
@@ -181,76 +511,117 @@ def home():
 @app.route("/health/db")
 def db_health_route():
     healthy = check_db_health()
+    # Rows accepted by /submit_feedback but not yet written.
+    buffer = feedback_buffer.snapshot()
     if healthy:
-        return jsonify({"database": "OK"}), 200
+        return jsonify({"database": "OK", "feedback_buffer": buffer}), 200
     else:
-        return jsonify({"database": "ERROR"}), 500
+        return jsonify({"database": "ERROR", "feedback_buffer": buffer}), 500
+
 
+@app.route("/metrics")
+def metrics_route():
+    if not METRICS_ENABLED:
+        return jsonify({"error": "Metrics are disabled; set CLEARIFY_METRICS=1."}), 404
+    return Response(render_metrics(), content_type=METRICS_CONTENT_TYPE)
 
 @app.route('/about')
 def about():
     logger.info("Serving about page.")
     return render_template('about.html')
 
-@app.route('/analyze', methods=['POST'])
-def analyze():
+@app.route("/status")
+def status_route():
+    """Latency policy and the state of the Gemini circuit breaker."""
+    return jsonify({
+        "request_deadline_seconds": REQUEST_DEADLINE_SECONDS,
+        "summary_mode": SUMMARY_MODE,
+        "gemini": {
+            "attempts": GEMINI_ATTEMPTS,
+            "attempt_timeout_seconds": GEMINI_ATTEMPT_TIMEOUT_SECONDS,
+            "circuit": gemini_breaker.snapshot(),
+        },
+    })
+
+def read_analysis_input(deadline=None):
+    """Text to analyze from the form (scraping URLs within `deadline`).
+
+    Returns (text, input_type, None) or (None, input_type, error_response).
+    """
     input_type = request.form.get('input_type')
     user_input = request.form.get('text')
 
     if not user_input or not input_type:
         logger.warning("No input data provided.")
-        return jsonify({"error": "No input data provided."}), 400
+        return None, input_type, (jsonify({"error": "No input data provided."}), 400)
 
     if input_type == 'text':
         text = user_input
     elif input_type == 'url':
-        text = scrape_article(user_input)
+        text = scrape_article(user_input, deadline)
         if not text:
             logger.warning("Failed to scrape text from URL: %s", user_input)
-            return jsonify({"error": "Failed to scrape text from the provided URL."}), 400
+            return None, input_type, (jsonify({"error": "Failed to scrape text from the provided URL."}), 400)
     else:
         logger.warning("Invalid analysis type: %s", input_type)
-        return jsonify({"error": "Invalid analysis type."}), 400
+        return None, input_type, (jsonify({"error": "Invalid analysis type."}), 400)
 
     if not text.strip():
         logger.warning("Empty text provided.")
-        return jsonify({"error": "Empty text provided."}), 400
+        return None, input_type, (jsonify({"error": "Empty text provided."}), 400)
+    return text, input_type, None
+
+def parse_flag(value, default=True):
+    """An on/off request option: JSON true/false, or a string that is off
+    when "0", "false" or "no" (any case)."""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ("0", "false", "no")
 
-    try:
-        entities = extract_entities(text)
-        political_result = analyze_political_bias(text)
-        sbic_result = analyze_social_bias(text)
-        bias_score, bias_label = get_dbias_score(text)
-        fake_news_score = analyze_fake_news(text)
-        word_repetition = analyze_word_repetition(text)
-        tone_result = analyze_tone(text)
-        sentiment_label, sentiment_percentage = analyze_sentiment(text)
+@app.route('/analyze', methods=['POST'])
+def analyze():
+    # Scraping, the stages and the Gemini call all share one deadline;
+    # whatever misses it is answered with its fallback.
+    deadline = Deadline()
+    text, input_type, error_response = read_analysis_input(deadline)
+    if error_response:
+        return error_response
 
-        gemini_summary, final_verdict, votes = summarize_clearify_results(
-            text,
-            political_result,
-            sbic_result,
-            fake_news_score,
-            bias_score,
-            bias_label
-        )
+    summary_mode = request.form.get('summary_mode') or request.args.get('summary_mode') or SUMMARY_MODE
 
-        final_result = {
-            "words_analyzed": len(text.split()),
-            "bias_score": bias_score,
-            "bias_label": bias_label,
-            "fake_news_risk": fake_news_score,
-            "emotional_words_percentage": tone_result.get("emotional_words_percentage", 0),
-            "positive_sentiment": sentiment_percentage if sentiment_label == "Positive" else 0,
-            "negative_sentiment": sentiment_percentage if sentiment_label == "Negative" else 0,
-            "word_repetition": word_repetition,
-            "overall_tone": tone_result.get("tone", ""),
-            "political_analysis": political_result,
-            "social_bias_analysis": sbic_result,
-            "final_verdict": final_verdict,
-            "weighted_votes": votes,
-            "gemini_summary": gemini_summary
-        }
+    try:
+        text = Document(text)
+        digest = text.digest
+        match, stage_results = reuse_near_duplicate(text)
+        if match:
+            # Summaries are looked up (and cached) under the matched article.
+            digest = match.doc_id
+            stage_errors, cache_status = {}, {name: "near_duplicate" for name in BATCH_ANALYZERS}
+        else:
+            stage_results, stage_errors, cache_status = run_analysis_stages(text, digest, deadline)
+        ticket = None
+        if summary_mode == 'async':
+            gemini_summary, final_verdict, votes, ticket = start_summary(
+                text, digest, stage_results, cache_status
+            )
+        else:
+            gemini_summary, final_verdict, votes = summarize_stage_results(
+                text, digest, stage_results, cache_status, deadline=deadline
+            )
+        final_result = build_final_result(
+            text, stage_results, stage_errors, cache_status, gemini_summary, final_verdict, votes
+        )
+        if match:
+            final_result["near_duplicate"] = near_duplicate_info(match)
+        if ticket:
+            final_result["summary_ticket"] = {
+                "id": ticket,
+                "status": "pending",
+                "poll_url": url_for("summary_status", ticket=ticket),
+                "events_url": url_for("summary_events", ticket=ticket),
+            }
 
         logger.info("Analysis completed successfully for input type: %s", input_type)
         return jsonify(final_result)
@@ -259,6 +630,81 @@ def analyze():
         logger.exception("Error during analysis: %s", e)
         return jsonify({"error": f"Analysis failed: {e}"}), 500
 
+@app.route('/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """/analyze as Server-Sent Events: one event per stage as it finishes
+    (entities, sentiment, political, social, dbias, fake_news, tone,
+    repetition), then verdict, summary and a final "result" event with the
+    same body /analyze returns."""
+    deadline = Deadline()
+    text, input_type, error_response = read_analysis_input(deadline)
+    if error_response:
+        return error_response
+    include_summary = parse_flag(request.form.get('summary') or request.args.get('summary'))
+
+    logger.info("Starting streamed analysis for input type: %s", input_type)
+    return Response(
+        stream_with_context(_stream_analysis(text, include_summary, deadline)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.route('/analyze_batch', methods=['POST'])
+def analyze_batch():
+    """Bulk analysis: a JSON array (or {"items": [...]}) or a JSONL body of
+    {id, text|url} items in, one JSONL result line per item out."""
+    include_summary = parse_flag(request.args.get("summary"))
+
+    if request.is_json:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            include_summary = parse_flag(payload.get("summary"), include_summary)
+            payload = payload.get("items")
+        if not isinstance(payload, list):
+            logger.warning("Invalid batch payload.")
+            return jsonify({"error": "Expected a JSON array of items."}), 400
+        items = iter(payload)
+    else:
+        items = _iter_jsonl(request.stream)
+
+    logger.info("Starting batch analysis (summary=%s).", include_summary)
+    return Response(
+        stream_with_context(_stream_batch_results(items, include_summary)),
+        mimetype="application/x-ndjson"
+    )
+
+@app.route('/summary/<ticket>')
+def summary_status(ticket):
+    state = summary_state(ticket)
+    if state is None:
+        return jsonify({"error": "Unknown or expired summary ticket."}), 404
+    return jsonify(state)
+
+@app.route('/summary/<ticket>/events')
+def summary_events(ticket):
+    """Server-Sent Events: keepalive comments until one "summary" event."""
+    def generate():
+        deadline = time.monotonic() + SUMMARY_EVENTS_TIMEOUT_SECONDS
+        while True:
+            summary_tickets.wait(ticket, SUMMARY_EVENTS_KEEPALIVE_SECONDS)
+            state = summary_state(ticket)
+            if state is None:
+                yield sse_event("error", {"ticket": ticket, "error": "Unknown or expired summary ticket."})
+                return
+            if state["status"] != "pending":
+                yield sse_event("summary", state)
+                return
+            if time.monotonic() > deadline:
+                yield sse_event("timeout", state)
+                return
+            yield sse_comment()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/submit_feedback', methods=['POST'])
 def submit_feedback_route():
     data = request.get_json()
@@ -271,9 +717,14 @@ def submit_feedback_route():
         return jsonify({"error": "Invalid rating"}), 400
 
     try:
-        save_feedback(int(rating), feedback_text, submitted_text)
+        if save_feedback(int(rating), feedback_text, submitted_text) == "queued":
+            # Buffered: accepted, written to the database shortly.
+            return jsonify({"message": "Feedback received!"}), 202
         logger.info("Feedback saved successfully.")
         return jsonify({"message": "Feedback saved successfully!"})
+    except FeedbackBufferFull as e:
+        logger.error("Feedback rejected: %s", e)
+        return jsonify({"error": "Feedback cannot be saved right now; please try again later."}), 503
     except Exception as e:
         logger.exception("Failed to save feedback: %s", e)
         return jsonify({"error": "Failed to save feedback."}), 500
@@ -0,0 +1,158 @@
+import os
+import sys
+import json
+import signal
+import logging
+import argparse
+import tempfile
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# PER-WORKER MEMORY REPORT
+# ============================================================
+# Loads every model, forks worker processes the way gunicorn does, runs one
+# request's worth of inference in each, and reads each worker's memory from
+# /proc/<pid>/smaps_rollup. Runs once with private heap weights and once
+# with CLEARIFY_MMAP_WEIGHTS=1:
+#
+#   python memory_report.py --workers 4 --load preload --output memory_report.json
+#
+# USS (Private_Clean + Private_Dirty) is what each extra worker costs; PSS
+# splits the shared pages between the processes mapping them. --load worker
+# loads the models in each worker after the fork, as gunicorn does without
+# --preload. Linux only.
+MODES = {"heap": "0", "mmap": "1"}
+
+
+def _memory_mib(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {
+        "uss_mib": round(private / 1024, 1),
+        "pss_mib": round(fields.get("Pss", 0) / 1024, 1),
+        "rss_mib": round(fields.get("Rss", 0) / 1024, 1),
+    }
+
+
+def _mean(values):
+    return round(sum(values) / len(values), 1) if values else None
+
+
+# ============================================================
+# ONE MODE (CHILD PROCESS)
+# ============================================================
+def _serve_one_request(analyzers, texts):
+    for analyzer in analyzers.values():
+        analyzer(texts)
+
+
+def measure(workers: int, load: str, models: str, samples: int) -> dict:
+    """Runs in a fresh interpreter, so CLEARIFY_MMAP_WEIGHTS is read at import."""
+    from datasets_io import sample_texts
+    from evaluate import resolve_model_source
+    from inference_server import load_local_analyzers
+    from model_store import MODELS
+    from mmap_weights import MMAP_WEIGHTS
+
+    source = resolve_model_source(models, list(MODELS))
+    texts = sample_texts(samples)
+    analyzers = load_local_analyzers()[0] if load == "preload" else None
+
+    ready_read, ready_write = os.pipe()
+    pids = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_read)
+            try:
+                _serve_one_request(analyzers or load_local_analyzers()[0], texts)
+                os.write(ready_write, b"1")
+            except BaseException:
+                logger.exception("Worker failed")
+                os.write(ready_write, b"0")
+            signal.pause()
+            os._exit(0)
+        pids.append(pid)
+    os.close(ready_write)
+
+    statuses = b""
+    while len(statuses) < workers:
+        chunk = os.read(ready_read, workers)
+        if not chunk:
+            break
+        statuses += chunk
+    try:
+        per_worker = [_memory_mib(pid) for pid in pids]
+        master = _memory_mib(os.getpid())
+    finally:
+        for pid in pids:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+    if statuses != b"1" * workers:
+        raise RuntimeError("A worker failed to serve its request; see the log above.")
+
+    return {
+        "mmap_weights": MMAP_WEIGHTS,
+        "models": source,
+        "master": master,
+        "workers": per_worker,
+        "mean_worker_uss_mib": _mean([worker["uss_mib"] for worker in per_worker]),
+        "mean_worker_pss_mib": _mean([worker["pss_mib"] for worker in per_worker]),
+    }
+
+
+# ============================================================
+# REPORT
+# ============================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare per-worker memory with heap and memory-mapped weights.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--load", choices=["preload", "worker"], default="preload",
+                        help="load the models before forking (gunicorn --preload) or in each worker")
+    parser.add_argument("--models", choices=["auto", "real", "tiny"], default="auto")
+    parser.add_argument("--samples", type=int, default=4, help="texts per warm-up request")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--output", default=None, help="also write the report to this JSON file")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+    if args.child:
+        # The loaders print to stdout, so the result goes to a file.
+        with open(args.child, "w") as f:
+            json.dump(measure(args.workers, args.load, args.models, args.samples), f)
+        return 0
+
+    report = {"workers": args.workers, "load": args.load, "modes": {}}
+    for mode in args.modes:
+        env = dict(os.environ, CLEARIFY_MMAP_WEIGHTS=MODES[mode])
+        with tempfile.NamedTemporaryFile(suffix=".json") as result:
+            subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", result.name, "--workers", str(args.workers),
+                 "--load", args.load, "--models", args.models, "--samples", str(args.samples)],
+                env=env, check=True,
+            )
+            with open(result.name) as f:
+                report["modes"][mode] = json.load(f)
+
+    if "heap" in report["modes"] and "mmap" in report["modes"]:
+        heap, mapped = report["modes"]["heap"], report["modes"]["mmap"]
+        report["uss_saved_per_worker_mib"] = round(heap["mean_worker_uss_mib"] - mapped["mean_worker_uss_mib"], 1)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    json.dump(report, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
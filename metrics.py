@@ -0,0 +1,170 @@
+import os
+
+# ============================================================
+# METRICS CONFIGURATION
+# ============================================================
+# Prometheus metrics (prometheus_client), served on /metrics. With
+# CLEARIFY_METRICS unset prometheus_client is not even imported and every
+# metric call returns a shared no-op object, so instrumentation costs one
+# flag check.
+#
+# gunicorn workers are separate processes. With PROMETHEUS_MULTIPROC_DIR
+# set, each one writes its samples to files in that directory and a scrape
+# answered by any worker aggregates all of them (gunicorn.conf.py empties
+# the directory at startup and retires the files of workers that exit).
+# Without it, each scrape only sees the worker that answered it.
+METRICS_ENABLED = os.getenv("CLEARIFY_METRICS", "0") == "1"
+# prometheus_client goes multiprocess whenever the variable exists.
+MULTIPROCESS = METRICS_ENABLED and "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _NullChild:
+    def inc(self, amount: float = 1):
+        pass
+
+    def set(self, value: float):
+        pass
+
+    def observe(self, value: float):
+        pass
+
+    def time(self):
+        return _NULL_TIMER
+
+
+_NULL_TIMER = _NullTimer()
+_NULL_CHILD = _NullChild()
+
+
+# ============================================================
+# METRIC TYPES
+# ============================================================
+class _Metric:
+    """A prometheus_client metric of type `kind`, or nothing when disabled."""
+    kind = None
+
+    def __init__(self, name: str, documentation: str, labelnames=(), **options):
+        self.name = name
+        self._metric = None
+        if METRICS_ENABLED:
+            import prometheus_client
+            self._metric = getattr(prometheus_client, self.kind)(name, documentation, tuple(labelnames), **options)
+
+    def labels(self, **labels):
+        """The child for one combination of label values (no-op when disabled)."""
+        if self._metric is None:
+            return _NULL_CHILD
+        return self._metric.labels(**labels)
+
+
+class Counter(_Metric):
+    kind = "Counter"
+
+
+class Histogram(_Metric):
+    kind = "Histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, buckets=buckets)
+
+
+class Gauge(_Metric):
+    kind = "Gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), multiprocess_mode: str = "all"):
+        # multiprocess_mode decides how the workers' values are combined.
+        super().__init__(name, documentation, labelnames, multiprocess_mode=multiprocess_mode)
+
+    def set(self, value: float):
+        """Sets an unlabelled gauge."""
+        if self._metric is not None:
+            self._metric.set(value)
+
+
+# ============================================================
+# PROCESS METRICS
+# ============================================================
+def process_rss_bytes() -> float:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# ============================================================
+# CLEARIFY METRICS
+# ============================================================
+REQUEST_SECONDS = Histogram(
+    "clearify_request_duration_seconds", "End-to-end request latency.", ("endpoint",)
+)
+STAGE_SECONDS = Histogram(
+    "clearify_stage_duration_seconds",
+    "Latency of one analysis stage (scrape, spacy, the classifiers, tone, summary, ...).",
+    ("stage",),
+)
+MODEL_FORWARD_SECONDS = Histogram(
+    "clearify_model_forward_seconds", "Latency of one batched model forward pass.", ("model", "backend")
+)
+MODEL_BATCH_SEQUENCES = Histogram(
+    "clearify_model_batch_sequences", "Sequences per model forward pass.", ("model",),
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+INPUT_TOKENS = Histogram(
+    "clearify_input_tokens", "Tokens per input text, before windowing or truncation.", ("model",),
+    buckets=(32, 64, 128, 256, 512, 1024, 2048, 4096, 8192),
+)
+TRUNCATED_INPUTS = Counter(
+    "clearify_truncated_inputs_total", "Inputs whose tokens did not all reach the model.", ("model",)
+)
+CACHE_LOOKUPS = Counter(
+    "clearify_cache_lookups_total", "Result cache lookups by stage and outcome.", ("stage", "result")
+)
+# Every worker loads and syncs the same models; the slowest one is reported.
+MODEL_LOAD_SECONDS = Gauge(
+    "clearify_model_load_seconds", "Time taken to load each model into memory.", ("model",),
+    multiprocess_mode="max",
+)
+MODEL_SYNC_SECONDS = Gauge(
+    "clearify_model_sync_seconds", "Time taken to sync each model's artifacts locally.", ("model",),
+    multiprocess_mode="max",
+)
+SCRAPES = Counter(
+    "clearify_scrapes_total", "Article scrapes by outcome and extraction method.", ("result", "method")
+)
+# One sample per live worker (labelled with its pid in multiprocess mode).
+PROCESS_RSS_BYTES = Gauge(
+    "clearify_process_resident_memory_bytes", "Resident memory of this worker process.",
+    multiprocess_mode="liveall",
+)
+
+
+def refresh_process_metrics():
+    """Updates this process's own gauges; called per request and per scrape."""
+    PROCESS_RSS_BYTES.set(process_rss_bytes())
+
+
+def render_metrics() -> str:
+    from prometheus_client import REGISTRY, CollectorRegistry, generate_latest
+
+    refresh_process_metrics()
+    registry = REGISTRY
+    if MULTIPROCESS:
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry).decode("utf-8")
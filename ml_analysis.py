@@ -1,135 +1,157 @@
 import os
+import time
+import functools
+import threading
 import torch
 import torch.nn.functional as F
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, AutoConfig, TFAutoModelForSequenceClassification
-from google.cloud import storage 
-import tensorflow as tf # NEW: Required for the Dbias model prediction
+from transformers import AutoTokenizer, AutoModelForSequenceClassification, AutoConfig
+from batching import MicroBatcher
+from chunking import CHUNKING_ENABLED, CHUNKING_SIGNATURE, AGGREGATION as CHUNK_AGGREGATION, split_windows, aggregate_probs
+from result_cache import fingerprint_directory
+from document import as_document, memo_batch, token_ids
+from stages import configure_thread_limits
+from model_store import prepare_models
+from onnx_backend import ONNX_BACKENDS, model_backend, load_onnx_classifier
+from dbias_torch import resolve_dbias_backend
+from mmap_weights import load_sequence_classifier
+from multihead import MULTIHEAD_ENABLED, MULTIHEAD_DIR, HEADS as MULTIHEAD_HEADS, has_multihead
+from multihead import load_multihead as load_multihead_artifact
+from metrics import (INPUT_TOKENS, METRICS_ENABLED, MODEL_BATCH_SEQUENCES, MODEL_FORWARD_SECONDS,
+                     MODEL_LOAD_SECONDS, TRUNCATED_INPUTS)
 # from Dbias.bias_classification import classifier # REMOVED: Replaced by explicit loading
 
+# Analyzers run concurrently, so cap framework thread pools before any op runs.
+configure_thread_limits()
+
+# ============================================================
+# MODEL CONFIGURATION
 # ============================================================
-# GCS CONFIGURATION
-# ============================================================
-BUCKET_NAME = "clearify" 
-PROJECT_ID = "eighth-breaker-478412-h9" 
-LOCAL_MODEL_BASE_PATH = "/tmp/huggingface_models"
-
-# GCS Paths relative to the bucket root
-GCS_POLITICAL_PATH = "political_model" # Assuming your paths were swapped in the old example
-GCS_FAKE_NEWS_PATH = "fake_news_model" # Assuming your paths were swapped in the old example
-GCS_SBIC_PATH = "sbic_model"
-GCS_DBIAS_PATH = "Dbias_model" # NEW: Path to your uploaded Dbias model
-
-# Local directories where models will be saved
-POLITICAL_MODEL_DIR = os.path.join(LOCAL_MODEL_BASE_PATH, "political_model")
-SBIC_MODEL_DIR = os.path.join(LOCAL_MODEL_BASE_PATH, "sbic_model")
-FAKE_NEWS_MODEL_DIR = os.path.join(LOCAL_MODEL_BASE_PATH, "fake_news_model")
-DBIAS_MODEL_DIR = os.path.join(LOCAL_MODEL_BASE_PATH, "dbias_model") # NEW
-
-# ============================================================
-# HELPER FUNCTIONS: GCS DOWNLOAD (Unchanged)
-# ============================================================
-
-def download_directory_from_gcs(gcs_prefix: str, local_path: str):
-    """Downloads all files under a GCS prefix to a local directory."""
-    print(f"Starting download: gs://{BUCKET_NAME}/{gcs_prefix} -> {local_path}")
-    
-    os.makedirs(local_path, exist_ok=True)
-    
-    storage_client = storage.Client(project=PROJECT_ID)
-    bucket = storage_client.bucket(BUCKET_NAME)
-    
-    # List all blobs (files) that start with the prefix and ensure it ends with '/' for directory behavior
-    blobs = bucket.list_blobs(prefix=gcs_prefix)
-    
-    download_count = 0
-    for blob in blobs:
-        # Skip the directory entry itself if it exists or if the name ends with /
-        if blob.name == gcs_prefix or blob.name.endswith('/'):
-            continue
-            
-        # Calculate the relative path within the local directory
-        # We need to strip the prefix completely to get the right relative path
-        if blob.name.startswith(gcs_prefix):
-             # Ensure there is a trailing slash on the prefix for correct slicing
-            prefix_with_slash = gcs_prefix if gcs_prefix.endswith('/') else gcs_prefix + '/'
-            relative_path = blob.name[len(prefix_with_slash):]
-        else:
-            # Fallback for unexpected naming, but should not happen if prefix is correct
-            relative_path = os.path.relpath(blob.name, gcs_prefix)
-            
-        local_file_path = os.path.join(local_path, relative_path)
-        
-        # Ensure subdirectories are created locally if needed
-        os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
-        
-        # print(f"Downloading {blob.name} to {local_file_path}") # Can be noisy, uncomment if needed
-        blob.download_to_filename(local_file_path)
-        download_count += 1
-        
-    if download_count == 0:
-        print(f"WARNING: No files found under the prefix: {gcs_prefix}. Check GCS path and prefix slash usage.")
-        
-    print(f"Finished downloading {download_count} files for {gcs_prefix}")
-
-# ============================================================
-# MODEL CONFIGURATION & PRE-LOADING
-# ============================================================
-
-# Step 1: Download ALL model directories from GCS
-print("Starting GCS Model Download Phase...")
-download_directory_from_gcs(GCS_POLITICAL_PATH, POLITICAL_MODEL_DIR)
-download_directory_from_gcs(GCS_SBIC_PATH, SBIC_MODEL_DIR)
-download_directory_from_gcs(GCS_FAKE_NEWS_PATH, FAKE_NEWS_MODEL_DIR)
-download_directory_from_gcs(GCS_DBIAS_PATH, DBIAS_MODEL_DIR) # NEW
-print("GCS Model Download Phase Complete.")
-
-# Now, the models are available locally at these paths:
-POLITICAL_MODEL = POLITICAL_MODEL_DIR
-SBIC_MODEL_PATH = SBIC_MODEL_DIR
-FAKE_NEWS_MODEL_PATH = FAKE_NEWS_MODEL_DIR
-DBIAS_MODEL_PATH = DBIAS_MODEL_DIR # NEW: Local path for Dbias
-
-# The rest of your existing setup logic can remain the same, 
-# as the transformer's AutoConfig/AutoModel will now load from the local disk path.
-cfg = AutoConfig.from_pretrained(POLITICAL_MODEL) 
-print("config.id2label:", getattr(cfg, "id2label", None))
-print("config.label2id:", getattr(cfg, "label2id", None))
+# Artifacts are synced by model_store.prepare_models(); nothing is
+# downloaded or loaded at import time any more.
+ML_MODEL_NAMES = ("political", "sbic", "fake_news", "dbias")
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
+# We need the Dbias label map to get the correct output text.
+# The original model outputs 0 for 'not bias' and 1 for 'bias'.
+DBIAS_LABEL_MAP = {0: "not bias", 1: "bias"} 
+
+# name -> (tokenizer, model) and name -> backend, filled by load_models()
+_MODELS = {}
+_BACKENDS = {}
+_load_lock = threading.Lock()
+
+# Version tags for the result cache. They change when a different artifact
+# is synced or the chunking settings change, invalidating only that model.
+MODEL_VERSIONS = {}
+
 # ============================================================
 # MODEL LOADING FUNCTION (For PyTorch Models)
 # ============================================================
 def load_model_and_tokenizer(model_path):
     # This function now loads models from the local directory (downloaded from GCS)
     tokenizer = AutoTokenizer.from_pretrained(model_path)
-    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    # Memory-mapped and shared between workers with CLEARIFY_MMAP_WEIGHTS=1.
+    model = load_sequence_classifier(model_path)
     model.to(device)
     model.eval()
     return tokenizer, model
 
+def load_dbias_model(model_path):
+    # TensorFlow is only imported when Dbias could not be converted to PyTorch.
+    import tensorflow as tf
+    from transformers import TFAutoModelForSequenceClassification
+    configure_thread_limits()
+
+    dbias_tokenizer = AutoTokenizer.from_pretrained(model_path)
+    # Use TFAutoModelForSequenceClassification for the TensorFlow model
+    dbias_model = TFAutoModelForSequenceClassification.from_pretrained(model_path)
+    # TF models do not need .to(device) or .eval() in the same way as PyTorch
+    dbias_model.compile(metrics=["accuracy"]) # Compile is often required for TF models to be usable
+    return dbias_tokenizer, dbias_model
+
 # ============================================================
-# EAGER MODEL LOADING (This code executes at import time)
+# EXPLICIT MODEL LOADING
 # ============================================================
-print("Starting Eager Local Model Loading...")
+def _serve_from_multihead(names):
+    """Points the multi-head tasks in `names` at the shared-encoder model and
+    returns the names still to load separately."""
+    shared = [name for name in names if name in MULTIHEAD_HEADS]
+    if not shared:
+        return names
+    if not has_multihead(MULTIHEAD_DIR):
+        print(f"CLEARIFY_MULTIHEAD=1 but no multi-head model in {MULTIHEAD_DIR}; loading the separate models.")
+        return names
+    tokenizer, model = load_multihead()
+    for name in shared:
+        _MODELS[name] = (tokenizer, model)
+        _BACKENDS[name] = "multihead"
+        MODEL_VERSIONS[name] = f"{_MULTIHEAD['version']}:{name}:{CHUNKING_SIGNATURE}"
+        print(f"Model {name} served by multihead")
+    return [name for name in names if name not in shared]
 
-# 1. PyTorch Models
-political_tokenizer, political_model = load_model_and_tokenizer(POLITICAL_MODEL)
-sbic_tokenizer, sbic_model = load_model_and_tokenizer(SBIC_MODEL_PATH)
-fake_tokenizer, fake_news_model = load_model_and_tokenizer(FAKE_NEWS_MODEL_PATH)
+def load_models(names=ML_MODEL_NAMES, use_multihead=MULTIHEAD_ENABLED):
+    """Syncs and loads the given classifiers (default: all four).
 
-# 2. Dbias (TensorFlow) Model (NEW)
-dbias_tokenizer = AutoTokenizer.from_pretrained(DBIAS_MODEL_PATH)
-# Use TFAutoModelForSequenceClassification for the TensorFlow model
-dbias_model = TFAutoModelForSequenceClassification.from_pretrained(DBIAS_MODEL_PATH)
-# TF models do not need .to(device) or .eval() in the same way as PyTorch
-dbias_model.compile(metrics=["accuracy"]) # Compile is often required for TF models to be usable
+    With `use_multihead` (CLEARIFY_MULTIHEAD=1), the tasks the multi-head
+    model covers are served by it instead of their own models.
+    Safe to call more than once; models already loaded are skipped.
+    """
+    if all(name in _MODELS for name in names):
+        return
+    with _load_lock:
+        missing = [name for name in names if name not in _MODELS]
+        if not missing:
+            return
+        started = time.monotonic()
+        if use_multihead:
+            missing = _serve_from_multihead(missing)
+            if not missing:
+                return
+        paths = prepare_models(missing)
 
-# We need the Dbias label map to get the correct output text.
-# The original model outputs 0 for 'not bias' and 1 for 'bias'.
-DBIAS_LABEL_MAP = {0: "not bias", 1: "bias"} 
+        if "political" in missing:
+            cfg = AutoConfig.from_pretrained(paths["political"]) 
+            print("config.id2label:", getattr(cfg, "id2label", None))
+            print("config.label2id:", getattr(cfg, "label2id", None))
+
+        print("Starting Local Model Loading...")
+        # Dbias is served through PyTorch from a converted artifact when
+        # possible; TF is the fallback.
+        load_paths = dict(paths)
+        dbias_framework = None
+        if "dbias" in missing:
+            dbias_framework, load_paths["dbias"] = resolve_dbias_backend(paths["dbias"])
+
+        # 1. PyTorch Models (optionally served through ONNX Runtime)
+        for name in missing:
+            if name == "dbias" and dbias_framework == "tf":
+                continue
+            model_started = time.monotonic()
+            backend = model_backend(name)
+            if backend in ONNX_BACKENDS:
+                _MODELS[name] = (
+                    AutoTokenizer.from_pretrained(load_paths[name]),
+                    load_onnx_classifier(name, load_paths[name], backend),
+                )
+            else:
+                _MODELS[name] = load_model_and_tokenizer(load_paths[name])
+            _BACKENDS[name] = backend
+            MODEL_LOAD_SECONDS.labels(model=name).set(time.monotonic() - model_started)
+        # 2. Dbias (TensorFlow) Model, only if the conversion is unavailable
+        if dbias_framework == "tf":
+            model_started = time.monotonic()
+            _MODELS["dbias"] = load_dbias_model(paths["dbias"])
+            _BACKENDS["dbias"] = "tf"
+            MODEL_LOAD_SECONDS.labels(model="dbias").set(time.monotonic() - model_started)
+
+        for name in missing:
+            MODEL_VERSIONS[name] = (
+                f"{fingerprint_directory(paths[name])}:{_BACKENDS[name]}:{CHUNKING_SIGNATURE}"
+            )
+            print(f"Model {name} served by {_BACKENDS[name]}")
+        print(f"Local Model Loading Complete in {time.monotonic() - started:.2f}s.")
 
-print("Eager Local Model Loading Complete.")
 # ============================================================
 # LABEL MAPS (Unchanged)
 # ============================================================
@@ -150,90 +172,219 @@ sbic_label_map = {
     7: "victim"
 }
 
+# ============================================================
+# BATCHED INFERENCE
+# ============================================================
+# Each text is tokenized on the caller's thread without padding; the
+# per-model MicroBatcher pads texts of similar length together and runs a
+# single forward pass for all concurrent callers. In chunking mode a text
+# becomes several overlapping windows, which travel as one batcher item so
+# all windows of a document share a single forward pass.
+def _encode(model_name: str, tokenizer, text: str):
+    if CHUNKING_ENABLED:
+        return split_windows(tokenizer, text, model=model_name)
+    # Same as tokenizer(text, truncation=True, max_length=512), built from the
+    # IDs a Document already holds for this vocab.
+    ids = token_ids(tokenizer, text)
+    body = 512 - tokenizer.num_special_tokens_to_add(pair=False)
+    encoding = tokenizer.prepare_for_model(ids[:body], add_special_tokens=True)
+    if METRICS_ENABLED:
+        INPUT_TOKENS.labels(model=model_name).observe(len(ids))
+        if len(ids) > body:
+            TRUNCATED_INPUTS.labels(model=model_name).inc()
+    return [encoding], [max(min(len(ids), body), 1)]
+
+def _run_windows(batch_probs):
+    """Wraps a flat batch function so each item can hold several windows."""
+    def run(items):
+        flat = [encoding for windows in items for encoding in windows]
+        probs = batch_probs(flat)
+        results, offset = [], 0
+        for windows in items:
+            results.append(probs[offset:offset + len(windows)])
+            offset += len(windows)
+        return results
+    return run
+
+def _torch_batch_probs(tokenizer, model, encodings):
+    inputs = tokenizer.pad(encodings, return_tensors="pt").to(device)
+    with torch.no_grad():
+        outputs = model(**inputs)
+        probs = F.softmax(outputs.logits, dim=-1)
+    return [row for row in probs.cpu().numpy()]
+
+def _tf_batch_probs(tokenizer, model, encodings):
+    import tensorflow as tf
+    inputs = tokenizer.pad(encodings, return_tensors="tf")
+    outputs = model(inputs)
+    probs = tf.nn.softmax(outputs.logits, axis=-1).numpy()
+    return [row for row in probs]
+
+def _onnx_batch_probs(tokenizer, model, encodings):
+    return model.predict_probs(tokenizer, encodings)
+
+_BATCH_FUNCTIONS = {
+    "torch": _torch_batch_probs,
+    "tf": _tf_batch_probs,
+    "onnx": _onnx_batch_probs,
+    "onnx-int8": _onnx_batch_probs,
+}
+
+def _batch_probs(model_name, encodings):
+    tokenizer, model = _MODELS[model_name]
+    backend = _BACKENDS[model_name]
+    MODEL_BATCH_SEQUENCES.labels(model=model_name).observe(len(encodings))
+    with MODEL_FORWARD_SECONDS.labels(model=model_name, backend=backend).time():
+        return _BATCH_FUNCTIONS[backend](tokenizer, model, encodings)
+
+_BATCHERS = {
+    name: MicroBatcher(name, _run_windows(functools.partial(_batch_probs, name)))
+    for name in ML_MODEL_NAMES
+}
+
+def predict_probs(model_name: str, text: str):
+    """Returns the softmax probabilities of one model for one text."""
+    return predict_probs_batch(model_name, [text])[0]
+
+def predict_probs_batch(model_name: str, texts):
+    """Probabilities for many texts, queued together as one bulk request."""
+    load_models((model_name,))
+    if _BACKENDS[model_name] == "multihead":
+        return [probs[model_name] for probs in multihead_probs_batch(texts)]
+    tokenizer = _MODELS[model_name][0]
+    encoded = [_encode(model_name, tokenizer, text) for text in texts]
+    items = [windows for windows, _ in encoded]
+    longest = [max(len(encoding["input_ids"]) for encoding in windows) for windows in items]
+    window_probs = _BATCHERS[model_name].submit_many(items, longest, [len(windows) for windows in items])
+    return [
+        aggregate_probs(probs, lengths, CHUNK_AGGREGATION)
+        for probs, (_, lengths) in zip(window_probs, encoded)
+    ]
+
+# ============================================================
+# SHARED-ENCODER MULTI-HEAD MODEL
+# ============================================================
+# One encoder pass yields the probabilities of every head. The result is
+# memoized on the request's Document, so when the four stages of a request
+# ask for their head, the first computes all of them and the others wait
+# for it instead of running the encoder again.
+_MULTIHEAD = {}
+_multihead_lock = threading.Lock()
+
+def load_multihead(path=MULTIHEAD_DIR):
+    """Loads the multi-head model once per process; returns (tokenizer, model)."""
+    with _multihead_lock:
+        if not _MULTIHEAD:
+            started = time.monotonic()
+            tokenizer, model = load_multihead_artifact(path)
+            model.to(device)
+            _MULTIHEAD.update(tokenizer=tokenizer, model=model, version=f"multihead-{fingerprint_directory(path)}")
+            MODEL_LOAD_SECONDS.labels(model="multihead").set(time.monotonic() - started)
+    return _MULTIHEAD["tokenizer"], _MULTIHEAD["model"]
+
+def _multihead_batch_probs(encodings):
+    tokenizer, model = _MULTIHEAD["tokenizer"], _MULTIHEAD["model"]
+    MODEL_BATCH_SEQUENCES.labels(model="multihead").observe(len(encodings))
+    with MODEL_FORWARD_SECONDS.labels(model="multihead", backend="torch").time():
+        inputs = tokenizer.pad(encodings, return_tensors="pt").to(device)
+        with torch.no_grad():
+            logits = model(**inputs)
+        probs = {name: F.softmax(value, dim=-1).cpu().numpy() for name, value in logits.items()}
+    return [{name: rows[i] for name, rows in probs.items()} for i in range(len(encodings))]
+
+_MULTIHEAD_BATCHER = MicroBatcher("multihead", _run_windows(_multihead_batch_probs))
+
+def _multihead_compute(texts):
+    tokenizer = _MULTIHEAD["tokenizer"]
+    encoded = [_encode("multihead", tokenizer, text) for text in texts]
+    items = [windows for windows, _ in encoded]
+    longest = [max(len(encoding["input_ids"]) for encoding in windows) for windows in items]
+    window_probs = _MULTIHEAD_BATCHER.submit_many(items, longest, [len(windows) for windows in items])
+    return [
+        {name: aggregate_probs([window[name] for window in probs], lengths, CHUNK_AGGREGATION) for name in probs[0]}
+        for probs, (_, lengths) in zip(window_probs, encoded)
+    ]
+
+def multihead_probs_batch(texts):
+    """{head: probabilities} for each text, one encoder pass per document."""
+    load_multihead()
+    # Documents another stage claimed first are being computed by that stage.
+    return memo_batch(
+        [as_document(text) for text in texts],
+        ("multihead_probs", _MULTIHEAD["version"]),
+        _multihead_compute,
+    )
+
 # ============================================================
 # D-BIAS SCORE (REWRITTEN)
 # ============================================================
+def _dbias_result(probabilities):
+    # Find the predicted label (highest probability index)
+    pred_index = int(probabilities.argmax())
+
+    label = DBIAS_LABEL_MAP.get(pred_index, "unknown")
+    confidence = float(probabilities[pred_index])
+
+    score = confidence * 100
+    return round(score, 2), label
+
 def get_dbias_score(text: str):
-    try:
-        # Use the eagerly loaded Dbias tokenizer and model
-        inputs = dbias_tokenizer(
-            text,
-            truncation=True,
-            max_length=512,
-            return_tensors="tf" # Must be "tf" for the TF model
-        )
-
-        # Run prediction using the loaded TF model
-        outputs = dbias_model(inputs)
-        logits = outputs.logits
-        
-        # Calculate probabilities using TensorFlow's softmax
-        probabilities = tf.nn.softmax(logits, axis=-1).numpy()[0]
-        
-        # Find the predicted label (highest probability index)
-        pred_index = tf.argmax(probabilities).numpy()
-        
-        label = DBIAS_LABEL_MAP.get(pred_index, "unknown")
-        confidence = probabilities[pred_index]
-
-        score = confidence * 100
-        return round(score, 2), label
+    return get_dbias_score_batch([text])[0]
 
+def get_dbias_score_batch(texts):
+    try:
+        return [_dbias_result(probs) for probs in predict_probs_batch("dbias", texts)]
     except Exception as e:
         # Catch and report any error during Dbias analysis
         print(f"[Dbias Error] {e}")
-        return 0.0, "error"
+        return [(0.0, "error") for _ in texts]
 
 # ============================================================
 # POLITICAL BIAS ANALYSIS (Unchanged)
 # ============================================================
-def analyze_political_bias(text: str) -> dict:
-    inputs = political_tokenizer(
-        text, return_tensors="pt", padding=True, truncation=True, max_length=512
-    ).to(device)
-
-    with torch.no_grad():
-        outputs = political_model(**inputs)
-        probs = F.softmax(outputs.logits, dim=-1)
-        pred_label = torch.argmax(probs, dim=1).item()
+def _political_result(probs) -> dict:
+    pred_label = int(probs.argmax())
 
     return {
         "prediction": political_label_map[pred_label],
-        "confidence": round(probs[0][pred_label].item(), 3)
+        "confidence": round(float(probs[pred_label]), 3)
     }
 
+def analyze_political_bias(text: str) -> dict:
+    return _political_result(predict_probs("political", text))
+
+def analyze_political_bias_batch(texts) -> list:
+    return [_political_result(probs) for probs in predict_probs_batch("political", texts)]
+
 # ============================================================
 # SOCIAL BIAS ANALYSIS (Unchanged)
 # ============================================================
-def analyze_social_bias(text: str) -> dict:
-    inputs = sbic_tokenizer(
-        text, return_tensors="pt", padding=True, truncation=True, max_length=512
-    ).to(device)
-
-    with torch.no_grad():
-        outputs = sbic_model(**inputs)
-        probs = F.softmax(outputs.logits, dim=-1)
-        pred_label = torch.argmax(probs, dim=1).item()
+def _social_result(probs) -> dict:
+    pred_label = int(probs.argmax())
 
     return {
         "bias_category": sbic_label_map[pred_label],
-        "confidence": round(probs[0][pred_label].item(), 3)
+        "confidence": round(float(probs[pred_label]), 3)
     }
 
+def analyze_social_bias(text: str) -> dict:
+    return _social_result(predict_probs("sbic", text))
+
+def analyze_social_bias_batch(texts) -> list:
+    return [_social_result(probs) for probs in predict_probs_batch("sbic", texts)]
+
 # ============================================================
 # FAKE NEWS ANALYSIS (Unchanged)
 # ============================================================
-def analyze_fake_news(text: str) -> float:
-    inputs = fake_tokenizer(
-        text, return_tensors="pt", padding=True, truncation=True, max_length=512
-    ).to(device)
+def _fake_news_result(probs) -> float:
+    pred_label = int(probs.argmax())
+    confidence = float(probs[pred_label])
 
-    with torch.no_grad():
-        outputs = fake_news_model(**inputs)
-        probs = F.softmax(outputs.logits, dim=-1)
+    score = confidence * 100 if pred_label == 1 else (1 - confidence) * 100
+    return round(score, 2)
 
-        pred_label = torch.argmax(probs, dim=1).item()
-        confidence = probs[0][pred_label].item()
+def analyze_fake_news(text: str) -> float:
+    return _fake_news_result(predict_probs("fake_news", text))
 
-    score = confidence * 100 if pred_label == 1 else (1 - confidence) * 100
-    return round(score, 2)
\ No newline at end of file
+def analyze_fake_news_batch(texts) -> list:
+    return [_fake_news_result(probs) for probs in predict_probs_batch("fake_news", texts)]
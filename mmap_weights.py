@@ -0,0 +1,166 @@
+import os
+import json
+import mmap
+import struct
+import logging
+import warnings
+
+from model_store import LOCAL_MODEL_BASE_PATH
+from result_cache import fingerprint_directory
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# MEMORY-MAPPED WEIGHTS CONFIGURATION
+# ============================================================
+# from_pretrained() copies every weight into the process heap, so each
+# gunicorn worker holds a private copy of all five classifiers. With
+# CLEARIFY_MMAP_WEIGHTS=1 the weights are read from a safetensors file
+# that is memory-mapped read-only instead: the tensors point into the page
+# cache, which every process mapping the file shares, whether it loaded the
+# model itself or inherited it from a --preload master.
+MMAP_WEIGHTS = os.getenv("CLEARIFY_MMAP_WEIGHTS", "0") == "1"
+# Checkpoints that only ship pytorch_model.bin are converted here once,
+# keyed by a hash of the source's content, so a retrained model is
+# reconverted even when its file sizes did not change.
+SAFETENSORS_DIR = os.getenv("CLEARIFY_SAFETENSORS_DIR", os.path.join(LOCAL_MODEL_BASE_PATH, "safetensors"))
+
+SAFETENSORS_NAME = "model.safetensors"
+PICKLE_NAME = "pytorch_model.bin"
+
+# safetensors dtype tag -> torch dtype name
+_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8", "BOOL": "bool",
+}
+
+
+# ============================================================
+# CONVERSION
+# ============================================================
+def _converted_path(model_path: str) -> str:
+    return os.path.join(SAFETENSORS_DIR, f"{fingerprint_directory(model_path)}.safetensors")
+
+
+def convert_to_safetensors(bin_path: str, out_path: str):
+    """Rewrites a pytorch_model.bin state dict as a safetensors file."""
+    import torch
+    from safetensors.torch import save_file
+
+    state_dict = torch.load(bin_path, map_location="cpu", weights_only=True)
+    # safetensors refuses tensors sharing storage (tied embeddings), so
+    # every tensor gets its own contiguous copy.
+    tensors = {name: tensor.contiguous().clone() for name, tensor in state_dict.items()}
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    save_file(tensors, tmp_path, metadata={"format": "pt"})
+    os.replace(tmp_path, out_path)
+
+
+def ensure_safetensors(model_path: str):
+    """Returns a safetensors file with the model's weights, or None.
+
+    A checkpoint that already ships model.safetensors is used in place;
+    pytorch_model.bin is converted once into SAFETENSORS_DIR. Sharded and
+    TensorFlow-only checkpoints return None and load the usual way.
+    """
+    shipped = os.path.join(model_path, SAFETENSORS_NAME)
+    if os.path.isfile(shipped):
+        return shipped
+    bin_path = os.path.join(model_path, PICKLE_NAME)
+    if not os.path.isfile(bin_path):
+        return None
+    out_path = _converted_path(model_path)
+    if not os.path.isfile(out_path):
+        logger.info("Converting %s to safetensors: %s", bin_path, out_path)
+        try:
+            convert_to_safetensors(bin_path, out_path)
+        except Exception as e:
+            logger.warning("safetensors conversion of %s failed: %s", model_path, e)
+            return None
+    return out_path
+
+
+# ============================================================
+# ZERO-COPY LOADING
+# ============================================================
+def mmap_state_dict(path: str) -> dict:
+    """State dict whose tensors are read-only views into the mapped file.
+
+    Format: an 8-byte little-endian header length, a JSON header of
+    {name: {dtype, shape, data_offsets}}, then the raw tensor bytes.
+    """
+    import torch
+
+    with open(path, "rb") as f:
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    data_start = 8 + header_len
+
+    state_dict = {}
+    with warnings.catch_warnings():
+        # frombuffer warns that the buffer is not writable; inference
+        # never writes to the weights.
+        warnings.simplefilter("ignore", UserWarning)
+        for name, info in header.items():
+            if name == "__metadata__":
+                continue
+            dtype = getattr(torch, _DTYPES[info["dtype"]])
+            shape = info["shape"]
+            start, end = info["data_offsets"]
+            itemsize = torch.empty((), dtype=dtype).element_size()
+            count = (end - start) // itemsize
+            offset = data_start + start
+            if count == 0:
+                tensor = torch.empty(shape, dtype=dtype)
+            elif offset % itemsize:
+                # Misaligned data cannot be viewed in place; this tensor is copied.
+                tensor = torch.frombuffer(bytearray(mapped[offset:offset + end - start]), dtype=dtype)
+            else:
+                tensor = torch.frombuffer(mapped, dtype=dtype, count=count, offset=offset)
+            state_dict[name] = tensor.view(shape)
+    # Every tensor keeps a reference to the mapping, so it stays open as
+    # long as the model does.
+    return state_dict
+
+
+def load_mmap_model(model_path: str, weights_path: str, auto_class):
+    """Builds the model from its config and assigns the mapped tensors as
+    its parameters, without allocating or initializing weights first."""
+    from transformers import AutoConfig
+    from transformers.modeling_utils import no_init_weights
+
+    config = AutoConfig.from_pretrained(model_path)
+    with no_init_weights():
+        model = auto_class.from_config(config)
+    state_dict = mmap_state_dict(weights_path)
+    missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+    # Tied weights (e.g. output embeddings) are legitimately absent.
+    tied = set(getattr(model, "_tied_weights_keys", None) or ())
+    missing = [key for key in missing if key not in tied]
+    if missing:
+        raise ValueError(f"{len(missing)} weights missing from {weights_path}, e.g. {missing[0]}")
+    if unexpected:
+        logger.info("Ignoring %d unexpected weights in %s", len(unexpected), weights_path)
+    model.tie_weights()
+    model.eval()
+    return model
+
+
+def load_pretrained(model_path: str, auto_class):
+    """auto_class.from_pretrained(model_path), memory-mapped when
+    CLEARIFY_MMAP_WEIGHTS=1 and the weights allow it."""
+    if MMAP_WEIGHTS:
+        weights_path = ensure_safetensors(model_path)
+        if weights_path is not None:
+            try:
+                return load_mmap_model(model_path, weights_path, auto_class)
+            except Exception as e:
+                logger.warning("Memory-mapped load of %s failed (%s); loading a private copy.", model_path, e)
+    return auto_class.from_pretrained(model_path)
+
+
+def load_sequence_classifier(model_path: str):
+    from transformers import AutoModelForSequenceClassification
+    return load_pretrained(model_path, AutoModelForSequenceClassification)
@@ -0,0 +1,260 @@
+import os
+import json
+import time
+import base64
+import shutil
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from metrics import MODEL_SYNC_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# MODEL STORE CONFIGURATION
+# ============================================================
+BUCKET_NAME = "clearify"
+PROJECT_ID = "eighth-breaker-478412-h9"
+LOCAL_MODEL_BASE_PATH = os.getenv("LOCAL_MODEL_BASE_PATH", "/tmp/huggingface_models")
+
+# Where artifacts come from:
+#   gs://<bucket>      - Google Cloud Storage (default)
+#   file:///some/dir   - a local directory laid out like the bucket (a fake
+#                        bucket for offline runs); synced into the cache
+#                        exactly like GCS
+#   /some/dir          - a plain local directory, used in place, no copying
+MODEL_SOURCE = os.getenv("CLEARIFY_MODEL_SOURCE", f"gs://{BUCKET_NAME}")
+SYNC_WORKERS = int(os.getenv("CLEARIFY_MODEL_SYNC_WORKERS", "8"))
+
+MANIFEST_NAME = ".clearify_manifest.json"
+
+# Model name -> (bucket prefix, local directory name)
+MODELS = {
+    "political": ("political_model", "political_model"),
+    "sbic": ("sbic_model", "sbic_model"),
+    "fake_news": ("fake_news_model", "fake_news_model"),
+    "dbias": ("Dbias_model", "dbias_model"),
+    "emotion": ("emotion_model", "emotion_model"),
+}
+
+_prepared = {}
+_prepare_lock = threading.Lock()
+
+
+# ============================================================
+# LOCAL FAKE BUCKET
+# ============================================================
+def file_md5(path: str) -> str:
+    """Base64 MD5, the same encoding GCS uses for blob.md5_hash."""
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return base64.b64encode(digest.digest()).decode("ascii")
+
+
+class LocalBlob:
+    """The subset of google.cloud.storage.Blob the sync uses."""
+
+    def __init__(self, root: str, name: str):
+        self.name = name
+        self._path = os.path.join(root, name)
+        stat = os.stat(self._path)
+        self.size = stat.st_size
+        self.generation = stat.st_mtime_ns
+        self.md5_hash = file_md5(self._path)
+
+    def download_to_filename(self, filename: str):
+        shutil.copyfile(self._path, filename)
+
+
+class LocalBucket:
+    """A directory that behaves like a GCS bucket for list_blobs()."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def list_blobs(self, prefix: str = ""):
+        base = os.path.join(self.root, prefix)
+        for dirpath, _, files in os.walk(base):
+            for name in sorted(files):
+                rel = os.path.relpath(os.path.join(dirpath, name), self.root)
+                yield LocalBlob(self.root, rel.replace(os.sep, "/"))
+
+
+def _open_bucket():
+    if MODEL_SOURCE.startswith("gs://"):
+        from google.cloud import storage
+        storage_client = storage.Client(project=PROJECT_ID)
+        return storage_client.bucket(MODEL_SOURCE[len("gs://"):].rstrip("/"))
+    if MODEL_SOURCE.startswith("file://"):
+        return LocalBucket(MODEL_SOURCE[len("file://"):])
+    return None
+
+
+def use_source(source: str):
+    """Switches the artifact source at runtime (e.g. to generated test models)."""
+    global MODEL_SOURCE
+    with _prepare_lock:
+        MODEL_SOURCE = source
+        _prepared.clear()
+
+
+# ============================================================
+# SYNC
+# ============================================================
+def model_dir(name: str) -> str:
+    """Local directory a model is (or will be) loaded from."""
+    prefix, local_name = MODELS[name]
+    if MODEL_SOURCE.startswith(("gs://", "file://")):
+        return os.path.join(LOCAL_MODEL_BASE_PATH, local_name)
+    return os.path.join(MODEL_SOURCE, prefix)
+
+
+def load_manifest(local_path: str) -> dict:
+    try:
+        with open(os.path.join(local_path, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(local_path: str, manifest: dict):
+    tmp_path = os.path.join(local_path, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, os.path.join(local_path, MANIFEST_NAME))
+
+
+def _is_current(entry, blob, local_file: str) -> bool:
+    return (
+        entry is not None
+        and entry.get("generation") == blob.generation
+        and entry.get("md5") == blob.md5_hash
+        and os.path.isfile(local_file)
+        and os.path.getsize(local_file) == blob.size
+    )
+
+
+def _download(blob, local_file: str):
+    os.makedirs(os.path.dirname(local_file), exist_ok=True)
+    part_file = local_file + ".part"
+    blob.download_to_filename(part_file)
+    # Composite GCS objects carry no MD5; their size is still checked.
+    if blob.md5_hash and file_md5(part_file) != blob.md5_hash:
+        os.remove(part_file)
+        raise IOError(f"Checksum mismatch for {blob.name}")
+    if blob.size is not None and os.path.getsize(part_file) != blob.size:
+        os.remove(part_file)
+        raise IOError(f"Size mismatch for {blob.name}")
+    os.replace(part_file, local_file)
+
+
+def _remove_stale_files(local_path: str, keep) -> int:
+    """Deletes files under `local_path` that are not in `keep` (relative
+    paths) and directories left empty; returns the number of files removed."""
+    removed = 0
+    for dirpath, _, files in os.walk(local_path, topdown=False):
+        for name in files:
+            full_path = os.path.join(dirpath, name)
+            relative_path = os.path.relpath(full_path, local_path).replace(os.sep, "/")
+            if relative_path != MANIFEST_NAME and relative_path not in keep:
+                os.remove(full_path)
+                removed += 1
+        if dirpath != local_path and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return removed
+
+
+def sync_directory(bucket, gcs_prefix: str, local_path: str, workers: int = SYNC_WORKERS) -> dict:
+    """Mirrors every blob under `gcs_prefix` into `local_path`.
+
+    Blobs whose generation and MD5 match the local manifest (and whose file
+    is present with the right size) are skipped; the rest are downloaded
+    concurrently and checksum-verified. Each finished download is recorded
+    in the manifest at once, so an interrupted sync resumes where it
+    stopped. After a complete sync, local files no longer in the bucket are
+    deleted.
+    """
+    os.makedirs(local_path, exist_ok=True)
+    prefix_with_slash = gcs_prefix if gcs_prefix.endswith('/') else gcs_prefix + '/'
+    manifest = load_manifest(local_path)
+
+    todo, current = [], {}
+    for blob in bucket.list_blobs(prefix=prefix_with_slash):
+        if blob.name.endswith('/'):
+            continue
+        relative_path = blob.name[len(prefix_with_slash):]
+        local_file = os.path.join(local_path, relative_path)
+        if _is_current(manifest.get(relative_path), blob, local_file):
+            current[relative_path] = manifest[relative_path]
+        else:
+            todo.append((relative_path, blob, local_file))
+
+    if not todo and not current:
+        logger.warning("No files found under the prefix: %s", gcs_prefix)
+
+    # The manifest starts with the up-to-date files only, so an entry for a
+    # file being replaced is gone before its download starts.
+    _write_manifest(local_path, current)
+    skipped = len(current)
+    failures = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="model-sync") as pool:
+        futures = {pool.submit(_download, blob, local_file): (relative_path, blob)
+                   for relative_path, blob, local_file in todo}
+        for future in as_completed(futures):
+            relative_path, blob = futures[future]
+            try:
+                future.result()
+            except Exception as e:
+                failures.append((relative_path, e))
+                continue
+            current[relative_path] = {"generation": blob.generation, "md5": blob.md5_hash, "size": blob.size}
+            _write_manifest(local_path, current)
+
+    if failures:
+        relative_path, error = failures[0]
+        raise IOError(f"{len(failures)} of {len(todo)} downloads failed, e.g. {relative_path}: {error}") from error
+
+    # An empty listing more likely means a wrong prefix than a deleted model.
+    deleted = _remove_stale_files(local_path, set(current)) if current else 0
+    return {"downloaded": len(todo), "skipped": skipped, "deleted": deleted}
+
+
+def prepare_models(names=None) -> dict:
+    """Makes the given models (default: all) available locally.
+
+    Runs once per model per process and returns {name: local_dir}. This is
+    the explicit replacement for the old download-at-import behaviour.
+    """
+    names = list(MODELS) if names is None else list(names)
+    with _prepare_lock:
+        pending = [name for name in names if name not in _prepared]
+        if pending:
+            # Imported here: mmap_weights imports this module.
+            from mmap_weights import MMAP_WEIGHTS, ensure_safetensors
+            started = time.monotonic()
+            bucket = _open_bucket()
+            for name in pending:
+                model_started = time.monotonic()
+                local_path = model_dir(name)
+                if bucket is None:
+                    if not os.path.isdir(local_path):
+                        raise FileNotFoundError(f"Model directory not found: {local_path}")
+                    stats = {"downloaded": 0, "skipped": 0, "deleted": 0}
+                else:
+                    stats = sync_directory(bucket, MODELS[name][0], local_path)
+                if MMAP_WEIGHTS:
+                    # Convert once here so every worker maps the same file.
+                    ensure_safetensors(local_path)
+                _prepared[name] = local_path
+                MODEL_SYNC_SECONDS.labels(model=name).set(time.monotonic() - model_started)
+                logger.info(
+                    "Prepared model %s in %.2fs (%d downloaded, %d up to date, %d deleted) -> %s",
+                    name, time.monotonic() - model_started, stats["downloaded"], stats["skipped"], stats["deleted"],
+                    local_path
+                )
+            logger.info("Model preparation finished in %.2fs", time.monotonic() - started)
+        return {name: _prepared[name] for name in names}
@@ -0,0 +1,120 @@
+import os
+import json
+import shutil
+import inspect
+import logging
+
+import torch
+
+from model_store import LOCAL_MODEL_BASE_PATH
+from mmap_weights import load_pretrained
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# MULTI-HEAD MODEL CONFIGURATION
+# ============================================================
+# Political bias, SBIC, fake news and Dbias each run a full encoder over
+# the same text. A multi-head model runs one shared encoder once and four
+# small heads on its [CLS] state; it is distilled from the four models
+# (distill_multihead.py) and replaces them in ml_analysis when
+# CLEARIFY_MULTIHEAD=1 and an artifact exists in CLEARIFY_MULTIHEAD_DIR.
+# Each head reproduces its teacher's label order, so the result functions
+# in ml_analysis read its probabilities unchanged.
+MULTIHEAD_ENABLED = os.getenv("CLEARIFY_MULTIHEAD", "0") == "1"
+MULTIHEAD_DIR = os.getenv("CLEARIFY_MULTIHEAD_DIR", os.path.join(LOCAL_MODEL_BASE_PATH, "multihead"))
+
+HEADS = ("political", "sbic", "fake_news", "dbias")
+
+# Artifact layout:
+#   encoder/            - transformers AutoModel + tokenizer (save_pretrained)
+#   heads.safetensors   - the heads' state dict
+#   multihead.json      - head sizes, teachers and training settings
+FORMAT_VERSION = 1
+ENCODER_DIR = "encoder"
+HEADS_FILE = "heads.safetensors"
+META_FILE = "multihead.json"
+
+
+class MultiHeadClassifier(torch.nn.Module):
+    """Shared encoder plus one classification head per task.
+
+    forward() returns {head: logits}; every head reads the same hidden states.
+    """
+
+    def __init__(self, encoder, head_sizes: dict, dropout: float = 0.1):
+        super().__init__()
+        self.encoder = encoder
+        hidden = encoder.config.hidden_size
+        self.heads = torch.nn.ModuleDict({
+            name: torch.nn.Sequential(
+                torch.nn.Dropout(dropout),
+                torch.nn.Linear(hidden, hidden),
+                torch.nn.Tanh(),
+                torch.nn.Dropout(dropout),
+                torch.nn.Linear(hidden, size),
+            )
+            for name, size in head_sizes.items()
+        })
+        # Tokenizers emit inputs some encoders do not take (token_type_ids
+        # for DistilBERT).
+        self._input_names = set(inspect.signature(encoder.forward).parameters)
+
+    @property
+    def head_sizes(self) -> dict:
+        return {name: head[-1].out_features for name, head in self.heads.items()}
+
+    def forward(self, **inputs):
+        inputs = {key: value for key, value in inputs.items() if key in self._input_names}
+        cls_state = self.encoder(**inputs).last_hidden_state[:, 0]
+        return {name: head(cls_state) for name, head in self.heads.items()}
+
+
+# ============================================================
+# ARTIFACT
+# ============================================================
+def has_multihead(path: str = MULTIHEAD_DIR) -> bool:
+    return os.path.isfile(os.path.join(path, META_FILE))
+
+
+def save_multihead(model: MultiHeadClassifier, tokenizer, out_dir: str, metadata: dict = None):
+    """Writes the artifact to `out_dir`, replacing any previous one."""
+    from safetensors.torch import save_file
+
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    encoder_dir = os.path.join(tmp_dir, ENCODER_DIR)
+    model.encoder.save_pretrained(encoder_dir)
+    tokenizer.save_pretrained(encoder_dir)
+    heads = {key: value.detach().contiguous() for key, value in model.heads.state_dict().items()}
+    save_file(heads, os.path.join(tmp_dir, HEADS_FILE), metadata={"format": "pt"})
+    meta = {"format": FORMAT_VERSION, "heads": model.head_sizes}
+    meta.update(metadata or {})
+    with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_dir)), exist_ok=True)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+
+
+def load_multihead(path: str = MULTIHEAD_DIR):
+    """Returns (tokenizer, model) in eval mode. The encoder is memory-mapped
+    with CLEARIFY_MMAP_WEIGHTS=1, like the separate models."""
+    from transformers import AutoModel, AutoTokenizer
+    from safetensors.torch import load_file
+
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    if meta.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported multi-head format {meta.get('format')!r} in {path}")
+    missing = [name for name in HEADS if name not in meta["heads"]]
+    if missing:
+        raise ValueError(f"Multi-head model in {path} has no head for {', '.join(missing)}")
+
+    encoder_dir = os.path.join(path, ENCODER_DIR)
+    tokenizer = AutoTokenizer.from_pretrained(encoder_dir)
+    model = MultiHeadClassifier(load_pretrained(encoder_dir, AutoModel), meta["heads"])
+    model.heads.load_state_dict(load_file(os.path.join(path, HEADS_FILE)))
+    model.eval()
+    return tokenizer, model
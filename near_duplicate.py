@@ -0,0 +1,198 @@
+import os
+import zlib
+import base64
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from document import as_document
+from database import load_fingerprints, store_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# NEAR-DUPLICATE CONFIGURATION
+# ============================================================
+# Syndicated copies of a story differ in headers, footers and ad text, so
+# their exact digests never match. Each analyzed text gets a MinHash
+# signature over word shingles; an LSH index over signature bands finds
+# candidates in constant time, and a candidate whose estimated Jaccard
+# similarity reaches CLEARIFY_NEAR_DUP_THRESHOLD counts as the same article.
+# Opt-in (CLEARIFY_NEAR_DUP=1): a near-duplicate gets another text's scores.
+NEAR_DUP_ENABLED = os.getenv("CLEARIFY_NEAR_DUP", "0") == "1"
+SIMILARITY_THRESHOLD = float(os.getenv("CLEARIFY_NEAR_DUP_THRESHOLD", "0.8"))
+SHINGLE_WORDS = int(os.getenv("CLEARIFY_NEAR_DUP_SHINGLE", "5"))
+# Short texts share too few shingles for a meaningful estimate.
+MIN_WORDS = int(os.getenv("CLEARIFY_NEAR_DUP_MIN_WORDS", "50"))
+MAX_ENTRIES = int(os.getenv("CLEARIFY_NEAR_DUP_MAX_ENTRIES", "20000"))
+
+# 32 bands of 4 rows: pairs at 0.8 similarity are nearly always candidates,
+# pairs at 0.3 about 23% of the time; candidates are then checked on the
+# full signature.
+NUM_PERM = 128
+BAND_ROWS = 4
+BANDS = NUM_PERM // BAND_ROWS
+
+# Fingerprints are kept in Postgres next to the analysis cache.
+PERSISTENT_ENABLED = os.getenv("CLEARIFY_NEAR_DUP_PERSISTENT", "1") == "1" and bool(os.getenv("DATABASE_URL"))
+PERSISTENT_TTL_SECONDS = float(os.getenv("CLEARIFY_NEAR_DUP_DB_TTL_S", str(7 * 86400)))
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+# Fixed seed: every worker, and every restart, must draw the same
+# permutations or persisted signatures become meaningless.
+_rng = np.random.RandomState(20240611)
+_PERM_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+# Persisted signatures carry this tag; ones drawn with other permutations
+# fail to decode and are skipped.
+SIGNATURE_VERSION = "mh2"
+
+
+class Match:
+    def __init__(self, doc_id: str, similarity: float):
+        self.doc_id = doc_id
+        self.similarity = similarity
+
+
+# ============================================================
+# MINHASH
+# ============================================================
+def _shingle_hashes(words):
+    n = max(len(words) - SHINGLE_WORDS + 1, 1)
+    return np.fromiter(
+        (zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8")) for i in range(n)),
+        dtype=np.uint64, count=n
+    )
+
+
+def minhash(words) -> np.ndarray:
+    """NUM_PERM uint32 minimums of (a*x + b) mod p over the shingle hashes."""
+    hashes = _shingle_hashes(words)
+    # a*x + b wraps around 2**64 before the mod, which scrambles the order
+    # of the shingle hashes. With a kept below 2**31 it would not wrap and
+    # every permutation would follow nearly the same order, so the
+    # signature positions would be strongly correlated and similarity
+    # estimates far off.
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME
+    return (permuted.min(axis=1) & _MAX_HASH).astype(np.uint32)
+
+
+def fingerprint(text):
+    """MinHash signature of a text (memoized on its Document), or None when too short."""
+    document = as_document(text)
+    return document.memo("minhash", lambda: minhash(document.words) if len(document.words) >= MIN_WORDS else None)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the two shingle sets."""
+    return float(np.count_nonzero(a == b)) / len(a)
+
+
+def encode_signature(signature: np.ndarray) -> str:
+    return f"{SIGNATURE_VERSION}:" + base64.b64encode(signature.astype("<u4").tobytes()).decode("ascii")
+
+
+def decode_signature(encoded: str) -> np.ndarray:
+    version, _, data = encoded.rpartition(":")
+    if version != SIGNATURE_VERSION:
+        raise ValueError(f"Signature version {version or 'none'!r} is not {SIGNATURE_VERSION!r}")
+    signature = np.frombuffer(base64.b64decode(data), dtype="<u4").astype(np.uint32)
+    if len(signature) != NUM_PERM:
+        raise ValueError(f"Signature has {len(signature)} values, expected {NUM_PERM}")
+    return signature
+
+
+def _band_keys(signature: np.ndarray):
+    return [(band, signature[band * BAND_ROWS:(band + 1) * BAND_ROWS].tobytes()) for band in range(BANDS)]
+
+
+# ============================================================
+# LSH INDEX
+# ============================================================
+class NearDuplicateIndex:
+    """In-memory LSH index of signatures, oldest entries evicted first,
+    optionally backed by the near_duplicate_fingerprints table."""
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, max_entries: int = MAX_ENTRIES,
+                 persistent: bool = PERSISTENT_ENABLED):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._signatures = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._loaded_pid = None
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _insert(self, doc_id: str, signature: np.ndarray):
+        # Caller holds the lock.
+        if doc_id in self._signatures:
+            return
+        self._signatures[doc_id] = signature
+        for key in _band_keys(signature):
+            self._buckets.setdefault(key, set()).add(doc_id)
+        while len(self._signatures) > self.max_entries:
+            old_id, old_signature = self._signatures.popitem(last=False)
+            for key in _band_keys(old_signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(old_id)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def _ensure_loaded(self):
+        # Once per process: gunicorn forks after import.
+        if not self.persistent or self._loaded_pid == os.getpid():
+            return
+        with self._lock:
+            if self._loaded_pid == os.getpid():
+                return
+            self._loaded_pid = os.getpid()
+        rows = load_fingerprints(self.max_entries, PERSISTENT_TTL_SECONDS)
+        with self._lock:
+            for doc_id, encoded in rows:
+                try:
+                    self._insert(doc_id, decode_signature(encoded))
+                except ValueError:
+                    continue
+        logger.info("Loaded %d near-duplicate fingerprints.", len(rows))
+
+    def query(self, signature: np.ndarray):
+        """Best indexed match at or above the threshold, or None."""
+        with self._lock:
+            candidates = set()
+            for key in _band_keys(signature):
+                candidates |= self._buckets.get(key, set())
+            scored = [(similarity(signature, self._signatures[doc_id]), doc_id) for doc_id in candidates]
+        if not scored:
+            return None
+        best, doc_id = max(scored)
+        return Match(doc_id, best) if best >= self.threshold else None
+
+    def lookup(self, text):
+        """Match for an earlier text similar to `text`, or None."""
+        signature = fingerprint(text)
+        if signature is None:
+            return None
+        self._ensure_loaded()
+        return self.query(signature)
+
+    def add(self, doc_id: str, text):
+        """Indexes `text` under `doc_id` (its digest); too-short texts are skipped."""
+        signature = fingerprint(text)
+        if signature is None:
+            return
+        self._ensure_loaded()
+        with self._lock:
+            known = doc_id in self._signatures
+            self._insert(doc_id, signature)
+        if self.persistent and not known:
+            store_fingerprint(doc_id, encode_signature(signature))
+
+
+near_duplicates = NearDuplicateIndex()
@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import logging
+import argparse
+import numpy as np
+
+from model_store import LOCAL_MODEL_BASE_PATH
+from result_cache import fingerprint_directory
+from stages import INTRA_OP_THREADS, INTER_OP_THREADS
+from datasets_io import sample_texts
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# ONNX BACKEND CONFIGURATION
+# ============================================================
+# Per-model backend selection, e.g.
+#   CLEARIFY_MODEL_BACKENDS="political=onnx-int8,fake_news=onnx,emotion=onnx-int8"
+# Models not listed keep PyTorch. Dbias can use ONNX only once it has been
+# converted to PyTorch (see dbias_torch.py).
+ONNX_BACKENDS = ("onnx", "onnx-int8")
+ONNX_CACHE_DIR = os.getenv("CLEARIFY_ONNX_DIR", os.path.join(LOCAL_MODEL_BASE_PATH, "onnx"))
+ONNX_OPSET = int(os.getenv("CLEARIFY_ONNX_OPSET", "14"))
+
+
+def configured_backends() -> dict:
+    backends = {}
+    for item in os.getenv("CLEARIFY_MODEL_BACKENDS", "").split(","):
+        if "=" in item:
+            name, backend = item.split("=", 1)
+            backends[name.strip()] = backend.strip()
+    return backends
+
+
+def model_backend(name: str, default: str = "torch") -> str:
+    backend = configured_backends().get(name, default)
+    if backend not in (default,) + ONNX_BACKENDS:
+        raise ValueError(f"Unsupported backend {backend!r} for model {name}")
+    return backend
+
+
+# ============================================================
+# EXPORT AND QUANTIZATION
+# ============================================================
+def _artifact_path(name: str, model_path: str, backend: str) -> str:
+    # Keyed by a hash of the source's content, so a retrained model is
+    # re-exported even when its file sizes did not change.
+    suffix = "int8.onnx" if backend == "onnx-int8" else "fp32.onnx"
+    return os.path.join(ONNX_CACHE_DIR, name, f"{fingerprint_directory(model_path)}.{suffix}")
+
+
+def export_onnx(model_path: str, out_path: str):
+    """Exports a sequence-classification checkpoint to ONNX (logits output)."""
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+
+    dummy = tokenizer(["Clearify export sample.", "A second, longer sample sentence."],
+                      padding=True, return_tensors="pt")
+    input_names = [n for n in tokenizer.model_input_names if n in dummy]
+
+    class _LogitsOnly(torch.nn.Module):
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, *args):
+            return self.inner(**dict(zip(input_names, args))).logits
+
+    dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    tmp_path = out_path + ".tmp"
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model),
+            tuple(dummy[n] for n in input_names),
+            tmp_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=ONNX_OPSET,
+            do_constant_folding=True,
+        )
+    os.replace(tmp_path, out_path)
+
+
+def quantize_onnx(in_path: str, out_path: str):
+    """Dynamic int8 quantization of the weights (activations stay fp32)."""
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    tmp_path = out_path + ".tmp"
+    quantize_dynamic(in_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, out_path)
+
+
+def ensure_onnx_artifact(name: str, model_path: str, backend: str) -> str:
+    """Returns the ONNX file for a model, exporting/quantizing it on first use."""
+    fp32_path = _artifact_path(name, model_path, "onnx")
+    if not os.path.isfile(fp32_path):
+        logger.info("Exporting %s to ONNX: %s", name, fp32_path)
+        export_onnx(model_path, fp32_path)
+    if backend == "onnx":
+        return fp32_path
+
+    int8_path = _artifact_path(name, model_path, "onnx-int8")
+    if not os.path.isfile(int8_path):
+        logger.info("Quantizing %s to int8: %s", name, int8_path)
+        quantize_onnx(fp32_path, int8_path)
+    return int8_path
+
+
+# ============================================================
+# RUNTIME
+# ============================================================
+def _softmax(logits):
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def _sigmoid(logits):
+    return 1.0 / (1.0 + np.exp(-logits))
+
+
+class OnnxClassifier:
+    """A sequence classifier served by ONNX Runtime on CPU."""
+
+    def __init__(self, onnx_path: str):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = INTRA_OP_THREADS
+        options.inter_op_num_threads = INTER_OP_THREADS
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.path = onnx_path
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def logits(self, tokenizer, encodings):
+        inputs = tokenizer.pad(encodings, return_tensors="np")
+        feed = {n: np.asarray(inputs[n], dtype=np.int64) for n in self.input_names}
+        return self.session.run(["logits"], feed)[0]
+
+    def predict_probs(self, tokenizer, encodings):
+        return [row for row in _softmax(self.logits(tokenizer, encodings))]
+
+
+def load_onnx_classifier(name: str, model_path: str, backend: str) -> OnnxClassifier:
+    return OnnxClassifier(ensure_onnx_artifact(name, model_path, backend))
+
+
+class OnnxTextClassificationPipeline:
+    """Drop-in for the transformers text-classification pipeline used for
+    emotions (return_all_scores=True), backed by ONNX Runtime."""
+
+    def __init__(self, name: str, model_path: str, backend: str):
+        from transformers import AutoTokenizer, AutoConfig
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        self.config = AutoConfig.from_pretrained(model_path)
+        self.classifier = load_onnx_classifier(name, model_path, backend)
+        # Same rule the transformers pipeline uses to pick the activation.
+        self.multi_label = (
+            self.config.problem_type == "multi_label_classification" or self.config.num_labels == 1
+        )
+
+    def __call__(self, inputs, batch_size=None, truncation=True, max_length=512, **kwargs):
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        batch_size = batch_size or len(texts) or 1
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            encodings = [self.tokenizer(t, truncation=truncation, max_length=max_length) for t in batch]
+            logits = self.classifier.logits(self.tokenizer, encodings)
+            probs = _sigmoid(logits) if self.multi_label else _softmax(logits)
+            for row in probs:
+                outputs.append([
+                    {"label": self.config.id2label[i], "score": float(score)}
+                    for i, score in enumerate(row)
+                ])
+        return outputs
+
+
+# ============================================================
+# PARITY CHECK
+# ============================================================
+def parity_report(name: str, model_path: str, backend: str, texts) -> dict:
+    """Compares ONNX probabilities with the original PyTorch model."""
+    import torch
+    import torch.nn.functional as F
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    reference = AutoModelForSequenceClassification.from_pretrained(model_path)
+    reference.eval()
+    candidate = load_onnx_classifier(name, model_path, backend)
+
+    max_delta, total_delta, agree = 0.0, 0.0, 0
+    for text in texts:
+        encodings = [tokenizer(text, truncation=True, max_length=512)]
+        with torch.no_grad():
+            ref_probs = F.softmax(reference(**tokenizer.pad(encodings, return_tensors="pt")).logits, dim=-1)
+        ref_probs = ref_probs.numpy()[0]
+        onnx_probs = candidate.predict_probs(tokenizer, encodings)[0]
+        delta = float(np.abs(ref_probs - onnx_probs).max())
+        max_delta = max(max_delta, delta)
+        total_delta += delta
+        agree += int(ref_probs.argmax() == onnx_probs.argmax())
+
+    n = max(len(texts), 1)
+    return {
+        "model": name,
+        "backend": backend,
+        "samples": len(texts),
+        "max_prob_delta": round(max_delta, 6),
+        "mean_prob_delta": round(total_delta / n, 6),
+        "label_agreement": round(agree / n, 4),
+        "onnx_file_mb": round(os.path.getsize(candidate.path) / 2**20, 1),
+    }
+
+
+def main(argv=None):
+    from model_store import prepare_models
+
+    parser = argparse.ArgumentParser(description="Export models to ONNX and report parity with PyTorch.")
+    parser.add_argument("--models", nargs="+", default=["political", "sbic", "fake_news", "emotion"])
+    parser.add_argument("--backend", choices=ONNX_BACKENDS, default="onnx-int8")
+    parser.add_argument("--samples", type=int, default=50, help="texts from the bundled fake-news set")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    texts = sample_texts(args.samples)
+    paths = prepare_models(args.models)
+    reports = [parity_report(name, paths[name], args.backend, texts) for name in args.models]
+    json.dump(reports, sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
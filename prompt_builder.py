@@ -0,0 +1,238 @@
+import os
+import re
+import json
+import math
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# PROMPT BUDGET CONFIGURATION
+# ============================================================
+# The summary prompt is held to PROMPT_TOKEN_BUDGET (estimated) tokens.
+# When the article does not fit, only its most salient sentences are sent,
+# in their original order. Tokens are estimated at ~4 characters each,
+# which is close enough for budgeting Gemini prompts offline.
+PROMPT_TOKEN_BUDGET = int(os.getenv("CLEARIFY_PROMPT_TOKEN_BUDGET", "1200"))
+CHARS_PER_TOKEN = 4.0
+# Sentences longer than this are cut, so one run-on sentence cannot eat the budget.
+MAX_SENTENCE_TOKENS = int(os.getenv("CLEARIFY_PROMPT_MAX_SENTENCE_TOKENS", "120"))
+
+# Part of the summary cache version: a different budget gives a different prompt.
+PROMPT_SIGNATURE = f"prompt-v1-{PROMPT_TOKEN_BUDGET}-{MAX_SENTENCE_TOKENS}"
+
+# Salience weights.
+LEAD_WEIGHT = 1.5        # news puts the key facts first
+ENTITY_WEIGHT = 0.6      # per named entity
+KEYWORD_WEIGHT = 0.4     # per frequent content word
+SIGNAL_WEIGHT = 0.8      # per word behind a score (repeated words, bias category)
+
+PROMPT_TEMPLATE = """You are an unbiased political content summarizer.
+Here is analysis data from Clearify (JSON, including weighted votes):
+{analysis}
+
+Article{excerpt_note}:
+{article}
+
+Generate a concise summary with:
+- overall_summary
+- political_bias_summary
+- social_bias_summary
+- fake_news_summary
+- final_verdict
+
+Return ONLY JSON."""
+
+_SENTENCE_PATTERN = re.compile(r"[^.!?\n]+(?:[.!?]+[\"')\]]*|\n|$)")
+_WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z'-]{2,}")
+_STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further had has
+have having he her here hers herself him himself his how i if in into is it its itself just me more
+most my myself no nor not now of off on once only or other our ours ourselves out over own said same
+she should so some such than that the their theirs them themselves then there these they this those
+through to too under until up very was we were what when where which while who whom why will with
+would you your yours yourself yourselves says say one two new
+""".split())
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _rounded(value, digits: int = 3):
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {key: _rounded(item, digits) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_rounded(item, digits) for item in value]
+    return value
+
+
+def compact_json(analysis: dict) -> str:
+    """Analysis as minified JSON with floats rounded to 3 digits."""
+    return json.dumps(_rounded(analysis), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def legacy_prompt(text: str, analysis: dict) -> str:
+    """The prompt as it was built before compaction (full text + dict repr)."""
+    full = dict(analysis, input_text=text)
+    return f"""
+    You are an unbiased political content summarizer.
+    Here is raw analysis data from Clearify (including weighted votes):
+
+    {full}
+
+    Generate a concise summary with:
+    - overall_summary
+    - political_bias_summary
+    - social_bias_summary
+    - fake_news_summary
+    - final_verdict
+
+    Return ONLY JSON.
+    """
+
+
+# ============================================================
+# SENTENCES
+# ============================================================
+# Replaces the in-process spaCy split when spaCy lives elsewhere (the
+# inference server); set through use_sentence_splitter().
+_sentence_splitter = None
+
+
+def use_sentence_splitter(splitter):
+    """Routes split_sentences() through `splitter(text)` (None restores spaCy)."""
+    global _sentence_splitter
+    _sentence_splitter = splitter
+
+
+def regex_sentences(text: str):
+    """[(sentence, entity_count)] without spaCy; capitalised inner words stand in for entities."""
+    sentences = []
+    for match in _SENTENCE_PATTERN.finditer(text):
+        sentence = match.group(0).strip()
+        if sentence:
+            words = sentence.split()
+            entities = sum(1 for word in words[1:] if word[:1].isupper())
+            sentences.append((sentence, entities))
+    return sentences
+
+
+def spacy_sentences(text: str, doc=None):
+    """[(sentence, entity_count)] from a spaCy parse with sentences and entities.
+
+    Without `doc`, a Document's shared parse (the one the spacy stage
+    produced) is used, and made if no stage has parsed it yet.
+    """
+    if doc is None:
+        from spacyanalyzer import shared_doc
+        doc = shared_doc(text)
+    return [(sent.text.strip(), len(sent.ents)) for sent in doc.sents if sent.text.strip()]
+
+
+def split_sentences(text: str, doc=None):
+    try:
+        if doc is None and _sentence_splitter is not None:
+            return _sentence_splitter(text)
+        return spacy_sentences(text, doc)
+    except Exception as e:
+        logger.warning("spaCy sentence split unavailable (%s); using the regex splitter.", e)
+        return regex_sentences(text)
+
+
+# ============================================================
+# SALIENCE
+# ============================================================
+def _content_words(text: str):
+    return [word.lower() for word in _WORD_PATTERN.findall(text) if word.lower() not in _STOPWORDS]
+
+
+def score_sentences(sentences, signal_words=()):
+    """Salience per sentence from position, entities, the article's frequent
+    content words and the words behind the model scores."""
+    frequencies = Counter(word for sentence, _ in sentences for word in set(_content_words(sentence)))
+    keywords = {word for word, count in frequencies.most_common(15) if count > 1}
+    signals = {word.lower() for word in signal_words}
+
+    scores = []
+    for index, (sentence, entities) in enumerate(sentences):
+        words = set(_content_words(sentence))
+        score = (
+            LEAD_WEIGHT / (1 + index)
+            + ENTITY_WEIGHT * entities
+            + KEYWORD_WEIGHT * len(words & keywords)
+            + SIGNAL_WEIGHT * len(words & signals)
+        )
+        # Favour informative sentences over fragments without rewarding sheer length.
+        scores.append(score / math.sqrt(max(len(words), 1)) * math.log2(2 + len(words)))
+    return scores
+
+
+def _truncate(sentence: str, max_tokens: int) -> str:
+    max_chars = int(max_tokens * CHARS_PER_TOKEN)
+    if len(sentence) <= max_chars:
+        return sentence
+    return sentence[:max_chars].rsplit(" ", 1)[0] + " …"
+
+
+def select_sentences(sentences, scores, token_budget: int):
+    """Greedy pick by salience within `token_budget`; returns kept sentences in text order."""
+    picked, used = [], 0
+    for index in sorted(range(len(sentences)), key=lambda i: -scores[i]):
+        sentence = _truncate(sentences[index][0], MAX_SENTENCE_TOKENS)
+        cost = estimate_tokens(sentence) + 1
+        if used + cost > token_budget:
+            continue
+        picked.append((index, sentence))
+        used += cost
+    return [sentence for _, sentence in sorted(picked)]
+
+
+# ============================================================
+# PROMPT
+# ============================================================
+def build_summary_prompt(text: str, analysis: dict, token_budget: int = PROMPT_TOKEN_BUDGET,
+                         signal_words=(), doc=None, sentence_splitter=None):
+    """Returns (prompt, stats) for the Gemini summary, within `token_budget`.
+
+    `analysis` holds everything except the text. `signal_words` are words
+    behind the scores (e.g. the most repeated words); sentences containing
+    them rank higher. `doc` may be an existing spaCy parse with sentences
+    and entities; `sentence_splitter(text)` can replace the spaCy split
+    (the offline harness uses this).
+    """
+    analysis_json = compact_json(analysis)
+    skeleton = PROMPT_TEMPLATE.format(analysis=analysis_json, excerpt_note="", article="")
+    text_budget = max(token_budget - estimate_tokens(skeleton) - 8, 0)
+
+    stats = {
+        "original_tokens": estimate_tokens(legacy_prompt(text, analysis)),
+        "text_tokens": estimate_tokens(text),
+        "sentences_total": None,
+        "sentences_kept": None,
+    }
+
+    if estimate_tokens(text) <= text_budget:
+        prompt = PROMPT_TEMPLATE.format(analysis=analysis_json, excerpt_note="", article=text.strip())
+    else:
+        sentences = sentence_splitter(text) if sentence_splitter else split_sentences(text, doc)
+        scores = score_sentences(sentences, signal_words)
+        kept = select_sentences(sentences, scores, text_budget)
+        stats["sentences_total"], stats["sentences_kept"] = len(sentences), len(kept)
+        prompt = PROMPT_TEMPLATE.format(
+            analysis=analysis_json,
+            excerpt_note=" (most salient sentences, in order)",
+            article="\n".join(kept),
+        )
+
+    stats["prompt_tokens"] = estimate_tokens(prompt)
+    logger.info(
+        "Gemini prompt: ~%d -> ~%d tokens (budget %d, sentences %s/%s)",
+        stats["original_tokens"], stats["prompt_tokens"], token_budget,
+        stats["sentences_kept"], stats["sentences_total"]
+    )
+    return prompt, stats
@@ -0,0 +1,179 @@
+import os
+import re
+import json
+import time
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+from database import load_cached_result, store_cached_result
+from metrics import CACHE_LOOKUPS
+from model_store import MANIFEST_NAME, file_md5, load_manifest
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CACHE CONFIGURATION
+# ============================================================
+# Results are cached per analyzer stage, keyed by the normalized text and
+# the version of the model behind that stage, so upgrading one model only
+# invalidates that model's entries.
+CACHE_ENABLED = os.getenv("CLEARIFY_CACHE", "1") == "1"
+MEMORY_MAX_ENTRIES = int(os.getenv("CLEARIFY_CACHE_MAX_ENTRIES", "2048"))
+MEMORY_TTL_SECONDS = float(os.getenv("CLEARIFY_CACHE_TTL_S", "86400"))
+
+# The persistent tier lives in Postgres next to the feedback table.
+PERSISTENT_ENABLED = os.getenv("CLEARIFY_CACHE_PERSISTENT", "1") == "1" and bool(os.getenv("DATABASE_URL"))
+PERSISTENT_TTL_SECONDS = float(os.getenv("CLEARIFY_CACHE_DB_TTL_S", str(7 * 86400)))
+
+
+# ============================================================
+# KEYS AND VERSIONS
+# ============================================================
+def normalize_text(text: str) -> str:
+    """Canonical form used for hashing: NFKC, collapsed whitespace."""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+_file_digests = {}
+_file_digests_lock = threading.Lock()
+
+
+def _file_digest(file_path: str) -> str:
+    """MD5 of a file's bytes, remembered while its size and mtime hold."""
+    stat = os.stat(file_path)
+    key = (file_path, stat.st_size, stat.st_mtime_ns)
+    with _file_digests_lock:
+        digest = _file_digests.get(key)
+    if digest is None:
+        digest = file_md5(file_path)
+        with _file_digests_lock:
+            _file_digests[key] = digest
+    return digest
+
+
+def fingerprint_directory(path: str) -> str:
+    """Short version tag for a model directory.
+
+    Hashes the name and content of every file, so a retrained checkpoint
+    with the same architecture (and file sizes) gets a new tag. Files that
+    model_store synced are taken from its manifest, whose MD5s were checked
+    on download; anything else is hashed here.
+    """
+    digest = hashlib.sha256()
+    if not os.path.isdir(path):
+        return "missing"
+    manifest = load_manifest(path)
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name == MANIFEST_NAME or name.endswith((".part", ".tmp")):
+                continue
+            file_path = os.path.join(root, name)
+            rel_path = os.path.relpath(file_path, path).replace(os.sep, "/")
+            entry = manifest.get(rel_path)
+            if entry and entry.get("md5") and entry.get("size") == os.path.getsize(file_path):
+                file_digest = entry["md5"]
+            else:
+                file_digest = _file_digest(file_path)
+            digest.update(f"{rel_path}:{file_digest};".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def cache_key(stage: str, version: str, digest: str) -> str:
+    return hashlib.sha256(f"{stage}:{version}:{digest}".encode("utf-8")).hexdigest()
+
+
+# ============================================================
+# IN-PROCESS LRU TIER
+# ============================================================
+class LRUCache:
+    """Thread-safe LRU with a size cap and per-entry TTL."""
+
+    def __init__(self, max_entries: int = MEMORY_MAX_ENTRIES, ttl_seconds: float = MEMORY_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# ============================================================
+# TWO-TIER RESULT CACHE
+# ============================================================
+class ResultCache:
+    """Memory LRU in front of the Postgres analysis_cache table."""
+
+    def __init__(self, memory=None, persistent: bool = PERSISTENT_ENABLED):
+        self.memory = memory if memory is not None else LRUCache()
+        self.persistent = persistent
+
+    def get(self, stage: str, version: str, digest: str):
+        """Returns (hit, value)."""
+        if not CACHE_ENABLED:
+            return False, None
+        key = cache_key(stage, version, digest)
+
+        hit, value = self.memory.get(key)
+        if hit:
+            CACHE_LOOKUPS.labels(stage=stage, result="memory_hit").inc()
+            return True, value
+
+        if self.persistent:
+            payload = load_cached_result(key, PERSISTENT_TTL_SECONDS)
+            if payload is not None:
+                value = json.loads(payload)
+                self.memory.put(key, value)
+                CACHE_LOOKUPS.labels(stage=stage, result="persistent_hit").inc()
+                return True, value
+        CACHE_LOOKUPS.labels(stage=stage, result="miss").inc()
+        return False, None
+
+    def put(self, stage: str, version: str, digest: str, value):
+        if not CACHE_ENABLED:
+            return
+        key = cache_key(stage, version, digest)
+        self.memory.put(key, value)
+        if self.persistent:
+            store_cached_result(key, stage, json.dumps(value))
+
+    def get_or_compute(self, stage: str, version: str, digest: str, compute, cacheable=None):
+        """Returns (value, "hit" | "miss"); stores computed values that pass `cacheable`."""
+        hit, value = self.get(stage, version, digest)
+        if hit:
+            return value, "hit"
+        value = compute()
+        if cacheable is None or cacheable(value):
+            self.put(stage, version, digest, value)
+        return value, "miss"
+
+
+result_cache = ResultCache()
@@ -1,21 +1,38 @@
-from newspaper import Article
-import nltk
+from concurrent.futures import ThreadPoolExecutor
 
-#Ensuring the punkt is available
-nltk.download('punkt', quiet=True)
+from extractor import extract_article_text
+from deadline import cap_timeout
+from fetcher import FETCH_WORKERS, TOTAL_TIMEOUT, get_fetcher
+from metrics import SCRAPES, STAGE_SECONDS
 
-#Integrating Newspaper3k 
+# Nothing here touches the network at import time: pages are downloaded by
+# the fetcher and parsed by the extractor (lxml fast path, newspaper3k as
+# fallback). Article.parse() does not need NLTK's punkt data.
 
-def scrape_article(url):
+def scrape_article(url, deadline=None):
     try:
-        article = Article(url)
-        article.download()
-        article.parse()
-        return article.text
+        # Download through the pooled fetcher (timeouts, per-host limits,
+        # conditional cache), then extract the body text. With a request
+        # deadline, the download may not run past it.
+        with STAGE_SECONDS.labels(stage="fetch").time():
+            html = get_fetcher().fetch(url, total_timeout=cap_timeout(TOTAL_TIMEOUT, deadline)).html
+        with STAGE_SECONDS.labels(stage="extract").time():
+            text, method = extract_article_text(html, url)
+        SCRAPES.labels(result="ok", method=method).inc()
+        return text
     except Exception as e:
         print(f"Scraper error: {e}")
+        SCRAPES.labels(result="error", method="none").inc()
         return None
 
+def scrape_articles(urls, max_workers=FETCH_WORKERS, deadline=None):
+    """Scrapes several URLs concurrently; results (text or None) follow the input order."""
+    urls = list(urls)
+    if not urls:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls)), thread_name_prefix="scraper") as pool:
+        return list(pool.map(lambda url: scrape_article(url, deadline), urls))
+
 def fetch_data():
     text = scrape_article()
     return [{"text": text}]
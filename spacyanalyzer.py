@@ -1,61 +1,27 @@
 import os
+import re
+import time
 import spacy
 from spacytextblob.spacytextblob import SpacyTextBlob
-from collections import Counter
-import re
-from typing import Dict
+from typing import Dict, Iterable, List, Union
+from spacy.tokens import Doc
 
 
 import torch
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-from google.cloud import storage 
-
-# --- GCS CONFIGURATION ---
-BUCKET_NAME = "clearify" 
-PROJECT_ID = "eighth-breaker-478412-h9" 
-LOCAL_MODEL_BASE_PATH = "/tmp/huggingface_models"
-GCS_EMOTION_PATH = "emotion_model"
-LOCAL_EMOTION_MODEL_DIR = os.path.join(LOCAL_MODEL_BASE_PATH, "emotion_model")
-
-def download_directory_from_gcs(gcs_prefix: str, local_path: str):
-    """Downloads all files under a GCS prefix to a local directory."""
-    print(f"Starting download: gs://{BUCKET_NAME}/{gcs_prefix} -> {local_path}")
-    
-    os.makedirs(local_path, exist_ok=True)
-    storage_client = storage.Client(project=PROJECT_ID)
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blobs = bucket.list_blobs(prefix=gcs_prefix)
-    
-    download_count = 0
-    for blob in blobs:
-        if blob.name == gcs_prefix or blob.name.endswith('/'):
-            continue
-            
-        prefix_with_slash = gcs_prefix if gcs_prefix.endswith('/') else gcs_prefix + '/'
-        relative_path = blob.name[len(prefix_with_slash):]
-        local_file_path = os.path.join(local_path, relative_path)
-        
-        os.makedirs(os.path.dirname(local_file_path), exist_ok=True)
-        blob.download_to_filename(local_file_path)
-        download_count += 1
-        
-    if download_count == 0:
-        print(f"WARNING: No files found under the prefix: {gcs_prefix}.")
-        
-    print(f"Finished downloading {download_count} files for {gcs_prefix}")
-# ------------------------------------------------------------------------
-
-
-# --- EAGER MODEL DOWNLOAD (RUNS AT IMPORT TIME) ---
-# This ensures the model is available before any functions are called.
-try:
-    print("Starting EMOTION Model GCS Download...")
-    download_directory_from_gcs(GCS_EMOTION_PATH, LOCAL_EMOTION_MODEL_DIR)
-    print("EMOTION Model GCS Download Complete.")
-except Exception as e:
-    print(f"FATAL ERROR: Could not download EMOTION model from GCS: {e}")
-    # You may want to exit or raise here if the model is critical
-# --------------------------------------------------
+from transformers import pipeline, AutoTokenizer
+from model_store import model_dir, prepare_models
+
+from chunking import (CHUNKING_ENABLED, CHUNKING_SIGNATURE, AGGREGATION as CHUNK_AGGREGATION, AGGREGATION_METHODS,
+                      split_text_windows, aggregate_probs)
+from result_cache import fingerprint_directory
+from document import as_document, memo_batch
+from onnx_backend import ONNX_BACKENDS, model_backend, OnnxTextClassificationPipeline
+from mmap_weights import load_sequence_classifier
+from metrics import MODEL_BATCH_SEQUENCES, MODEL_FORWARD_SECONDS, MODEL_LOAD_SECONDS
+
+# The emotion model is synced by model_store.prepare_models(); the pipeline
+# itself is built lazily on first use.
+LOCAL_EMOTION_MODEL_DIR = model_dir("emotion")
 
 
 # Load SpaCy model
@@ -64,6 +30,18 @@ nlp = spacy.load('en_core_web_sm')
 if "spacytextblob" not in nlp.pipe_names:
     nlp.add_pipe("spacytextblob", last=True)
 
+# Version tags for the result cache.
+SPACY_MODEL_VERSION = f"{nlp.meta['name']}-{nlp.meta['version']}"
+
+
+def emotion_model_version() -> str:
+    """Cache version of the emotion model; call after prepare_models()."""
+    return (
+        f"{fingerprint_directory(LOCAL_EMOTION_MODEL_DIR)}:{model_backend('emotion')}:"
+        f"{CHUNKING_SIGNATURE}:{TONE_SIGNATURE}"
+    )
+
+
 _EMOTION_PIPELINE = None
 
 _SMALL_EMOTION_LEXICON = {
@@ -78,12 +56,19 @@ def _get_emotion_pipeline():
         return _EMOTION_PIPELINE
 
     # The local path now points to the downloaded directory
-    model_path = LOCAL_EMOTION_MODEL_DIR
+    model_path = prepare_models(["emotion"])["emotion"]
+    started = time.monotonic()
+
+    backend = model_backend("emotion")
+    if backend in ONNX_BACKENDS:
+        _EMOTION_PIPELINE = OnnxTextClassificationPipeline("emotion", model_path, backend)
+        MODEL_LOAD_SECONDS.labels(model="emotion").set(time.monotonic() - started)
+        return _EMOTION_PIPELINE
 
     # Create pipeline, loading from the local directory
     tokenizer = AutoTokenizer.from_pretrained(model_path)
-    model = AutoModelForSequenceClassification.from_pretrained(model_path)
-    
+    model = load_sequence_classifier(model_path)
+
     # Ensure the model is moved to CPU for a standard Cloud Run container
     device = torch.device("cpu")
     model.to(device)
@@ -95,21 +80,89 @@ def _get_emotion_pipeline():
         return_all_scores=True,
         # device=-1 for CPU is now redundant since we moved the model explicitly
     )
+    MODEL_LOAD_SECONDS.labels(model="emotion").set(time.monotonic() - started)
     return _EMOTION_PIPELINE
+# ----------------------------
+# Shared spaCy Parse
+# ----------------------------
+# Pipeline components each analysis needs. A parse only runs the union of
+# what its callers ask for; e.g. NER-only skips the parser and lemmatizer,
+# sentiment-only skips every statistical component.
+_REQUIRED_COMPONENTS = {
+    "entities": {"tok2vec", "ner"},
+    "sentiment": {"spacytextblob"},
+    "sentences": {"tok2vec", "parser"},
+}
+
+SPACY_BATCH_SIZE = int(os.getenv("CLEARIFY_SPACY_BATCH_SIZE", "64"))
+SPACY_N_PROCESS = int(os.getenv("CLEARIFY_SPACY_N_PROCESS", "1"))
+
+
+def _disabled_components(needs: Iterable[str]) -> List[str]:
+    required = set()
+    for need in needs:
+        required |= _REQUIRED_COMPONENTS[need]
+    return [name for name in nlp.pipe_names if name not in required]
+
+
+def parse_document(text: str, needs: Iterable[str] = ("entities", "sentiment")) -> Doc:
+    """Parses `text` once, running only the components `needs` requires."""
+    return nlp(text, disable=_disabled_components(needs))
+
+
+def parse_documents(texts: Iterable[str], needs: Iterable[str] = ("entities", "sentiment"),
+                    batch_size: int = SPACY_BATCH_SIZE, n_process: int = SPACY_N_PROCESS):
+    """Bulk version of parse_document built on nlp.pipe; yields Docs in order."""
+    return nlp.pipe(
+        texts,
+        disable=_disabled_components(needs),
+        batch_size=batch_size,
+        n_process=n_process,
+    )
+
+
+# The spacy stage, sentence tone mode and the summary prompt's sentence
+# split all read one parse per request text, memoized on its Document; it
+# runs the parser too, so sentence boundaries come from the same pipeline
+# run as the entities.
+SHARED_PARSE_NEEDS = ("entities", "sentiment", "sentences")
+
+
+def shared_docs(texts: Iterable[str], batch_size: int = SPACY_BATCH_SIZE,
+                n_process: int = SPACY_N_PROCESS) -> List[Doc]:
+    """One Doc per text with SHARED_PARSE_NEEDS, parsed once per Document."""
+    return memo_batch(
+        [as_document(text) for text in texts],
+        ("spacy_doc", SPACY_MODEL_VERSION),
+        lambda documents: list(parse_documents(documents, needs=SHARED_PARSE_NEEDS,
+                                               batch_size=batch_size, n_process=n_process)),
+    )
+
+
+def shared_doc(text: str) -> Doc:
+    return shared_docs([text], n_process=1)[0]
+
+
+def _as_doc(text_or_doc: Union[str, Doc], need: str) -> Doc:
+    if isinstance(text_or_doc, Doc):
+        return text_or_doc
+    return parse_document(text_or_doc, needs=(need,))
+
+
 # ----------------------------
 # Named Entity Recognition
 # ----------------------------
-def extract_entities(text: str):
-    doc = nlp(text)
+def extract_entities(text: Union[str, Doc]):
+    doc = _as_doc(text, "entities")
     return [(ent.text, ent.label_) for ent in doc.ents]
 
 
 # ----------------------------
 # TRUE Sentiment Analysis (spaCyTextBlob)
 # ----------------------------
-def analyze_sentiment(text: str):
+def analyze_sentiment(text: Union[str, Doc]):
 
-    doc = nlp(text)
+    doc = _as_doc(text, "sentiment")
 
     polarity = float(doc._.blob.polarity)
     polarity = round(polarity, 4)
@@ -130,24 +183,111 @@ def analyze_sentiment(text: str):
 
     return label, sentiment_percentage
 
+
+# ----------------------------
+# Entities + Sentiment from one Doc
+# ----------------------------
+def analyze_entities_and_sentiment(text: str) -> Dict:
+    doc = parse_document(text, needs=("entities", "sentiment"))
+    return {"entities": extract_entities(doc), "sentiment": analyze_sentiment(doc)}
+
+
+def analyze_entities_and_sentiment_batch(texts: Iterable[str], batch_size: int = SPACY_BATCH_SIZE,
+                                         n_process: int = SPACY_N_PROCESS) -> List[Dict]:
+    docs = shared_docs(texts, batch_size=batch_size, n_process=n_process)
+    return [{"entities": extract_entities(doc), "sentiment": analyze_sentiment(doc)} for doc in docs]
+
 # ----------------------------
 # Word Frequency
 # ----------------------------
 def analyze_word_repetition(text: str, top_n: int = 5):
-    words = re.findall(r'\b\w+\b', text.lower())
-    common_words = Counter(words).most_common(top_n)
+    # Words and counts are shared with the tone stage through the Document.
+    common_words = as_document(text).word_counts.most_common(top_n)
     return [{"word": w, "count": c} for w, c in common_words]
 
 
 # ----------------------------
 # Tone
 # ----------------------------
-def analyze_tone(text: str) -> Dict:
-
+TONE_BATCH_SIZE = int(os.getenv("CLEARIFY_TONE_BATCH_SIZE", "32"))
+
+# document - the emotion model scores the whole text (in windows when
+#            chunking is on)
+# sentence - it scores the text's sentences that pass a lexicon prefilter,
+#            at most TONE_MAX_SENTENCES per text (the strongest signals), so
+#            the cost per article stays flat as articles grow; the result
+#            adds a per-sentence trajectory
+TONE_MODES = ("document", "sentence")
+TONE_MODE = os.getenv("CLEARIFY_TONE_MODE", "document")
+TONE_MAX_SENTENCES = int(os.getenv("CLEARIFY_TONE_MAX_SENTENCES", "32"))
+TONE_SENTENCE_MAX_TOKENS = int(os.getenv("CLEARIFY_TONE_SENTENCE_MAX_TOKENS", "128"))
+TONE_AGGREGATION = os.getenv("CLEARIFY_TONE_AGGREGATION", "length_weighted")
+
+TONE_SIGNATURE = (
+    f"sentence-{TONE_MAX_SENTENCES}-{TONE_SENTENCE_MAX_TOKENS}-{TONE_AGGREGATION}"
+    if TONE_MODE == "sentence" else "document"
+)
+
+# Prefilter: word stems (any ending) and phrases that mark a sentence as
+# worth scoring. It only decides what reaches the model, so it favours
+# recall; a sentence without a match is treated as emotionally neutral.
+_TONE_SIGNAL_STEMS = sorted(_SMALL_EMOTION_LEXICON | {
+    "afraid", "alarm", "amaz", "anger", "angr", "anguish", "anxi", "ashamed", "awful", "betray", "bitter",
+    "brutal", "catastroph", "celebrat", "cheer", "condemn", "cried", "cries", "crisis", "cruel", "crying", "delight", "despair",
+    "devastat", "disappoint", "disast", "disgrac", "disgust", "distress", "dread", "excit", "fear", "frustrat",
+    "furious", "fury", "glad", "grief", "griev", "happ", "hatred", "heartbreak", "hope", "horr", "humiliat",
+    "joy", "lament", "mourn", "optimis", "outrag", "panic", "pessimis", "proud", "pride", "rage", "sad",
+    "scand", "scare", "scary", "shame", "shock", "slam", "sorrow", "stun", "suffer", "terrible", "terrif",
+    "thrill", "tragedy", "tragic", "triumph", "upset", "victim", "weep", "wonderful", "worr",
+}, key=len, reverse=True)
+_TONE_SIGNAL_PHRASES = (
+    "can't believe", "cannot believe", "heart goes out", "so proud", "fed up", "sick of", "thank god",
+    "how dare", "at long last", "a slap in the face",
+)
+_TONE_SIGNAL_PATTERN = re.compile(
+    r"\b(?:" + "|".join(re.escape(phrase) for phrase in _TONE_SIGNAL_PHRASES) + r")\b"
+    r"|\b(?:" + "|".join(re.escape(stem) for stem in _TONE_SIGNAL_STEMS) + r")\w*"
+    r"|!"
+)
+
+
+def _run_emotion_pipeline(pipe, texts: List[str], max_length: int):
+    MODEL_BATCH_SEQUENCES.labels(model="emotion").observe(len(texts))
+    with MODEL_FORWARD_SECONDS.labels(model="emotion", backend=model_backend("emotion")).time():
+        return pipe(texts, batch_size=TONE_BATCH_SIZE, truncation=True, max_length=max_length)
+
+
+def _emotion_predictions(texts: List[str]) -> List[List[Dict]]:
+    """Emotion label scores per text, from one batched pipeline call."""
     pipe = _get_emotion_pipeline()
-
-    preds = pipe(text)[0]
-
+    max_length = min(pipe.tokenizer.model_max_length, 512)
+
+    if not CHUNKING_ENABLED:
+        return _run_emotion_pipeline(pipe, texts, max_length)
+
+    # Score overlapping windows of every text in one batched call and
+    # aggregate them per text, instead of letting the model reject or
+    # truncate long articles.
+    all_windows, spans = [], []
+    for text in texts:
+        windows, lengths = split_text_windows(pipe.tokenizer, text, max_length=max_length, model="emotion")
+        spans.append((len(all_windows), len(windows), lengths))
+        all_windows.extend(windows)
+    window_preds = _run_emotion_pipeline(pipe, all_windows, max_length)
+
+    labels = [item["label"] for item in window_preds[0]]
+    results = []
+    for start, count, lengths in spans:
+        window_probs = []
+        for window in window_preds[start:start + count]:
+            by_label = {item["label"]: item["score"] for item in window}
+            window_probs.append([by_label[label] for label in labels])
+        combined = aggregate_probs(window_probs, lengths, CHUNK_AGGREGATION)
+        results.append([{"label": label, "score": score} for label, score in zip(labels, combined)])
+    return results
+
+
+def _tone_result(text: str, preds: List[Dict]) -> Dict:
     # Convert model outputs to clean dict
     scores = {item["label"].lower(): round(float(item["score"]), 4) for item in preds}
 
@@ -159,10 +299,11 @@ def analyze_tone(text: str) -> Dict:
     primary_emotion = max(scores, key=scores.get)
     emotion_strength = scores[primary_emotion]
 
-    # optional lightweight lexicon match for % emotionally-charged words
-    words = re.findall(r'\b\w+\b', text.lower())
-    total_words = max(len(words), 1)
-    emotion_word_count = sum(1 for w in words if w in _SMALL_EMOTION_LEXICON)
+    # optional lightweight lexicon match for % emotionally-charged words;
+    # looks the lexicon up in the shared word counts instead of scanning words
+    document = as_document(text)
+    total_words = max(len(document.words), 1)
+    emotion_word_count = sum(document.word_counts[w] for w in _SMALL_EMOTION_LEXICON)
     emotional_words_percentage = round((emotion_word_count / total_words) * 100, 2)
 
     return {
@@ -172,3 +313,102 @@ def analyze_tone(text: str) -> Dict:
         "emotion_strength": round(emotion_strength, 4),
         "emotional_words_percentage": emotional_words_percentage
     }
+
+
+def emotion_signal(sentence: str) -> int:
+    """Prefilter hits in a sentence; 0 means it is not worth scoring."""
+    return len(_TONE_SIGNAL_PATTERN.findall(sentence.lower()))
+
+
+def _sentence_spans(texts: List[str]):
+    """[(start, end)] character spans of each text's sentences, from the
+    parse the spacy stage shares."""
+    return [
+        [(sent.start_char, sent.end_char) for sent in doc.sents if sent.text.strip()]
+        for doc in shared_docs(texts)
+    ]
+
+
+def _pick_sentences(sentences: List[str]) -> List[int]:
+    """Indexes of the sentences to score, in text order."""
+    signals = [emotion_signal(sentence) for sentence in sentences]
+    picked = [i for i, signal in enumerate(signals) if signal > 0]
+    if len(picked) > TONE_MAX_SENTENCES:
+        picked = sorted(sorted(picked, key=lambda i: -signals[i])[:TONE_MAX_SENTENCES])
+    return picked
+
+
+def _probabilities(preds: List[Dict], labels: List[str]) -> List[float]:
+    by_label = {item["label"]: item["score"] for item in preds}
+    return [by_label[label] for label in labels]
+
+
+def _sentence_tone_batch(texts: List[str]) -> List[Dict]:
+    if TONE_AGGREGATION not in AGGREGATION_METHODS:
+        raise ValueError(f"Unknown tone aggregation method: {TONE_AGGREGATION}")
+    pipe = _get_emotion_pipeline()
+    max_length = min(pipe.tokenizer.model_max_length, TONE_SENTENCE_MAX_TOKENS)
+
+    # The picked sentences of every text go through one pipeline call,
+    # shortest first so each batch pads to a similar length.
+    plans, queue = [], []
+    for text, spans in zip(texts, _sentence_spans(texts)):
+        picked = _pick_sentences([text[start:end] for start, end in spans])
+        plans.append((spans, picked, len(queue)))
+        queue.extend(text[spans[i][0]:spans[i][1]].strip() for i in picked)
+    order = sorted(range(len(queue)), key=lambda i: len(queue[i]))
+    preds = [None] * len(queue)
+    if queue:
+        for i, pred in zip(order, _run_emotion_pipeline(pipe, [queue[i] for i in order], max_length)):
+            preds[i] = pred
+
+    # Texts without a single emotional sentence are scored as a whole.
+    unsignalled = [i for i, (_, picked, _) in enumerate(plans) if not picked]
+    whole = dict(zip(unsignalled, _emotion_predictions([texts[i] for i in unsignalled]))) if unsignalled else {}
+
+    results = []
+    for i, (text, (spans, picked, offset)) in enumerate(zip(texts, plans)):
+        if not picked:
+            result = _tone_result(text, whole[i])
+            trajectory = []
+        else:
+            sentence_preds = preds[offset:offset + len(picked)]
+            labels = [item["label"] for item in sentence_preds[0]]
+            probs = [_probabilities(pred, labels) for pred in sentence_preds]
+            lengths = [len(queue[offset + k].split()) or 1 for k in range(len(picked))]
+            combined = aggregate_probs(probs, lengths, TONE_AGGREGATION)
+            result = _tone_result(text, [{"label": label, "score": score} for label, score in zip(labels, combined)])
+            trajectory = []
+            for index, sentence_probs in zip(picked, probs):
+                best = max(range(len(labels)), key=lambda k: sentence_probs[k])
+                trajectory.append({
+                    "sentence": index,
+                    "start": spans[index][0],
+                    "end": spans[index][1],
+                    "primary_emotion": labels[best].lower(),
+                    "emotion_strength": round(float(sentence_probs[best]), 4),
+                    "emotion_scores": {
+                        label.lower(): round(float(p), 4) for label, p in zip(labels, sentence_probs)
+                    },
+                })
+        result.update({
+            "tone_mode": "sentence",
+            "sentences": len(spans),
+            "sentences_scored": len(picked),
+            "trajectory": trajectory,
+        })
+        results.append(result)
+    return results
+
+
+def analyze_tone(text: str) -> Dict:
+    return analyze_tone_batch([text])[0]
+
+
+def analyze_tone_batch(texts: List[str], mode: str = TONE_MODE) -> List[Dict]:
+    texts = list(texts)
+    if mode == "sentence":
+        return _sentence_tone_batch(texts)
+    if mode != "document":
+        raise ValueError(f"Unknown tone mode: {mode}")
+    return [_tone_result(text, preds) for text, preds in zip(texts, _emotion_predictions(texts))]
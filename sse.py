@@ -0,0 +1,19 @@
+import json
+
+# ============================================================
+# SERVER-SENT EVENTS
+# ============================================================
+# Framing for the text/event-stream responses (/analyze/stream and
+# /summary/<ticket>/events). Every message is one event line and one data
+# line holding compact JSON; json.dumps escapes newlines inside strings, so
+# a payload can never end its message early.
+
+
+def sse_event(event, data):
+    """One Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_comment(text="keepalive"):
+    """A comment line; clients ignore it, proxies see traffic."""
+    return f": {text}\n\n"
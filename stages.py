@@ -0,0 +1,196 @@
+import os
+import sys
+import time
+import logging
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait, TimeoutError as FutureTimeoutError
+)
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# STAGE EXECUTOR CONFIGURATION
+# ============================================================
+# The analyzers behind /analyze are independent, so they run concurrently
+# on a bounded pool. Each stage gets its own timeout, overridable with
+# CLEARIFY_STAGE_TIMEOUT_<STAGE> (e.g. CLEARIFY_STAGE_TIMEOUT_TONE=10),
+# counted from when the stage starts running rather than from when it was
+# queued.
+#
+# The pool is shared by every request a worker serves, so it holds one
+# thread per stage for each request expected at once (gunicorn --threads):
+# a request's stages then start right away instead of waiting behind
+# another request's.
+STAGES_PER_REQUEST = int(os.getenv("CLEARIFY_STAGES_PER_REQUEST", "7"))
+STAGE_CONCURRENCY = int(os.getenv("CLEARIFY_STAGE_CONCURRENCY", "2"))
+STAGE_WORKERS = int(os.getenv("CLEARIFY_STAGE_WORKERS", str(STAGES_PER_REQUEST * STAGE_CONCURRENCY)))
+DEFAULT_STAGE_TIMEOUT = float(os.getenv("CLEARIFY_STAGE_TIMEOUT_S", "30"))
+
+# Several forward passes now run at the same time, so each framework gets a
+# share of the cores instead of every pass spawning one thread per core.
+_CPU_COUNT = os.cpu_count() or 1
+INTRA_OP_THREADS = int(os.getenv("CLEARIFY_INTRA_OP_THREADS", str(max(1, _CPU_COUNT // 4))))
+INTER_OP_THREADS = int(os.getenv("CLEARIFY_INTER_OP_THREADS", "1"))
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+# ============================================================
+# THREAD LIMITS
+# ============================================================
+def configure_thread_limits():
+    """Applies the intra/inter-op thread limits to torch and TensorFlow.
+
+    Must run before the first forward pass; TensorFlow only accepts the
+    setting before its runtime is initialized.
+    """
+    if "torch" in sys.modules:
+        import torch
+        torch.set_num_threads(INTRA_OP_THREADS)
+        try:
+            torch.set_num_interop_threads(INTER_OP_THREADS)
+        except RuntimeError:
+            # Already set (or parallel work already started) in this process.
+            pass
+
+    if "tensorflow" in sys.modules:
+        import tensorflow as tf
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(INTRA_OP_THREADS)
+            tf.config.threading.set_inter_op_parallelism_threads(INTER_OP_THREADS)
+        except RuntimeError:
+            logger.warning("TensorFlow already initialized; thread limits not applied.")
+
+
+# ============================================================
+# STAGE RUNNER
+# ============================================================
+def _get_executor():
+    # One pool per process; gunicorn forks after import, and a pool's
+    # threads do not survive the fork.
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(max_workers=STAGE_WORKERS, thread_name_prefix="stage")
+                _executor_pid = pid
+    return _executor
+
+
+def stage_timeout(name: str) -> float:
+    return float(os.getenv(f"CLEARIFY_STAGE_TIMEOUT_{name.upper()}", DEFAULT_STAGE_TIMEOUT))
+
+
+def _record_start(fn, name, starts):
+    def run():
+        starts[name] = time.monotonic()
+        return fn()
+    return run
+
+
+def iter_stages(stages: dict, deadline=None):
+    """Runs independent stages concurrently, yielding as each one ends.
+
+    `stages` maps a stage name to a zero-argument callable. Yields
+    `(name, result, error)` in completion order; `error` is None on success,
+    otherwise a message for a stage that raised or exceeded its timeout.
+    A stage's timeout runs from when it starts; with a `deadline.Deadline`,
+    no stage, queued or running, is waited for past it.
+
+    A timed-out stage that has started keeps running on its pool thread
+    until it returns (Python threads cannot be stopped); only its result is
+    dropped. Stages still queued at that point are cancelled.
+    """
+    executor = _get_executor()
+    started = time.monotonic()
+    starts = {}
+    futures = {executor.submit(_record_start(fn, name, starts)): name for name, fn in stages.items()}
+    pending = set(futures)
+    ends_at = None if deadline is None else started + deadline.remaining()
+    timeouts = {name: stage_timeout(name) for name in stages}
+
+    def expiry(name, now):
+        # A stage that has not started yet cannot time out before now + its timeout.
+        end = starts.get(name, now) + timeouts[name]
+        return end if ends_at is None else min(end, ends_at)
+
+    while pending:
+        now = time.monotonic()
+        next_expiry = min(expiry(futures[future], now) for future in pending)
+        done, _ = wait(pending, timeout=max(next_expiry - now, 0), return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            name = futures[future]
+            try:
+                yield name, future.result(), None
+            except Exception as e:
+                logger.exception("Stage %s failed: %s", name, e)
+                yield name, None, str(e)
+
+        now = time.monotonic()
+        for future in list(pending):
+            name = futures[future]
+            if name in starts and now >= starts[name] + timeouts[name] and not future.done():
+                future.cancel()
+                pending.discard(future)
+                logger.warning("Stage %s timed out; it keeps running in the background.", name)
+                yield name, None, f"timed out after {timeouts[name]:.3g}s"
+            elif ends_at is not None and now >= ends_at and not future.done():
+                queued = future.cancel()
+                pending.discard(future)
+                logger.warning("Stage %s %s at the request deadline.", name, "cancelled" if queued else "cut off")
+                yield name, None, f"request deadline reached after {now - started:.3g}s"
+
+    logger.info("Ran %d stages in %.3fs", len(stages), time.monotonic() - started)
+
+
+def run_stages(stages: dict, deadline=None):
+    """Runs independent stages concurrently.
+
+    `stages` maps a stage name to a zero-argument callable. Returns
+    `(results, errors)`: results of the stages that finished in time, and
+    an error message for each stage that raised or timed out.
+    """
+    results, errors = {}, {}
+    for name, result, error in iter_stages(stages, deadline):
+        if error is None:
+            results[name] = result
+        else:
+            errors[name] = error
+    return results, errors
+
+
+def map_concurrent(fn, args_list, timeout: float = DEFAULT_STAGE_TIMEOUT):
+    """Applies `fn` to every argument on the stage pool.
+
+    Yields `(index, result, error)` as each call finishes, so callers can
+    stream results in completion order. Calls still running after `timeout`
+    are reported as timed out but keep running until they return.
+    """
+    executor = _get_executor()
+    futures = {executor.submit(fn, arg): i for i, arg in enumerate(args_list)}
+    pending = set(futures)
+
+    def outcome(future):
+        pending.discard(future)
+        try:
+            return futures[future], future.result(), None
+        except Exception as e:
+            logger.exception("Concurrent call failed: %s", e)
+            return futures[future], None, str(e)
+
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            yield outcome(future)
+    except FutureTimeoutError:
+        for future in list(pending):
+            if future.done():
+                yield outcome(future)
+            else:
+                future.cancel()
+                pending.discard(future)
+                yield futures[future], None, f"timed out after {timeout:g}s"
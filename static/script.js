@@ -54,6 +54,15 @@ document.getElementById("analyzeBtn").addEventListener("click", async function (
     formData.append("text", userInput);
     formData.append("input_type", inputType);
 
+    // Render each analyzer's result as soon as the server streams it.
+    if (window.ReadableStream && window.TextDecoder) {
+      resultsDiv.style.display = "block";
+      await analyzeStreaming(formData);
+      return;
+    }
+
+    // Scores come back at once; the Gemini summary is fetched afterwards.
+    formData.append("summary_mode", "async");
     const response = await fetch("/analyze", {
       method: "POST",
       headers: { "Accept": "application/json" },
@@ -65,6 +74,9 @@ document.getElementById("analyzeBtn").addEventListener("click", async function (
       displayResults(result);
       resultsDiv.style.display = "block";
       resultsDiv.scrollIntoView({ behavior: "smooth" });
+      if (result.summary_ticket) {
+        pollSummary(result.summary_ticket.poll_url);
+      }
     } else {
       throw new Error("Analysis failed");
     }
@@ -79,6 +91,107 @@ document.getElementById("analyzeBtn").addEventListener("click", async function (
   }
 });
 
+// ========================================================
+// STREAMED ANALYSIS (/analyze/stream, Server-Sent Events)
+// ========================================================
+// Maps one stage event onto the fields of the /analyze response, so the
+// partial result can be drawn with displayResults().
+function applyStreamEvent(partial, event, data) {
+  switch (event) {
+    case "start":
+      partial.words_analyzed = data.words_analyzed;
+      partial.gemini_summary = { overall_summary: "Generating summary..." };
+      break;
+    case "sentiment": {
+      const [label, percentage] = data.result;
+      partial.positive_sentiment = label === "Positive" ? percentage : 0;
+      partial.negative_sentiment = label === "Negative" ? percentage : 0;
+      break;
+    }
+    case "political":
+      partial.political_analysis = data.result;
+      break;
+    case "social":
+      partial.social_bias_analysis = data.result;
+      break;
+    case "dbias":
+      [partial.bias_score, partial.bias_label] = data.result;
+      break;
+    case "fake_news":
+      partial.fake_news_risk = data.result;
+      break;
+    case "tone":
+      partial.emotional_words_percentage = data.result.emotional_words_percentage ?? 0;
+      partial.overall_tone = data.result.tone ?? "";
+      break;
+    case "repetition":
+      partial.word_repetition = data.result;
+      break;
+    case "verdict":
+      partial.final_verdict = data.final_verdict;
+      partial.weighted_votes = data.weighted_votes;
+      break;
+    case "summary":
+      partial.gemini_summary = data.gemini_summary;
+      break;
+    case "result":
+      return data;
+    default:
+      return partial;
+  }
+  return partial;
+}
+
+function parseSseMessage(message) {
+  let event = "message";
+  const dataLines = [];
+  message.split("\n").forEach((line) => {
+    if (line.startsWith("event:")) event = line.slice(6).trim();
+    else if (line.startsWith("data:")) dataLines.push(line.slice(5).trim());
+  });
+  return dataLines.length ? { event, data: JSON.parse(dataLines.join("\n")) } : null;
+}
+
+async function analyzeStreaming(formData) {
+  const response = await fetch("/analyze/stream", {
+    method: "POST",
+    headers: { "Accept": "text/event-stream" },
+    body: formData,
+  });
+  if (!response.ok || !response.body) {
+    throw new Error("Analysis failed");
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let partial = {};
+  let firstRender = true;
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const message = parseSseMessage(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+      if (!message) continue;
+      if (message.event === "error") {
+        throw new Error(message.data.error || "Analysis failed");
+      }
+      partial = applyStreamEvent(partial, message.event, message.data);
+      displayResults(partial);
+      if (firstRender) {
+        document.getElementById("results").scrollIntoView({ behavior: "smooth" });
+        firstRender = false;
+      }
+    }
+  }
+  return partial;
+}
+
 // ========================================================
 // POLITICAL BAR ANIMATION
 // ========================================================
@@ -189,19 +302,55 @@ function displayResults(result) {
   document.getElementById("socialProgress").style.width = `${sbConf}%`;
 
   // ----- Gemini Summary -----
+  if (result.summary_ticket) {
+    displayPendingSummary();
+  } else {
+    displayGeminiSummary(result.gemini_summary);
+  }
+
+  document.getElementById("results").style.display = "block";
+}
+
+// ========================================================
+// GEMINI SUMMARY
+// ========================================================
+function displayGeminiSummary(summary) {
   const geminiCard = document.getElementById("gemini-summary-card");
-  if (result.gemini_summary) {
+  if (summary) {
     geminiCard.style.display = "block";
-    document.getElementById("geminiOverall").textContent = result.gemini_summary.overall_summary || "—";
-    document.getElementById("geminiPolitical").textContent = result.gemini_summary.political_bias_summary || "—";
-    document.getElementById("geminiSocial").textContent = result.gemini_summary.social_bias_summary || "—";
-    document.getElementById("geminiFakeNews").textContent = result.gemini_summary.fake_news_summary || "—";
-    document.getElementById("geminiVerdict").textContent = result.gemini_summary.final_verdict || "—";
+    document.getElementById("geminiOverall").textContent = summary.overall_summary || "—";
+    document.getElementById("geminiPolitical").textContent = summary.political_bias_summary || "—";
+    document.getElementById("geminiSocial").textContent = summary.social_bias_summary || "—";
+    document.getElementById("geminiFakeNews").textContent = summary.fake_news_summary || "—";
+    document.getElementById("geminiVerdict").textContent = summary.final_verdict || "—";
   } else {
     geminiCard.style.display = "none";
   }
+}
 
-  document.getElementById("results").style.display = "block";
+function displayPendingSummary() {
+  displayGeminiSummary({ overall_summary: "Generating summary..." });
+}
+
+// Polls /summary/<ticket> until the background summary is ready.
+async function pollSummary(pollUrl, intervalMs = 1000, maxAttempts = 120) {
+  for (let attempt = 0; attempt < maxAttempts; attempt++) {
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    try {
+      const response = await fetch(pollUrl, { headers: { "Accept": "application/json" } });
+      if (!response.ok) break;
+      const state = await response.json();
+      if (state.status === "done") {
+        displayGeminiSummary(state.gemini_summary);
+        return;
+      }
+      if (state.status === "error") break;
+    } catch (error) {
+      console.error("Summary polling error:", error);
+      break;
+    }
+  }
+  displayGeminiSummary({ overall_summary: "Summary unavailable." });
 }
 
 // ========================================================
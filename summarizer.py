@@ -0,0 +1,384 @@
+import os
+import re
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from prompt_builder import PROMPT_SIGNATURE, build_summary_prompt
+from document import as_document
+from deadline import CircuitBreaker, call_with_retries
+
+logger = logging.getLogger(__name__)
+
+# ---------------- Gemini Client ---------------- #
+# CLEARIFY_GEMINI_CLIENT=fake swaps in FakeGeminiClient (no network, no API
+# key), for tests and offline runs.
+GEMINI_CLIENT_KIND = os.getenv("CLEARIFY_GEMINI_CLIENT", "genai")
+FAKE_GEMINI_DELAY_SECONDS = float(os.getenv("CLEARIFY_GEMINI_FAKE_DELAY_S", "0.5"))
+
+
+class _FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _FakeModels:
+    def __init__(self, delay: float, fail: bool):
+        self.delay = delay
+        self.fail = fail
+
+    def generate_content(self, model, contents):
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("Fake Gemini client configured to fail")
+        prompt = "\n".join(str(part) for part in contents)
+        match = re.search(r'"final_verdict":"(\w+)"', prompt)
+        verdict = match.group(1) if match else "center"
+        return _FakeResponse(json.dumps({
+            "overall_summary": f"[fake {model}] Offline summary of {len(prompt)} prompt characters.",
+            "political_bias_summary": "Fake political bias summary.",
+            "social_bias_summary": "Fake social bias summary.",
+            "fake_news_summary": "Fake fake-news summary.",
+            "final_verdict": verdict,
+        }))
+
+
+class FakeGeminiClient:
+    """Offline stand-in for genai.Client: answers generate_content() after
+    `delay` seconds with JSON shaped like a real summary (or raises)."""
+
+    def __init__(self, delay: float = FAKE_GEMINI_DELAY_SECONDS, fail: bool = False):
+        self.models = _FakeModels(delay, fail)
+
+
+gemini_api_key = os.getenv("GOOGLE_API_KEY")
+genai_client = None
+
+if GEMINI_CLIENT_KIND == "fake":
+    genai_client = FakeGeminiClient()
+    logger.info("Using the fake Gemini client.")
+elif not gemini_api_key:
+    logger.error("GOOGLE_API_KEY not found in environment. Gemini functionality will fail.")
+else:
+    try:
+        import google.genai as genai
+        # Note: You were using genai.Client(api_key=...) which is the correct syntax for google-genai
+        genai_client = genai.Client(api_key=gemini_api_key)
+        logger.info("Gemini client initialized successfully.")
+    except Exception as e:
+        logger.exception(f"Failed to initialize Gemini Client: {e}")
+        genai_client = None
+
+def get_gemini_client():
+    if genai_client is None:
+        raise RuntimeError("Gemini Client not configured or failed to initialize.")
+    return genai_client
+
+# ---------------- Analysis Functions ---------------- #
+def derive_final_verdict(political, social, fake_news, dbias_score):
+    votes = {"left": 0, "center": 0, "right": 0}
+
+    p_label = political.get("prediction", "center")
+    p_conf = political.get("confidence", 0)
+    votes[p_label] += p_conf
+
+    if social.get("bias_category") in ["race", "gender", "social", "culture"]:
+        votes["center"] -= 0.2
+        votes["left"] += 0.1
+        votes["right"] += 0.1
+    else:
+        votes["center"] += 0.2
+
+    if dbias_score > 60:
+        votes["center"] -= 0.3
+        votes["left"] += 0.2
+        votes["right"] += 0.2
+
+    if fake_news > 70:
+        votes["center"] -= 0.2
+        votes["left"] += 0.1
+        votes["right"] += 0.1
+
+    final_verdict = max(votes, key=votes.get)
+    return final_verdict, votes
+
+GEMINI_MODEL = "gemini-2.5-flash"
+GEMINI_ERROR_PREFIX = "Error: Gemini API call failed"
+# Identifies who wrote a summary (part of its cache version), so fake
+# summaries never satisfy lookups made with the real client.
+SUMMARY_MODEL_ID = GEMINI_MODEL if GEMINI_CLIENT_KIND == "genai" else f"{GEMINI_CLIENT_KIND}:{GEMINI_MODEL}"
+SUMMARY_MODEL_ID = f"{SUMMARY_MODEL_ID}:{PROMPT_SIGNATURE}"
+
+# ---------------- Gemini Call Policy ---------------- #
+# Each attempt is bounded by CLEARIFY_GEMINI_TIMEOUT_S (and by the request
+# deadline); failures are retried with jittered backoff, and after
+# CLEARIFY_GEMINI_BREAKER_FAILURES consecutive failures Gemini is skipped
+# for CLEARIFY_GEMINI_BREAKER_RESET_S. The local template summary is used
+# whenever no Gemini answer arrives.
+GEMINI_ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("CLEARIFY_GEMINI_TIMEOUT_S", "10"))
+GEMINI_ATTEMPTS = int(os.getenv("CLEARIFY_GEMINI_ATTEMPTS", "3"))
+GEMINI_MIN_BUDGET_SECONDS = float(os.getenv("CLEARIFY_GEMINI_MIN_BUDGET_S", "1"))
+
+gemini_breaker = CircuitBreaker(
+    "gemini",
+    failure_threshold=int(os.getenv("CLEARIFY_GEMINI_BREAKER_FAILURES", "5")),
+    reset_timeout=float(os.getenv("CLEARIFY_GEMINI_BREAKER_RESET_S", "30")),
+)
+
+_gemini_executor = None
+_gemini_executor_pid = None
+_gemini_executor_lock = threading.Lock()
+
+def _get_gemini_executor():
+    # One pool per process (gunicorn forks after import); concurrent first
+    # requests must not each build their own.
+    global _gemini_executor, _gemini_executor_pid
+    pid = os.getpid()
+    if _gemini_executor is None or _gemini_executor_pid != pid:
+        with _gemini_executor_lock:
+            if _gemini_executor is None or _gemini_executor_pid != pid:
+                _gemini_executor = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS * 2, thread_name_prefix="gemini")
+                _gemini_executor_pid = pid
+    return _gemini_executor
+
+def _generate(client, prompt, timeout):
+    """One generate_content call, abandoned after `timeout` seconds.
+
+    The SDK call runs on a small pool so a hung connection cannot hold the
+    request past its deadline.
+    """
+    future = _get_gemini_executor().submit(
+        client.models.generate_content,
+        model=GEMINI_MODEL, # Switched to 2.5-flash since 2.0-flash is not a standard name
+        contents=[prompt]
+    )
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise TimeoutError(f"Gemini did not answer within {timeout:.1f}s")
+
+def local_summary(political, social, fake_news, dbias_score, dbias_label, final_verdict, votes, reason):
+    """Deterministic summary built from the local scores, used when Gemini is unavailable."""
+    prediction = political.get("prediction", "center")
+    category = social.get("bias_category", "none")
+    risk = "high" if fake_news > 70 else "moderate" if fake_news >= 30 else "low"
+    vote_text = ", ".join(f"{label} {votes[label]:.2f}" for label in ("left", "center", "right"))
+    if category == "none":
+        social_text = f"No social bias category detected ({social.get('confidence', 0):.0%} confidence)."
+    else:
+        social_text = f"Social bias category: {category} ({social.get('confidence', 0):.0%} confidence)."
+    return {
+        "overall_summary": (
+            f"Automated summary ({reason}): the weighted verdict is {final_verdict} ({vote_text}). "
+            f"Dbias rates the text as {dbias_label} ({dbias_score:.1f}%)."
+        ),
+        "political_bias_summary": (
+            f"The political model predicts {prediction} with {political.get('confidence', 0):.0%} confidence."
+        ),
+        "social_bias_summary": social_text,
+        "fake_news_summary": f"Fake news risk is {risk} ({fake_news:.1f}%).",
+        "final_verdict": final_verdict,
+        "source": "local",
+    }
+
+def is_fallback_summary(summary):
+    """True for summaries that should not be cached (local template or error text)."""
+    overall = (summary or {}).get("overall_summary") or ""
+    return (summary or {}).get("source") == "local" or overall.startswith(GEMINI_ERROR_PREFIX)
+
+def summarize_clearify_results(text, political, social, fake_news, dbias_score, dbias_label, signal_words=(),
+                               deadline=None):
+    final_verdict, votes = derive_final_verdict(political, social, fake_news, dbias_score)
+
+    def fallback(reason):
+        return local_summary(
+            political, social, fake_news, dbias_score, dbias_label, final_verdict, votes, reason
+        ), final_verdict, votes
+
+    if deadline is not None and deadline.remaining() < GEMINI_MIN_BUDGET_SECONDS:
+        logger.warning("Skipping Gemini: only %.2fs left before the request deadline.", deadline.remaining())
+        return fallback("request deadline reached")
+    if gemini_breaker.state == "open":
+        logger.warning("Skipping Gemini: circuit breaker is open.")
+        return fallback("Gemini temporarily unavailable")
+    try:
+        client = get_gemini_client()
+    except RuntimeError as e:
+        logger.warning("Skipping Gemini: %s", e)
+        return fallback("Gemini not configured")
+
+    analysis = {
+        "political_bias": political,
+        "social_bias": social,
+        "fake_news_score": fake_news,
+        "dbias": {"score": dbias_score, "label": dbias_label},
+        "weighted_votes": votes,
+        "final_verdict": final_verdict
+    }
+
+    # The article is cut down to its most salient sentences when the prompt
+    # would exceed the token budget. The request's Document carries the
+    # spacy stage's parse, so those sentences are not split again.
+    prompt, _ = build_summary_prompt(as_document(text), analysis, signal_words=signal_words)
+
+    try:
+        response = call_with_retries(
+            lambda timeout: _generate(client, prompt, timeout),
+            attempts=GEMINI_ATTEMPTS,
+            attempt_timeout=GEMINI_ATTEMPT_TIMEOUT_SECONDS,
+            deadline=deadline,
+            breaker=gemini_breaker,
+        )
+        # Note: Using .text property for robustness, which is standard on the response object
+        gemini_text = getattr(response, "text", "").strip() 
+        logger.info("Gemini API call successful.")
+    except Exception as e:
+        logger.error(f"{GEMINI_ERROR_PREFIX}: {e}; using the local summary.")
+        return fallback("Gemini unavailable")
+
+    # ------------------ DEBUG LOGGING ADDED HERE ------------------
+    # The full output is logged, allowing us to see why JSON parsing failed.
+    logger.info("DEBUG: Gemini Raw Text Length: %d", len(gemini_text))
+    # Log the full text (up to 2000 chars to avoid overwhelming logs)
+    logger.info("DEBUG: Gemini Full Raw Text: \n%s", gemini_text[:2000]) 
+    # --------------------------------------------------------------
+
+    parsed = None
+    try:
+        # First attempt: parse the whole response
+        parsed = json.loads(gemini_text)
+    except Exception as e:
+        logger.warning("JSON direct parse failed: %s", e)
+        try:
+            # Second attempt: use regex to strip out everything before the first { and after the last }
+            # This handles markdown code fences (```json ... ```) and leading/trailing text.
+            match = re.search(r"(\{[\s\S]*\})", gemini_text)
+            if match:
+                parsed = json.loads(match.group(1))
+                logger.info("JSON regex parse succeeded.")
+            else:
+                logger.warning("JSON regex failed to find JSON object.")
+        except Exception as e:
+            logger.warning("JSON regex parse also failed: %s", e)
+            parsed = None
+
+    if isinstance(parsed, dict):
+        gemini_summary = {
+            "overall_summary": parsed.get("overall_summary"),
+            "political_bias_summary": parsed.get("political_bias_summary"),
+            "social_bias_summary": parsed.get("social_bias_summary"),
+            "fake_news_summary": parsed.get("fake_news_summary"),
+            "final_verdict": parsed.get("final_verdict", final_verdict)
+        }
+    else:
+        logger.warning("Final JSON parsing failed. Returning raw text as summary.")
+        gemini_summary = {
+            "overall_summary": gemini_text, # Return the raw text so we can see it in the final result
+            "political_bias_summary": None,
+            "social_bias_summary": None,
+            "fake_news_summary": None,
+            "final_verdict": final_verdict
+        }
+
+    return gemini_summary, final_verdict, votes
+
+
+# ---------------- Summary Tickets ---------------- #
+# In async mode /analyze answers with the local scores and a ticket; the
+# Gemini summary is produced here in the background and fetched from
+# /summary/<ticket> (polling) or /summary/<ticket>/events (SSE).
+SUMMARY_WORKERS = int(os.getenv("CLEARIFY_SUMMARY_WORKERS", "4"))
+TICKET_TTL_SECONDS = float(os.getenv("CLEARIFY_SUMMARY_TICKET_TTL_S", "600"))
+TICKET_MAX_ENTRIES = int(os.getenv("CLEARIFY_SUMMARY_TICKET_MAX", "10000"))
+
+
+class SummaryTickets:
+    """Background summary jobs, keyed by ticket id.
+
+    Tickets live in this process only. Submitting a ticket id that is
+    already pending or done reuses that job, so the same text is never
+    summarized twice at once. A job that failed or ended with the local
+    fallback summary is run again, so Gemini gets another chance.
+    """
+
+    def __init__(self, workers: int = SUMMARY_WORKERS, ttl: float = TICKET_TTL_SECONDS,
+                 max_entries: int = TICKET_MAX_ENTRIES):
+        self.workers = max(1, workers)
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._tickets = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    def _get_executor(self):
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="summary")
+            self._executor_pid = os.getpid()
+        return self._executor
+
+    def _expire(self):
+        # Entries are kept in creation order, so expired ones are at the front.
+        now = time.monotonic()
+        while self._tickets:
+            ticket_id, entry = next(iter(self._tickets.items()))
+            if now - entry["created"] <= self.ttl and len(self._tickets) < self.max_entries:
+                break
+            del self._tickets[ticket_id]
+
+    def submit(self, compute, ticket_id: str = None) -> str:
+        """Runs `compute()` (returning the summary dict) in the background."""
+        ticket_id = ticket_id or uuid.uuid4().hex
+        with self._lock:
+            self._expire()
+            entry = self._tickets.get(ticket_id)
+            if entry is not None and (
+                entry["status"] == "pending"
+                or (entry["status"] == "done" and not is_fallback_summary(entry["summary"]))
+            ):
+                return ticket_id
+            self._tickets[ticket_id] = {
+                "status": "pending", "summary": None, "error": None,
+                "created": time.monotonic(), "event": threading.Event(),
+            }
+            self._tickets.move_to_end(ticket_id)
+            self._get_executor().submit(self._run, ticket_id, compute)
+        return ticket_id
+
+    def _run(self, ticket_id: str, compute):
+        entry = self._tickets.get(ticket_id)
+        if entry is None:
+            return
+        try:
+            entry["summary"] = compute()
+            entry["status"] = "done"
+        except Exception as e:
+            logger.exception("Background summary %s failed: %s", ticket_id, e)
+            entry["error"] = str(e)
+            entry["status"] = "error"
+        entry["event"].set()
+
+    def get(self, ticket_id: str):
+        """{"ticket", "status", "gemini_summary"[, "error"]}, or None if unknown."""
+        entry = self._tickets.get(ticket_id)
+        if entry is None:
+            return None
+        state = {"ticket": ticket_id, "status": entry["status"], "gemini_summary": entry["summary"]}
+        if entry["error"]:
+            state["error"] = entry["error"]
+        return state
+
+    def wait(self, ticket_id: str, timeout: float):
+        """Like get(), but first waits up to `timeout` seconds for the job to finish."""
+        entry = self._tickets.get(ticket_id)
+        if entry is not None:
+            entry["event"].wait(timeout)
+        return self.get(ticket_id)
+
+
+summary_tickets = SummaryTickets()
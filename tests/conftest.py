@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+# The application modules live flat at the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeBackend:
+    """Stand-ins for the model analyzers: fixed answers, every call recorded."""
+
+    RESULTS = {
+        "spacy": {"entities": [["Reuters", "ORG"]], "sentiment": ("Positive", 70.0)},
+        "political": {"prediction": "left", "confidence": 0.8},
+        "social": {"bias_category": "none", "confidence": 0.9},
+        "dbias": (20.0, "Non-biased"),
+        "fake_news": 12.5,
+        "repetition": [{"word": "economy", "count": 3}],
+        "tone": {"tone": "calm", "emotional_words_percentage": 4.0},
+    }
+
+    def __init__(self):
+        self.calls = {name: [] for name in self.RESULTS}
+        self.analyzers = {name: self._analyzer(name) for name in self.RESULTS}
+        self.versions = {name: f"fake-{name}" for name in self.RESULTS}
+
+    def _analyzer(self, name):
+        def analyze(texts):
+            texts = [str(text) for text in texts]
+            self.calls[name].append(texts)
+            return [self.RESULTS[name] for _ in texts]
+        return analyze
+
+
+@pytest.fixture
+def fake_backend():
+    return FakeBackend()
@@ -0,0 +1,223 @@
+import importlib
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("flask")
+pytest.importorskip("lxml")
+pytest.importorskip("numpy")
+pytest.importorskip("requests")
+
+import inference_server
+import result_cache
+from deadline import Deadline
+
+ARTICLE = "The economy grew faster than expected, the agency said on Tuesday. " * 5
+
+
+@pytest.fixture
+def main(monkeypatch, fake_backend):
+    """main imported against the fake analyzers, with caching off."""
+    monkeypatch.setattr(inference_server, "load_analysis_backend",
+                        lambda: (fake_backend.analyzers, fake_backend.versions))
+    monkeypatch.setattr(result_cache, "CACHE_ENABLED", False)
+    sys.modules.pop("main", None)
+    module = importlib.import_module("main")
+    yield module
+    sys.modules.pop("main", None)
+
+
+@pytest.fixture
+def summaries(main, monkeypatch):
+    """Replaces the Gemini summary; returns the texts it was asked for."""
+    asked = []
+
+    def summarize(text, political, social, fake_news, dbias_score, dbias_label, signal_words=(), deadline=None):
+        if "FAIL" in text:
+            raise RuntimeError("summary exploded")
+        asked.append(str(text))
+        verdict, votes = main.derive_final_verdict(political, social, fake_news, dbias_score)
+        return {"overall_summary": f"summary of {len(text)} chars"}, verdict, votes
+
+    monkeypatch.setattr(main, "summarize_clearify_results", summarize)
+    return asked
+
+
+@pytest.fixture
+def client(main):
+    return main.app.test_client()
+
+
+def result_lines(response):
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    return {line["id"]: line for line in map(json.loads, response.get_data(as_text=True).splitlines())}
+
+
+# ------------------------------------------------------------
+# parse_flag
+# ------------------------------------------------------------
+@pytest.mark.parametrize("value, expected", [
+    (None, True), (True, True), (False, False), ("1", True), ("true", True), ("yes", True),
+    ("0", False), ("false", False), ("FALSE", False), (" no ", False), (0, False), (1, True),
+])
+def test_parse_flag(main, value, expected):
+    assert main.parse_flag(value) is expected
+
+
+def test_parse_flag_default(main):
+    assert main.parse_flag(None, default=False) is False
+    assert main.parse_flag("yes", default=False) is True
+
+
+# ------------------------------------------------------------
+# /analyze_batch input formats
+# ------------------------------------------------------------
+def test_a_json_array_gets_one_line_per_item(client, summaries, fake_backend):
+    response = client.post("/analyze_batch", json=[{"id": "a", "text": ARTICLE}, {"id": "b", "text": ARTICLE + "!"}])
+    lines = result_lines(response)
+    assert set(lines) == {"a", "b"}
+    assert lines["a"]["result"]["political_analysis"] == {"prediction": "left", "confidence": 0.8}
+    assert lines["a"]["result"]["gemini_summary"]["overall_summary"].startswith("summary of")
+    assert "error" not in lines["a"]
+    # Both texts went through each model in one batch.
+    assert [len(batch) for batch in fake_backend.calls["political"]] == [2]
+
+
+def test_a_json_object_carries_items_and_the_summary_flag(client, summaries):
+    response = client.post("/analyze_batch", json={"items": [{"id": 1, "text": ARTICLE}], "summary": "false"})
+    lines = result_lines(response)
+    assert lines[1]["result"]["gemini_summary"] is None
+    assert lines[1]["result"]["final_verdict"] == "left"
+    assert summaries == []
+
+
+def test_the_json_flag_overrides_the_query_string(client, summaries):
+    response = client.post("/analyze_batch?summary=0", json={"items": [{"id": 1, "text": ARTICLE}], "summary": True})
+    assert result_lines(response)[1]["result"]["gemini_summary"] is not None
+
+
+def test_a_jsonl_body_is_read_line_by_line(client, summaries):
+    body = "\n".join([
+        json.dumps({"id": "first", "text": ARTICLE}),
+        "",
+        json.dumps({"id": "second", "text": ARTICLE + " More."}),
+    ])
+    response = client.post("/analyze_batch?summary=no", data=body, content_type="application/x-ndjson")
+    lines = result_lines(response)
+    assert set(lines) == {"first", "second"}
+    assert all(line["result"]["gemini_summary"] is None for line in lines.values())
+    assert summaries == []
+
+
+def test_a_malformed_jsonl_line_only_fails_itself(client, summaries):
+    body = json.dumps({"id": "good", "text": ARTICLE}) + "\n{not json\n"
+    response = client.post("/analyze_batch", data=body, content_type="application/x-ndjson")
+    lines = result_lines(response)
+    assert lines["good"]["result"] is not None
+    assert lines[None]["result"] is None
+    assert lines[None]["error"].startswith("Invalid JSON on line 2")
+
+
+def test_a_payload_that_is_not_a_list_is_rejected(client):
+    response = client.post("/analyze_batch", json={"text": ARTICLE})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Expected a JSON array of items."}
+
+
+# ------------------------------------------------------------
+# Per-item errors
+# ------------------------------------------------------------
+def test_invalid_items_do_not_affect_the_others(client, summaries, fake_backend):
+    response = client.post("/analyze_batch", json=[
+        {"id": "ok", "text": ARTICLE},
+        {"id": "empty", "text": "   "},
+        {"id": "nothing"},
+        "not an object",
+    ])
+    lines = result_lines(response)
+    assert lines["ok"]["result"] is not None
+    assert lines["empty"]["error"] == "Empty text provided."
+    assert lines["nothing"]["error"] == "Item needs a text or url field."
+    assert lines[None]["error"] == "Item must be a JSON object."
+    assert fake_backend.calls["political"] == [[ARTICLE]]
+
+
+def test_a_failing_summary_only_fails_its_item(client, summaries):
+    response = client.post("/analyze_batch", json=[
+        {"id": "ok", "text": ARTICLE}, {"id": "bad", "text": ARTICLE + " FAIL"}
+    ])
+    lines = result_lines(response)
+    assert lines["ok"]["result"]["gemini_summary"]["overall_summary"].startswith("summary of")
+    assert lines["bad"]["result"] is None
+    assert lines["bad"]["error"] == "Analysis failed: summary exploded"
+
+
+def test_a_failing_stage_falls_back_without_failing_the_item(client, summaries, main, monkeypatch):
+    def broken(texts):
+        raise RuntimeError("model crashed")
+
+    monkeypatch.setitem(main.BATCH_ANALYZERS, "fake_news", broken)
+    lines = result_lines(client.post("/analyze_batch", json=[{"id": "a", "text": ARTICLE}]))
+    assert lines["a"]["result"]["fake_news_risk"] == 0.0
+    assert "model crashed" in lines["a"]["result"]["stage_errors"]["fake_news"]
+
+
+# ------------------------------------------------------------
+# URLs and the deadline
+# ------------------------------------------------------------
+def test_scraping_gets_the_chunk_deadline(client, summaries, main, monkeypatch):
+    seen = {}
+
+    def scrape_articles(urls, deadline=None):
+        seen["deadline"] = deadline
+        return [ARTICLE if "good" in url else None for url in urls]
+
+    monkeypatch.setattr(main, "scrape_articles", scrape_articles)
+    lines = result_lines(client.post("/analyze_batch", json=[
+        {"id": "a", "url": "https://example.com/good"}, {"id": "b", "url": "https://example.com/bad"}
+    ]))
+    assert isinstance(seen["deadline"], Deadline)
+    assert lines["a"]["result"]["words_analyzed"] == len(ARTICLE.split())
+    assert lines["b"]["error"] == "Failed to scrape text from the provided URL."
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        try:
+            for _ in range(50):
+                self.wfile.write(b"<p>still loading</p>")
+                self.wfile.flush()
+                time.sleep(0.1)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def slow_server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/article"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_a_slow_url_cannot_hold_the_batch_past_the_deadline(client, summaries, main, monkeypatch, slow_server):
+    monkeypatch.setattr(main, "Deadline", lambda: Deadline(0.5))
+    started = time.monotonic()
+    lines = result_lines(client.post("/analyze_batch?summary=0", json=[
+        {"id": "slow", "url": slow_server}, {"id": "text", "text": ARTICLE}
+    ]))
+    assert time.monotonic() - started < 3
+    assert lines["slow"]["error"] == "Failed to scrape text from the provided URL."
+    assert lines["text"]["result"] is not None
@@ -0,0 +1,135 @@
+import os
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+import batching
+from batching import MicroBatcher
+
+
+class Recorder:
+    """run_batch that doubles its items and remembers each batch it saw."""
+
+    def __init__(self):
+        self.batches = []
+        self._lock = threading.Lock()
+
+    def __call__(self, items):
+        with self._lock:
+            self.batches.append(list(items))
+        return [item * 2 for item in items]
+
+
+def test_results_come_back_in_submission_order():
+    recorder = Recorder()
+    batcher = MicroBatcher("test", recorder, max_batch_size=64, max_wait_ms=50, bucket_width=10)
+    items = [5, 1, 4, 2, 3]
+    # Lengths put the items in different buckets, run in bucket order.
+    lengths = [40, 0, 30, 10, 20]
+    assert batcher.submit_many(items, lengths) == [10, 2, 8, 4, 6]
+    assert len(recorder.batches) == 5
+
+
+def test_similar_lengths_share_a_batch():
+    recorder = Recorder()
+    batcher = MicroBatcher("test", recorder, max_batch_size=64, max_wait_ms=50, bucket_width=64)
+    assert batcher.submit_many([1, 2, 3, 4], [10, 20, 300, 310]) == [2, 4, 6, 8]
+    assert sorted(map(sorted, recorder.batches)) == [[1, 2], [3, 4]]
+
+
+def test_concurrent_submissions_are_merged():
+    recorder = Recorder()
+    batcher = MicroBatcher("test", recorder, max_batch_size=8, max_wait_ms=200)
+    results = {}
+    start = threading.Barrier(8)
+
+    def submit(value):
+        start.wait()
+        results[value] = batcher.submit(value, length=16)
+
+    threads = [threading.Thread(target=submit, args=(value,)) for value in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert results == {value: value * 2 for value in range(8)}
+    assert len(recorder.batches) < 8
+
+
+def test_a_full_batch_is_dispatched_without_waiting():
+    recorder = Recorder()
+    # A wait this long would time the test out if a full batch waited for it.
+    batcher = MicroBatcher("test", recorder, max_batch_size=2, max_wait_ms=60_000)
+    assert batcher.submit_many([1, 2], [0, 0]) == [2, 4]
+
+
+def test_sizes_count_towards_the_batch_limit(monkeypatch):
+    monkeypatch.setattr(batching, "BATCHING_ENABLED", False)
+    recorder = Recorder()
+    batcher = MicroBatcher("test", recorder, max_batch_size=4)
+    # The 3-window item cannot share a pass with more than one single item.
+    assert batcher.submit_many([1, 2, 3], [0, 0, 0], sizes=[1, 3, 1]) == [2, 4, 6]
+    assert all(len(batch) <= 2 for batch in recorder.batches)
+
+
+def test_a_multi_window_item_never_overfills_a_batch():
+    recorder = Recorder()
+    batcher = MicroBatcher("test", recorder, max_batch_size=4, max_wait_ms=200)
+    # Item value = its window count.
+    sizes = [3, 3, 1, 2, 2]
+    assert batcher.submit_many(sizes, [0] * 5, sizes=sizes) == [6, 6, 2, 4, 4]
+    assert all(sum(batch) <= 4 for batch in recorder.batches)
+    assert sorted(item for batch in recorder.batches for item in batch) == sorted(sizes)
+
+
+def test_an_oversized_item_runs_alone():
+    recorder = Recorder()
+    batcher = MicroBatcher("test", recorder, max_batch_size=2, max_wait_ms=200)
+    assert batcher.submit_many([5, 1], [0, 0], sizes=[5, 1]) == [10, 2]
+    assert recorder.batches == [[5], [1]]
+
+
+def test_missing_results_fail_the_callers():
+    batcher = MicroBatcher("test", lambda items: [item * 2 for item in items[:-1]], max_wait_ms=50)
+    with pytest.raises(RuntimeError, match="1 results for 2 items"):
+        batcher.submit_many([1, 2], [0, 0])
+
+
+def test_a_restarted_dispatcher_serves_what_was_queued():
+    recorder = Recorder()
+    batcher = MicroBatcher("test", recorder, max_wait_ms=1)
+    # This process's dispatcher died with an entry still queued.
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    batcher._worker, batcher._worker_pid = dead, os.getpid()
+    queued = Future()
+    batcher._queue.put((2, 0, queued, 1))
+
+    assert batcher.submit(3, length=0) == 6
+    assert queued.result(timeout=5) == 4
+
+
+def test_direct_mode_keeps_the_order(monkeypatch):
+    monkeypatch.setattr(batching, "BATCHING_ENABLED", False)
+    recorder = Recorder()
+    batcher = MicroBatcher("test", recorder, max_batch_size=2)
+    assert batcher.submit_many([3, 1, 2], [30, 10, 20]) == [6, 2, 4]
+    assert recorder.batches == [[1, 2], [3]]
+
+
+def test_missing_results_fail_in_direct_mode(monkeypatch):
+    monkeypatch.setattr(batching, "BATCHING_ENABLED", False)
+    batcher = MicroBatcher("test", lambda items: [], max_batch_size=2)
+    with pytest.raises(RuntimeError):
+        batcher.submit_many([1, 2], [0, 0])
+
+
+def test_a_failing_batch_raises_in_every_caller():
+    def broken(items):
+        raise RuntimeError("out of memory")
+
+    batcher = MicroBatcher("test", broken, max_wait_ms=1)
+    with pytest.raises(RuntimeError, match="out of memory"):
+        batcher.submit(1, length=0)
@@ -0,0 +1,124 @@
+import os
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+import cascade
+from cascade import (DECIDED_BY_CHEAP, DECIDED_BY_FULL, CascadeStage, decision, get_cheap_model, model_path,
+                     split_decision)
+
+
+class FixedCheapModel:
+    """Cheap model whose answer for each text is given up front."""
+    version = "fixed"
+
+    def __init__(self, answers):
+        self.answers = answers
+
+    def predict(self, texts):
+        return [self.answers[text] for text in texts]
+
+
+class RecordingAnalyzer:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return [f"full:{text}" for text in texts]
+
+
+def social(label, confidence):
+    return label, {label: confidence, "other": 1 - confidence}
+
+
+# ------------------------------------------------------------
+# Escalation
+# ------------------------------------------------------------
+def test_only_unconfident_texts_reach_the_transformer():
+    full = RecordingAnalyzer()
+    cheap = FixedCheapModel({"sure": social("race", 0.95), "unsure": social("race", 0.6), "edge": social("none", 0.9)})
+    stage = CascadeStage("social", full, min_confidence=0.9, cheap=cheap)
+
+    results = stage(["sure", "unsure", "edge"])
+
+    assert full.calls == [["unsure"]]
+    assert results == [
+        decision({"bias_category": "race", "confidence": 0.95}, DECIDED_BY_CHEAP),
+        decision("full:unsure", DECIDED_BY_FULL),
+        # The threshold itself is confident enough.
+        decision({"bias_category": "none", "confidence": 0.9}, DECIDED_BY_CHEAP),
+    ]
+
+
+def test_a_confident_batch_skips_the_transformer():
+    full = RecordingAnalyzer()
+    cheap = FixedCheapModel({"a": ("fake", {"fake": 0.97, "real": 0.03})})
+    stage = CascadeStage("fake_news", full, min_confidence=0.9, cheap=cheap)
+    assert stage(["a"]) == [decision(97.0, DECIDED_BY_CHEAP)]
+    assert full.calls == []
+
+
+def test_the_threshold_is_part_of_the_cache_version(monkeypatch):
+    monkeypatch.setenv("CLEARIFY_CASCADE_THRESHOLD_SOCIAL", "0.75")
+    cheap = FixedCheapModel({})
+    assert CascadeStage("social", RecordingAnalyzer(), cheap=cheap).signature == "cascade-fixed-0.75"
+    assert CascadeStage("social", RecordingAnalyzer(), min_confidence=0.9, cheap=cheap).signature == "cascade-fixed-0.9"
+
+
+def test_split_decision():
+    assert split_decision(decision(42.0, DECIDED_BY_CHEAP)) == (42.0, DECIDED_BY_CHEAP)
+    assert split_decision(42.0) == (42.0, None)
+    # A stage result that merely has a "value" key is not a decision.
+    assert split_decision({"value": 1, "confidence": 0.5}) == ({"value": 1, "confidence": 0.5}, None)
+
+
+# ------------------------------------------------------------
+# Saved models
+# ------------------------------------------------------------
+@pytest.fixture
+def cascade_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "cascade"
+    monkeypatch.setattr(cascade, "CASCADE_DIR", str(directory))
+    monkeypatch.setattr(cascade, "_models", {})
+    return directory
+
+
+def plant(stage="social"):
+    with open(model_path(stage), "wb") as f:
+        pickle.dump({"stage": stage, "model": None, "version": "planted"}, f)
+
+
+def test_a_missing_model_is_not_trained_by_default(cascade_dir):
+    assert not cascade.AUTO_TRAIN
+    with pytest.raises(FileNotFoundError, match="cascade.py train"):
+        get_cheap_model("social")
+
+
+def test_a_directory_others_can_write_is_refused(cascade_dir):
+    cascade_dir.mkdir(mode=0o700)
+    plant()
+    os.chmod(cascade_dir, 0o777)
+    with pytest.raises(PermissionError):
+        get_cheap_model("social")
+
+
+def test_a_model_file_others_can_write_is_refused(cascade_dir):
+    cascade_dir.mkdir(mode=0o700)
+    plant()
+    os.chmod(model_path("social"), 0o666)
+    with pytest.raises(PermissionError):
+        get_cheap_model("social")
+
+
+def test_saved_models_are_private(cascade_dir):
+    cascade.save(SimpleNamespace(stage="social", model=None, version="v1"))
+    assert os.stat(cascade_dir).st_mode & 0o777 == 0o700
+    assert os.stat(model_path("social")).st_mode & 0o777 == 0o600
+
+
+def test_a_saved_model_loads_back(cascade_dir):
+    pytest.importorskip("sklearn")
+    cascade.save(SimpleNamespace(stage="social", model=None, version="v1"))
+    assert get_cheap_model("social").version == "v1"
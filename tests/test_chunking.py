@@ -0,0 +1,119 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from chunking import aggregate_probs, split_text_windows, split_windows, window_starts
+from document import Document
+
+
+class FakeTokenizer:
+    """One token per word; ids are the word's position, specials are -1 and -2."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, text, add_special_tokens=False, verbose=False):
+        self.calls += 1
+        return {"input_ids": list(range(len(text.split())))}
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+    def prepare_for_model(self, ids, add_special_tokens=True):
+        return {"input_ids": [-1] + list(ids) + [-2]}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return " ".join(f"w{i}" for i in ids)
+
+
+def words(count):
+    return " ".join(f"w{i}" for i in range(count))
+
+
+# ------------------------------------------------------------
+# window_starts
+# ------------------------------------------------------------
+@pytest.mark.parametrize("n_tokens, expected", [
+    (0, [0]),
+    (100, [0]),
+    (956, [0, 446]),
+    (957, [0, 446, 892]),
+])
+def test_windows_overlap_and_cover_the_text(n_tokens, expected):
+    starts = window_starts(n_tokens, body=510, overlap=64, max_windows=0)
+    assert starts == expected
+    assert starts[-1] + 510 >= n_tokens
+
+
+def test_overlap_is_capped_at_half_a_window():
+    assert window_starts(20, body=10, overlap=8, max_windows=0) == [0, 5, 10]
+
+
+def test_extra_windows_are_dropped_evenly_keeping_first_and_last():
+    assert window_starts(10000, body=100, overlap=0, max_windows=4) == [0, 3300, 6600, 9900]
+    assert window_starts(10000, body=100, overlap=0, max_windows=1) == [0]
+
+
+# ------------------------------------------------------------
+# split_windows
+# ------------------------------------------------------------
+def test_split_windows_adds_special_tokens_to_each_window():
+    encodings, lengths = split_windows(FakeTokenizer(), words(10), max_length=6, overlap=2, max_windows=0)
+    assert [encoding["input_ids"] for encoding in encodings] == [
+        [-1, 0, 1, 2, 3, -2],
+        [-1, 2, 3, 4, 5, -2],
+        [-1, 4, 5, 6, 7, -2],
+        [-1, 6, 7, 8, 9, -2],
+    ]
+    assert lengths == [4, 4, 4, 4]
+
+
+def test_split_text_windows_decodes_each_window():
+    texts, lengths = split_text_windows(FakeTokenizer(), words(10), max_length=6, overlap=2, max_windows=2)
+    assert texts == ["w0 w1 w2 w3", "w6 w7 w8 w9"]
+    assert lengths == [4, 4]
+
+
+def test_a_document_is_tokenized_once():
+    tokenizer, text = FakeTokenizer(), Document(words(10))
+    split_windows(tokenizer, text, max_length=6, overlap=2)
+    split_text_windows(tokenizer, text, max_length=6, overlap=2)
+    assert tokenizer.calls == 1
+
+
+# ------------------------------------------------------------
+# aggregate_probs
+# ------------------------------------------------------------
+WINDOWS = [[0.8, 0.2], [0.4, 0.6]]
+
+
+def test_a_single_window_is_returned_as_is():
+    assert list(aggregate_probs([[0.3, 0.7]], method="max")) == pytest.approx([0.3, 0.7])
+
+
+@pytest.mark.parametrize("method, lengths, expected", [
+    ("mean", None, [0.6, 0.4]),
+    ("max", None, [0.8 / 1.4, 0.6 / 1.4]),
+    ("length_weighted", [3, 1], [0.7, 0.3]),
+])
+def test_window_probabilities_are_combined(method, lengths, expected):
+    combined = aggregate_probs(WINDOWS, lengths, method)
+    assert list(combined) == pytest.approx(expected)
+    assert combined.sum() == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("windows", [WINDOWS, WINDOWS[:1]])
+def test_an_unknown_method_is_rejected(windows):
+    with pytest.raises(ValueError, match="median"):
+        aggregate_probs(windows, method="median")
+
+
+@pytest.mark.parametrize("windows", [WINDOWS, WINDOWS[:1]])
+def test_length_weighting_needs_the_lengths(windows):
+    with pytest.raises(ValueError, match="lengths"):
+        aggregate_probs(windows, method="length_weighted")
+
+
+def test_length_weighting_needs_one_length_per_window():
+    with pytest.raises(ValueError, match="1 lengths for 2 windows"):
+        aggregate_probs(WINDOWS, [3], "length_weighted")
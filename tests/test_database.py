@@ -0,0 +1,231 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+import database
+from database import (ConnectionPool, FeedbackBuffer, FeedbackBufferFull, PoolTimeout, _sql, save_feedback,
+                      write_feedback_rows)
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """DATABASE_URL pointing at a fresh SQLite file; returns its path."""
+    path = tmp_path / "clearify.db"
+    monkeypatch.setattr(database, "DATABASE_URL", f"sqlite:///{path}")
+    monkeypatch.setattr(database, "_pool", None)
+    monkeypatch.setattr(database, "_pool_pid", None)
+    # Connecting creates the feedback table.
+    database.get_db_connection().close()
+    yield path
+    if database._pool is not None:
+        database._pool.close_all()
+
+
+def feedback_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT rating, feedback_text, submitted_text FROM feedback ORDER BY id").fetchall()
+
+
+def wait_for(condition, timeout=2.0):
+    ends_at = time.monotonic() + timeout
+    while time.monotonic() < ends_at:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class FailingWriter:
+    """Raises for the first `failures` calls, then writes for real."""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.calls = 0
+
+    def __call__(self, rows):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise sqlite3.OperationalError("database is locked")
+        write_feedback_rows(rows)
+
+
+# ------------------------------------------------------------
+# SQL dialect
+# ------------------------------------------------------------
+def test_postgres_queries_are_rewritten_for_sqlite(sqlite_db):
+    assert _sql("SELECT 1 WHERE a = %s AND b > NOW() - (%s * INTERVAL '1 second')") == (
+        "SELECT 1 WHERE a = ? AND b > strftime('%s', 'now') - ?"
+    )
+
+
+def test_queries_are_unchanged_for_postgres(monkeypatch):
+    monkeypatch.setattr(database, "DATABASE_URL", "postgres://db/clearify")
+    assert _sql("SELECT %s") == "SELECT %s"
+
+
+def test_the_analysis_cache_round_trips(sqlite_db, monkeypatch):
+    monkeypatch.setattr(database, "_analysis_cache_ready", False)
+    database.store_cached_result("k" * 64, "tone", '{"tone": "calm"}')
+    assert database.load_cached_result("k" * 64, 60) == '{"tone": "calm"}'
+    assert database.load_cached_result("x" * 64, 60) is None
+
+
+# ------------------------------------------------------------
+# Connection pool
+# ------------------------------------------------------------
+def test_the_pool_never_opens_more_than_max_size(sqlite_db):
+    opened = []
+
+    def connect():
+        opened.append(database.get_db_connection())
+        return opened[-1]
+
+    pool = ConnectionPool(connect, max_size=2, timeout=0.05)
+    first, second = pool.acquire(), pool.acquire()
+    started = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.05
+    assert pool.size == 2
+
+    pool.release(first)
+    assert pool.acquire() is first
+    assert len(opened) == 2
+    pool.release(first)
+    pool.release(second)
+    pool.close_all()
+    assert pool.size == 0
+
+
+def test_a_waiting_checkout_gets_a_released_connection(sqlite_db):
+    pool = ConnectionPool(database.get_db_connection, max_size=1, timeout=2)
+    conn = pool.acquire()
+    threading.Timer(0.05, pool.release, args=(conn,)).start()
+    assert pool.acquire() is conn
+    pool.release(conn)
+    pool.close_all()
+
+
+def test_a_broken_connection_is_replaced_after_a_failed_health_check(sqlite_db):
+    pool = ConnectionPool(database.get_db_connection, max_size=1, timeout=0.05)
+    broken = pool.acquire()
+    pool.release(broken)
+    # Dies while idle in the pool, e.g. a server-side timeout.
+    broken.close()
+
+    conn = pool.acquire(check=True)
+    assert conn is not broken
+    assert conn.execute("SELECT 1").fetchone()[0] == 1
+    assert pool.size == 1
+    pool.release(conn)
+    pool.close_all()
+
+
+def test_idle_connections_are_checked_before_reuse(sqlite_db):
+    pool = ConnectionPool(database.get_db_connection, max_size=1, timeout=0.05, healthcheck_idle=0)
+    broken = pool.acquire()
+    pool.release(broken)
+    broken.close()
+    conn = pool.acquire()
+    assert conn is not broken
+    pool.release(conn)
+    pool.close_all()
+
+
+def test_a_connection_that_cannot_roll_back_is_discarded(sqlite_db):
+    with pytest.raises(RuntimeError):
+        with database.pooled_connection() as conn:
+            conn.close()
+            raise RuntimeError("query failed")
+    assert database.get_pool().size == 0
+
+
+# ------------------------------------------------------------
+# Feedback buffer
+# ------------------------------------------------------------
+def test_a_full_batch_is_flushed_without_waiting(sqlite_db):
+    buffer = FeedbackBuffer(flush_rows=3, flush_interval=60)
+    for rating in (1, 2, 3):
+        buffer.add((rating, "text", "article"))
+    assert wait_for(lambda: len(feedback_rows(sqlite_db)) == 3)
+    assert [row[0] for row in feedback_rows(sqlite_db)] == [1, 2, 3]
+    assert len(buffer) == 0
+
+
+def test_rows_are_flushed_after_the_interval(sqlite_db):
+    buffer = FeedbackBuffer(flush_rows=100, flush_interval=0.05)
+    buffer.add((4, "good", "article"))
+    assert wait_for(lambda: feedback_rows(sqlite_db) == [(4, "good", "article")])
+
+
+def test_a_failed_flush_keeps_the_rows_for_the_retry(sqlite_db):
+    writer = FailingWriter(failures=1)
+    buffer = FeedbackBuffer(flush_rows=100, flush_interval=60, writer=writer)
+    buffer.add((1, "first", "a"))
+    buffer.add((2, "second", "b"))
+
+    assert buffer.flush() == 0
+    assert len(buffer) == 2
+    snapshot = buffer.snapshot()
+    assert snapshot["consecutive_failures"] == 1
+    assert "database is locked" in snapshot["last_error"]
+
+    buffer.add((3, "third", "c"))
+    assert buffer.flush() == 3
+    assert [row[0] for row in feedback_rows(sqlite_db)] == [1, 2, 3]
+    assert buffer.snapshot() == {"pending_rows": 0, "consecutive_failures": 0, "last_error": None}
+
+
+def test_the_background_flush_retries_with_backoff(sqlite_db):
+    writer = FailingWriter(failures=2)
+    buffer = FeedbackBuffer(flush_rows=1, flush_interval=0.02, writer=writer, max_retry_interval=0.05)
+    buffer.add((5, "great", "article"))
+    assert wait_for(lambda: len(feedback_rows(sqlite_db)) == 1)
+    assert writer.calls == 3
+
+
+def test_a_full_buffer_rejects_new_rows(sqlite_db):
+    buffer = FeedbackBuffer(max_rows=2, flush_rows=100, flush_interval=60, writer=FailingWriter(failures=10))
+    buffer.add((1, "", ""))
+    buffer.add((2, "", ""))
+    with pytest.raises(FeedbackBufferFull):
+        buffer.add((3, "", ""))
+    # The accepted rows are all still there.
+    assert len(buffer) == 2
+
+
+def test_shutdown_writes_what_is_left(sqlite_db, monkeypatch):
+    buffer = FeedbackBuffer(flush_rows=100, flush_interval=60)
+    monkeypatch.setattr(database, "feedback_buffer", buffer)
+    buffer.add((3, "ok", "article"))
+    pool = database.get_pool()
+
+    database.shutdown()
+
+    assert feedback_rows(sqlite_db) == [(3, "ok", "article")]
+    assert pool.size == 0
+
+
+# ------------------------------------------------------------
+# save_feedback
+# ------------------------------------------------------------
+def test_buffered_feedback_is_reported_as_queued(sqlite_db, monkeypatch):
+    buffer = FeedbackBuffer(flush_rows=100, flush_interval=60)
+    monkeypatch.setattr(database, "feedback_buffer", buffer)
+    monkeypatch.setattr(database, "FEEDBACK_BUFFERED", True)
+    assert save_feedback(5, "nice", "article") == "queued"
+    assert feedback_rows(sqlite_db) == []
+    assert len(buffer) == 1
+
+
+def test_unbuffered_feedback_is_written_or_raises(sqlite_db, monkeypatch):
+    monkeypatch.setattr(database, "FEEDBACK_BUFFERED", False)
+    assert save_feedback(5, "nice", "article") == "saved"
+    assert feedback_rows(sqlite_db) == [(5, "nice", "article")]
+
+    monkeypatch.setattr(database, "DATABASE_URL", None)
+    monkeypatch.setattr(database, "_pool", None)
+    with pytest.raises(ConnectionError):
+        save_feedback(1, "lost", "article")
@@ -0,0 +1,57 @@
+import os
+import subprocess
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import dbias_torch
+from dbias_torch import ensure_pytorch_dbias
+
+
+@pytest.fixture
+def conversions(tmp_path, monkeypatch):
+    """Runs the conversion subprocess as a file copy; returns its output dirs."""
+    monkeypatch.setattr(dbias_torch, "CONVERTED_BASE_PATH", str(tmp_path / "converted"))
+    converted = []
+
+    def run(command, **kwargs):
+        tf_path, out_dir = command[-2:]
+        converted.append(out_dir)
+        os.makedirs(out_dir)
+        with open(os.path.join(tf_path, "tf_model.h5"), "rb") as src, \
+                open(os.path.join(out_dir, "pytorch_model.bin"), "wb") as dst:
+            dst.write(src.read())
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+    monkeypatch.setattr(dbias_torch.subprocess, "run", run)
+    return converted
+
+
+def checkpoint(path, weights):
+    path.mkdir(exist_ok=True)
+    (path / "config.json").write_text('{"labels": 2}')
+    (path / "tf_model.h5").write_bytes(weights)
+    return str(path)
+
+
+def read_weights(out_dir):
+    with open(os.path.join(out_dir, "pytorch_model.bin"), "rb") as f:
+        return f.read()
+
+
+def test_the_checkpoint_is_converted_once(tmp_path, conversions):
+    tf_path = checkpoint(tmp_path / "dbias", b"0" * 10)
+    out_dir = ensure_pytorch_dbias(tf_path)
+    assert ensure_pytorch_dbias(tf_path) == out_dir
+    assert conversions == [out_dir]
+
+
+def test_a_same_size_retrain_is_converted_again(tmp_path, conversions):
+    tf_path = checkpoint(tmp_path / "dbias", b"0" * 10)
+    stale = ensure_pytorch_dbias(tf_path)
+    checkpoint(tmp_path / "dbias", b"1" * 10)
+    fresh = ensure_pytorch_dbias(tf_path)
+    assert fresh != stale
+    assert conversions == [stale, fresh]
+    assert read_weights(fresh) == b"1" * 10
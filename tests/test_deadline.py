@@ -0,0 +1,169 @@
+import pytest
+
+import deadline as deadline_module
+from deadline import (CircuitBreaker, CircuitOpenError, Deadline, DeadlineExceeded, call_with_retries,
+                      cap_timeout)
+
+
+class FakeClock:
+    """Stands in for the time module: sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(deadline_module, "time", clock)
+    return clock
+
+
+# ------------------------------------------------------------
+# Deadline
+# ------------------------------------------------------------
+def test_the_deadline_counts_down(clock):
+    deadline = Deadline(10)
+    clock.advance(4)
+    assert deadline.remaining() == 6
+    assert deadline.cap(8) == 6
+    assert deadline.cap(2) == 2
+    assert deadline.cap() == 6
+    assert not deadline.expired()
+    clock.advance(7)
+    assert deadline.remaining() == 0
+    assert deadline.expired()
+
+
+def test_timeouts_without_a_deadline_are_unchanged(clock):
+    assert cap_timeout(5, None) == 5
+    assert cap_timeout(None, None) is None
+    assert cap_timeout(5, Deadline(3)) == 3
+
+
+# ------------------------------------------------------------
+# Circuit breaker
+# ------------------------------------------------------------
+def test_the_circuit_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    breaker.record_failure("a")
+    breaker.record_failure("b")
+    breaker.record_success()
+    breaker.record_failure("c")
+    breaker.record_failure("d")
+    assert breaker.state == "closed"
+    breaker.record_failure("e")
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    snapshot = breaker.snapshot()
+    assert snapshot["retry_in_seconds"] == 30
+    assert snapshot["total_rejected"] == 1
+    assert snapshot["last_error"] == "e"
+
+
+def test_one_trial_call_after_the_reset_timeout_closes_the_circuit(clock):
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.advance(29)
+    assert breaker.state == "open"
+    clock.advance(1)
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    # Only one trial at a time.
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_a_failed_trial_reopens_the_circuit(clock):
+    breaker = CircuitBreaker("test", failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.advance(30)
+    assert breaker.allow()
+    breaker.record_failure("still down")
+    assert breaker.state == "open"
+    assert breaker.snapshot()["retry_in_seconds"] == 30
+
+
+# ------------------------------------------------------------
+# Retries
+# ------------------------------------------------------------
+class Flaky:
+    """Fails `failures` times, then returns "ok"; records the timeouts it got."""
+
+    def __init__(self, failures, clock=None, duration=0.0):
+        self.failures = failures
+        self.clock = clock
+        self.duration = duration
+        self.timeouts = []
+
+    def __call__(self, timeout):
+        self.timeouts.append(timeout)
+        if self.clock is not None:
+            self.clock.advance(self.duration)
+        if len(self.timeouts) <= self.failures:
+            raise ConnectionError(f"failure {len(self.timeouts)}")
+        return "ok"
+
+
+def test_a_call_is_retried_until_it_succeeds(clock):
+    fn = Flaky(failures=2)
+    assert call_with_retries(fn, attempts=3, attempt_timeout=5) == "ok"
+    assert fn.timeouts == [5, 5, 5]
+    assert len(clock.sleeps) == 2
+    # Full jitter within the exponential cap.
+    assert 0 <= clock.sleeps[0] <= 0.5 and 0 <= clock.sleeps[1] <= 1.0
+
+
+def test_the_last_error_is_raised_when_attempts_run_out(clock):
+    with pytest.raises(ConnectionError, match="failure 3"):
+        call_with_retries(Flaky(failures=5), attempts=3)
+
+
+def test_attempt_timeouts_shrink_with_the_deadline(clock):
+    fn = Flaky(failures=1, clock=clock, duration=4)
+    assert call_with_retries(fn, attempts=3, attempt_timeout=5, deadline=Deadline(7), base_delay=0) == "ok"
+    assert fn.timeouts == [5, 3]
+
+
+def test_no_attempt_starts_past_the_deadline(clock):
+    fn = Flaky(failures=5, clock=clock, duration=5)
+    with pytest.raises(ConnectionError, match="failure 1"):
+        call_with_retries(fn, attempts=3, attempt_timeout=5, deadline=Deadline(5), base_delay=0)
+    assert len(fn.timeouts) == 1
+
+    expired = Deadline(1)
+    clock.advance(1)
+    with pytest.raises(DeadlineExceeded):
+        call_with_retries(fn, attempts=3, attempt_timeout=5, deadline=expired)
+    assert len(fn.timeouts) == 1
+
+
+def test_no_backoff_sleeps_past_the_deadline(clock):
+    fn = Flaky(failures=5)
+    deadline = Deadline(0.1)
+    with pytest.raises(ConnectionError):
+        call_with_retries(fn, attempts=3, deadline=deadline, base_delay=10, max_delay=10)
+    assert sum(clock.sleeps) < 0.1
+
+
+def test_an_open_breaker_stops_the_retries(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    fn = Flaky(failures=5)
+    with pytest.raises(CircuitOpenError):
+        call_with_retries(fn, attempts=5, breaker=breaker, base_delay=0)
+    assert len(fn.timeouts) == 2
+    assert breaker.snapshot()["total_failures"] == 2
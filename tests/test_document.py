@@ -0,0 +1,180 @@
+import pickle
+import threading
+import time
+
+import pytest
+
+from document import Document, RecentDocuments, as_document, memo_batch, tokenizer_key
+
+
+class FakeTokenizer:
+    """Splits on whitespace into IDs from a vocab file in `directory`."""
+
+    vocab_files_names = {"vocab_file": "vocab.txt"}
+
+    def __init__(self, directory, do_lower_case=True):
+        self.name_or_path = str(directory)
+        self.init_kwargs = {"do_lower_case": do_lower_case}
+        self.calls = 0
+        with open(directory / "vocab.txt") as f:
+            self.vocab = {word: i for i, word in enumerate(f.read().split())}
+
+    def __call__(self, text, add_special_tokens=True, verbose=True):
+        self.calls += 1
+        words = text.lower().split() if self.init_kwargs["do_lower_case"] else text.split()
+        return {"input_ids": [self.vocab.get(word, -1) for word in words]}
+
+
+def vocab_dir(tmp_path, name, words):
+    directory = tmp_path / name
+    directory.mkdir()
+    (directory / "vocab.txt").write_text("\n".join(words))
+    return directory
+
+
+# ------------------------------------------------------------
+# Document.memo
+# ------------------------------------------------------------
+def test_concurrent_callers_share_one_computation():
+    document = Document("some article text")
+    calls = []
+    start = threading.Barrier(8)
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.05)
+        return "parsed"
+
+    def read():
+        start.wait()
+        results.append(document.memo("parse", compute))
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert calls == [1]
+    assert results == ["parsed"] * 8
+
+
+def test_a_failed_computation_is_retried():
+    document = Document("text")
+
+    def broken():
+        raise RuntimeError("model not loaded")
+
+    with pytest.raises(RuntimeError):
+        document.memo("parse", broken)
+    assert document.memo("parse", lambda: "parsed") == "parsed"
+
+
+def test_derived_values_are_computed_once():
+    document = as_document("The cat saw the other cat.")
+    assert document.words == ["the", "cat", "saw", "the", "other", "cat"]
+    assert document.words is document.words
+    assert document.word_counts["cat"] == 2
+    assert as_document(document) is document
+
+
+def test_a_document_pickles_as_its_text():
+    document = Document("text")
+    document.memo("parse", lambda: object())
+    copy = pickle.loads(pickle.dumps(document))
+    assert copy == "text" and isinstance(copy, Document)
+    assert copy._memo == {}
+
+
+def test_recent_documents_are_shared_by_text():
+    recent = RecentDocuments(max_entries=2)
+    first = recent.get("one")
+    assert recent.get("one") is first
+    recent.get("two")
+    recent.get("three")
+    assert recent.get("one") is not first
+
+
+# ------------------------------------------------------------
+# memo_batch
+# ------------------------------------------------------------
+def test_a_batch_only_computes_the_missing_documents():
+    documents = [Document(text) for text in ("a", "b", "c")]
+    batches = []
+
+    def compute_many(batch):
+        batches.append([str(document) for document in batch])
+        return [document.upper() for document in batch]
+
+    assert memo_batch(documents[:2], "upper", compute_many) == ["A", "B"]
+    assert memo_batch(documents, "upper", compute_many) == ["A", "B", "C"]
+    assert batches == [["a", "b"], ["c"]]
+
+
+def test_a_batch_waits_for_documents_claimed_by_another_caller():
+    shared, own = Document("shared"), Document("own")
+    started, release = threading.Event(), threading.Event()
+    batches = []
+
+    def slow(batch):
+        batches.append([str(document) for document in batch])
+        started.set()
+        release.wait(5)
+        return [len(document) for document in batch]
+
+    first = threading.Thread(target=memo_batch, args=([shared], "length", slow))
+    first.start()
+    started.wait(5)
+    threading.Timer(0.05, release.set).start()
+    assert memo_batch([shared, own], "length", lambda batch: [len(d) for d in batch]) == [6, 3]
+    first.join(5)
+    assert batches == [["shared"]]
+
+
+def test_a_failed_batch_raises_and_is_retried():
+    documents = [Document("a"), Document("b")]
+
+    def broken(batch):
+        raise RuntimeError("out of memory")
+
+    with pytest.raises(RuntimeError):
+        memo_batch(documents, "upper", broken)
+    assert memo_batch(documents, "upper", lambda batch: [d.upper() for d in batch]) == ["A", "B"]
+
+
+# ------------------------------------------------------------
+# Tokenizer identity
+# ------------------------------------------------------------
+def test_tokenizers_with_the_same_vocab_share_a_key(tmp_path):
+    first = FakeTokenizer(vocab_dir(tmp_path, "first", ["the", "cat"]))
+    second = FakeTokenizer(vocab_dir(tmp_path, "second", ["the", "cat"]))
+    assert tokenizer_key(first) == tokenizer_key(second)
+
+
+def test_different_vocabs_or_settings_get_different_keys(tmp_path):
+    base = FakeTokenizer(vocab_dir(tmp_path, "base", ["the", "cat"]))
+    other_vocab = FakeTokenizer(vocab_dir(tmp_path, "other", ["cat", "the"]))
+    cased = FakeTokenizer(vocab_dir(tmp_path, "cased", ["the", "cat"]), do_lower_case=False)
+    keys = {tokenizer_key(base), tokenizer_key(other_vocab), tokenizer_key(cased)}
+    assert len(keys) == 3
+
+
+def test_a_tokenizer_without_vocab_files_only_matches_itself(tmp_path):
+    first = FakeTokenizer(vocab_dir(tmp_path, "first", ["the"]))
+    second = FakeTokenizer(vocab_dir(tmp_path, "second", ["the"]))
+    for tokenizer in (first, second):
+        tokenizer.name_or_path = str(tmp_path / "missing")
+    assert tokenizer_key(first) != tokenizer_key(second)
+    assert tokenizer_key(first) == tokenizer_key(first)
+
+
+def test_token_ids_are_kept_apart_per_tokenizer(tmp_path):
+    document = Document("The cat")
+    lower = FakeTokenizer(vocab_dir(tmp_path, "lower", ["the", "cat", "The"]))
+    same_vocab = FakeTokenizer(vocab_dir(tmp_path, "same", ["the", "cat", "The"]))
+    cased = FakeTokenizer(vocab_dir(tmp_path, "cased", ["the", "cat", "The"]), do_lower_case=False)
+
+    assert document.token_ids(lower) == [0, 1]
+    assert document.token_ids(same_vocab) == [0, 1]
+    assert document.token_ids(cased) == [2, 1]
+    assert (lower.calls, same_vocab.calls, cased.calls) == (1, 0, 1)
@@ -0,0 +1,58 @@
+import os
+
+import pytest
+
+pytest.importorskip("lxml")
+
+from extractor import MIN_FAST_CHARS, extract_fast
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "extraction")
+
+
+def fixture_page(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+# ------------------------------------------------------------
+# Fixture pages
+# ------------------------------------------------------------
+def test_a_plain_article_keeps_its_body_and_drops_the_chrome():
+    text = extract_fast(fixture_page("plain_article.html"))
+    assert text.startswith("City council approves new transit budget")
+    assert "about 14 million dollars a year" in text
+    assert "roughly 40 additional drivers" in text
+    for chrome in ("Share this article", "State lawmakers debate", "morning newsletter", "Copyright"):
+        assert chrome not in text
+    assert len(text) >= MIN_FAST_CHARS
+
+
+def test_a_body_inside_a_sidebar_named_wrapper_is_kept():
+    text = extract_fast(fixture_page("wrapper_with_sidebar.html"))
+    assert "Farmers across the valley are planting fewer acres" in text
+    assert "more applications than it can fund" in text
+    # The real sidebar and the comments inside and beside the wrapper still go.
+    assert "patio furniture" not in text
+    assert "Reader comment" not in text
+    assert len(text) >= MIN_FAST_CHARS
+
+
+def test_class_names_only_match_at_word_starts():
+    # "commentary" is not "comment"; "ad-slot", "comments" and "menu" are chrome.
+    text = extract_fast(fixture_page("opinion_commentary.html"))
+    assert "the public library is often the last one left" in text
+    assert "cannot easily be replaced" in text
+    for chrome in ("sedan", "my kids can study", "More opinion pieces"):
+        assert chrome not in text
+
+
+def test_a_page_without_an_article_is_left_to_the_fallback():
+    assert len(extract_fast(fixture_page("short_page.html"))) < MIN_FAST_CHARS
+
+
+# ------------------------------------------------------------
+# Edge cases
+# ------------------------------------------------------------
+@pytest.mark.parametrize("html", ["", "   ", "<html></html>"])
+def test_empty_pages_give_no_text(html):
+    assert extract_fast(html) == ""
@@ -0,0 +1,119 @@
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+
+import fetcher
+from fetcher import FetchError, Fetcher, decode_body
+
+UTF8_PAGE = "<html><head><meta charset=\"utf-8\"></head><body>Café – naïve</body></html>"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Routes of the local fixture server; each test picks one by path."""
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, body: bytes, content_type: str = "text/html", headers=None, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/utf8-no-charset":
+            self._send(UTF8_PAGE.encode("utf-8"))
+        elif self.path == "/utf8-no-meta":
+            self._send("<p>Café</p>".encode("utf-8"))
+        elif self.path == "/latin1-header":
+            self._send("<p>Café</p>".encode("latin-1"), "text/html; charset=ISO-8859-1")
+        elif self.path == "/cp1252-meta":
+            body = "<meta http-equiv=\"Content-Type\" content=\"text/html; charset=windows-1252\">“quoted”"
+            self._send(body.encode("cp1252"))
+        elif self.path == "/gzip":
+            self._send(gzip.compress("<p>Café</p>".encode("utf-8")), headers={"Content-Encoding": "gzip"})
+        elif self.path == "/big":
+            self._send(b"x" * 4096)
+        elif self.path == "/slow":
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            try:
+                for _ in range(20):
+                    self.wfile.write(b"<p>drip</p>")
+                    self.wfile.flush()
+                    time.sleep(0.1)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+        elif self.path == "/etag":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+            else:
+                self._send(b"<p>cached</p>", headers={"ETag": '"v1"'})
+        else:
+            self._send(b"missing", status=404)
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def client(tmp_path):
+    return Fetcher(cache_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("/utf8-no-charset", "Café – naïve"),
+    ("/utf8-no-meta", "Café"),
+    ("/latin1-header", "Café"),
+    ("/cp1252-meta", "“quoted”"),
+    ("/gzip", "Café"),
+])
+def test_encodings(server, client, path, expected):
+    assert expected in client.fetch(server + path).html
+
+
+def test_size_cap(server, client, monkeypatch):
+    monkeypatch.setattr(fetcher, "MAX_BYTES", 1024)
+    with pytest.raises(FetchError, match="larger than"):
+        client.fetch(server + "/big")
+
+
+def test_total_timeout(server, client):
+    started = time.monotonic()
+    with pytest.raises(FetchError, match="exceeded"):
+        client.fetch(server + "/slow", total_timeout=0.5)
+    assert time.monotonic() - started < 1.5
+
+
+def test_etag_revalidation(server, client):
+    first = client.fetch(server + "/etag")
+    second = client.fetch(server + "/etag")
+    assert not first.from_cache
+    assert second.from_cache and second.status == 304
+    assert second.html == first.html
+
+
+def test_http_error(server, client):
+    with pytest.raises(Exception):
+        client.fetch(server + "/missing")
+
+
+def test_decode_body_prefers_bom():
+    assert decode_body(b"\xef\xbb\xbfCaf\xc3\xa9", "text/html; charset=latin-1") == "Café"
@@ -0,0 +1,224 @@
+import os
+import stat
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import inference_server
+from inference_server import InferenceClient, InferenceError, authkey_path, load_analysis_backend, serve
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def socket_path(tmp_path, monkeypatch, fake_backend):
+    """Where a test server listens; serving uses the fake analyzers."""
+    monkeypatch.setattr(inference_server, "INFERENCE_AUTHKEY", b"")
+    monkeypatch.setattr(inference_server, "load_local_analyzers",
+                        lambda: (fake_backend.analyzers, fake_backend.versions))
+    # Socket paths are limited to ~100 bytes; tmp_path can be longer.
+    return str(tmp_path / "run" / "inference.sock")
+
+
+def start_server(path):
+    """Runs serve() in a daemon thread until the socket accepts connections."""
+    previous = os.stat(path).st_ino if os.path.exists(path) else None
+    threading.Thread(target=serve, args=(path,), daemon=True).start()
+    give_up_at = time.monotonic() + 5
+    while time.monotonic() < give_up_at:
+        if os.path.exists(path) and os.stat(path).st_ino != previous:
+            return
+        time.sleep(0.01)
+    raise TimeoutError("inference server did not start")
+
+
+class BrokenConnection:
+    """A connection whose server went away."""
+
+    def send(self, message):
+        raise BrokenPipeError("broken pipe")
+
+    def close(self):
+        pass
+
+
+# ------------------------------------------------------------
+# Round trip
+# ------------------------------------------------------------
+def test_stage_batches_round_trip(socket_path, fake_backend):
+    start_server(socket_path)
+    client = InferenceClient(socket_path)
+    assert client.versions() == fake_backend.versions
+
+    analyzers = client.analyzers(["political", "dbias"])
+    assert analyzers["political"](["one text", "another"]) == [fake_backend.RESULTS["political"]] * 2
+    # Tuples come back as tuples: messages are pickled, not JSON.
+    assert analyzers["dbias"](["one text"]) == [(20.0, "Non-biased")]
+    assert fake_backend.calls["political"][-1] == ["one text", "another"]
+
+
+def test_analyzer_errors_reach_the_caller(socket_path, fake_backend):
+    def broken(texts):
+        raise ValueError("tokenizer missing")
+
+    fake_backend.analyzers["tone"] = broken
+    start_server(socket_path)
+    with pytest.raises(InferenceError, match="ValueError: tokenizer missing"):
+        InferenceClient(socket_path).call("tone", ["text"])
+
+
+def test_each_thread_uses_its_own_connection(socket_path, fake_backend):
+    start_server(socket_path)
+    client = InferenceClient(socket_path)
+    results, errors = [], []
+
+    def work():
+        try:
+            for _ in range(20):
+                results.append(client.call("fake_news", ["text"]))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+    assert errors == []
+    assert results == [[12.5]] * 80
+
+
+# ------------------------------------------------------------
+# Permissions and authentication
+# ------------------------------------------------------------
+def test_the_socket_and_key_are_private(socket_path):
+    start_server(socket_path)
+    directory = os.path.dirname(socket_path)
+    assert stat.S_IMODE(os.stat(directory).st_mode) == 0o700
+    assert stat.S_IMODE(os.stat(authkey_path(socket_path)).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+    with open(authkey_path(socket_path), "rb") as f:
+        assert len(f.read()) == 64
+
+
+def test_a_directory_others_can_enter_is_refused(socket_path):
+    os.makedirs(os.path.dirname(socket_path), mode=0o755)
+    os.chmod(os.path.dirname(socket_path), 0o755)
+    with pytest.raises(PermissionError):
+        serve(socket_path)
+
+
+def test_a_wrong_key_is_rejected_and_the_server_keeps_serving(socket_path, fake_backend):
+    start_server(socket_path)
+    with pytest.raises(InferenceError):
+        InferenceClient(socket_path, authkey=b"not the key").versions()
+    assert InferenceClient(socket_path).versions() == fake_backend.versions
+
+
+def test_a_missing_key_file_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(inference_server, "INFERENCE_AUTHKEY", b"")
+    with pytest.raises(InferenceError, match="No inference authkey"):
+        inference_server.read_authkey(str(tmp_path / "inference.sock"))
+
+
+# ------------------------------------------------------------
+# Reconnecting
+# ------------------------------------------------------------
+def test_a_broken_connection_is_replaced_once(socket_path, fake_backend):
+    start_server(socket_path)
+    client = InferenceClient(socket_path)
+    assert client.versions() == fake_backend.versions
+    client._local.conn = BrokenConnection()
+    assert client.call("fake_news", ["text"]) == [12.5]
+
+
+SERVER_SCRIPT = """
+import sys
+import inference_server
+inference_server.load_local_analyzers = lambda: ({"fake_news": lambda texts: [12.5] * len(texts)}, {"fake_news": "v1"})
+inference_server.serve(sys.argv[1])
+"""
+
+
+def spawn_server(path):
+    """serve() in a separate process, as in production; returns the process."""
+    previous = os.stat(path).st_ino if os.path.exists(path) else None
+    env = dict(os.environ, CLEARIFY_INFERENCE_AUTHKEY="", PYTHONPATH=REPO_ROOT)
+    process = subprocess.Popen([sys.executable, "-c", SERVER_SCRIPT, path], env=env)
+    give_up_at = time.monotonic() + 20
+    while time.monotonic() < give_up_at:
+        if os.path.exists(path) and os.stat(path).st_ino != previous:
+            return process
+        time.sleep(0.05)
+    process.kill()
+    raise TimeoutError("inference server did not start")
+
+
+def test_a_restarted_server_is_reached_with_its_new_key(socket_path):
+    first = spawn_server(socket_path)
+    try:
+        client = InferenceClient(socket_path)
+        assert client.call("fake_news", ["text"]) == [12.5]
+        with open(authkey_path(socket_path), "rb") as f:
+            old_key = f.read()
+    finally:
+        first.kill()
+        first.wait()
+
+    second = spawn_server(socket_path)
+    try:
+        with open(authkey_path(socket_path), "rb") as f:
+            assert f.read() != old_key
+        # The first call fails on the dead connection and is retried once.
+        assert client.call("fake_news", ["text"]) == [12.5]
+    finally:
+        second.kill()
+        second.wait()
+
+
+def test_only_one_retry_is_made(socket_path, monkeypatch):
+    attempts = []
+
+    def refuse(*args, **kwargs):
+        attempts.append(args)
+        raise ConnectionRefusedError("connection refused")
+
+    monkeypatch.setattr(inference_server, "Client", refuse)
+    with pytest.raises(InferenceError, match="unavailable"):
+        InferenceClient(socket_path, authkey=b"key").versions()
+    assert len(attempts) == 2
+
+
+# ------------------------------------------------------------
+# Choosing the backend
+# ------------------------------------------------------------
+def test_the_web_app_uses_the_server_when_it_answers(socket_path, monkeypatch, fake_backend):
+    start_server(socket_path)
+    monkeypatch.setattr(inference_server, "INFERENCE_SOCKET", socket_path)
+    analyzers, versions = load_analysis_backend()
+    assert versions == fake_backend.versions
+    assert analyzers["social"](["text"]) == [fake_backend.RESULTS["social"]]
+    # Remote analyzers, not the in-process ones.
+    assert analyzers["social"] is not fake_backend.analyzers["social"]
+
+
+def test_a_missing_socket_falls_back_to_in_process_models(socket_path, monkeypatch, fake_backend):
+    monkeypatch.setattr(inference_server, "INFERENCE_SOCKET", socket_path)
+    monkeypatch.setattr(inference_server, "INFERENCE_AUTHKEY", b"key")
+    monkeypatch.setattr(inference_server, "CONNECT_TIMEOUT_SECONDS", 0)
+    monkeypatch.setattr(inference_server, "INFERENCE_FALLBACK", True)
+    analyzers, versions = load_analysis_backend()
+    assert analyzers is fake_backend.analyzers
+    assert versions is fake_backend.versions
+
+
+def test_without_the_fallback_a_missing_socket_is_an_error(socket_path, monkeypatch):
+    monkeypatch.setattr(inference_server, "INFERENCE_SOCKET", socket_path)
+    monkeypatch.setattr(inference_server, "INFERENCE_AUTHKEY", b"key")
+    monkeypatch.setattr(inference_server, "CONNECT_TIMEOUT_SECONDS", 0)
+    monkeypatch.setattr(inference_server, "INFERENCE_FALLBACK", False)
+    with pytest.raises(InferenceError):
+        load_analysis_backend()
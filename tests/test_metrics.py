@@ -0,0 +1,57 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# metrics.py reads its settings at import, so each case runs in a fresh interpreter.
+FORKED_WORKER = """
+import os
+import metrics
+
+pid = os.fork()
+if pid == 0:
+    metrics.CACHE_LOOKUPS.labels(stage="tone", result="hit").inc(3)
+    os._exit(0)
+os.waitpid(pid, 0)
+metrics.CACHE_LOOKUPS.labels(stage="tone", result="hit").inc(2)
+print(metrics.render_metrics())
+"""
+
+
+def run_python(code, **env):
+    # prometheus_client switches to multiprocess mode whenever the variable
+    # exists, even empty, so it is only passed on when a test sets it.
+    environ = {key: value for key, value in os.environ.items() if key != "PROMETHEUS_MULTIPROC_DIR"}
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO, env=dict(environ, **env),
+        capture_output=True, text=True, timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def test_disabled_metrics_are_no_ops():
+    out = run_python(
+        "import sys, metrics\n"
+        "metrics.STAGE_SECONDS.labels(stage='tone').observe(1)\n"
+        "with metrics.STAGE_SECONDS.labels(stage='tone').time(): pass\n"
+        "print('prometheus_client' in sys.modules)",
+        CLEARIFY_METRICS="0",
+    )
+    assert out.strip() == "False"
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_multiprocess_mode_aggregates_workers(tmp_path):
+    pytest.importorskip("prometheus_client")
+    out = run_python(FORKED_WORKER, CLEARIFY_METRICS="1", PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    assert 'clearify_cache_lookups_total{result="hit",stage="tone"} 5.0' in out
+
+
+def test_without_a_multiprocess_dir_only_this_process_is_seen():
+    pytest.importorskip("prometheus_client")
+    out = run_python(FORKED_WORKER, CLEARIFY_METRICS="1")
+    assert 'clearify_cache_lookups_total{result="hit",stage="tone"} 2.0' in out
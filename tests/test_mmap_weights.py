@@ -0,0 +1,53 @@
+import pytest
+
+import mmap_weights
+from mmap_weights import PICKLE_NAME, SAFETENSORS_NAME, ensure_safetensors
+
+
+@pytest.fixture
+def conversions(tmp_path, monkeypatch):
+    """Records conversions instead of running torch; returns the list of them."""
+    monkeypatch.setattr(mmap_weights, "SAFETENSORS_DIR", str(tmp_path / "converted"))
+    converted = []
+
+    def convert(bin_path, out_path):
+        converted.append(out_path)
+        with open(bin_path, "rb") as src, open(out_path, "wb") as dst:
+            dst.write(src.read())
+
+    (tmp_path / "converted").mkdir()
+    monkeypatch.setattr(mmap_weights, "convert_to_safetensors", convert)
+    return converted
+
+
+def checkpoint(path, weights):
+    path.mkdir(exist_ok=True)
+    (path / "config.json").write_text('{"labels": 2}')
+    (path / PICKLE_NAME).write_bytes(weights)
+    return str(path)
+
+
+def test_a_shipped_safetensors_file_is_used_in_place(tmp_path, conversions):
+    model = tmp_path / "model"
+    model.mkdir()
+    (model / SAFETENSORS_NAME).write_bytes(b"weights")
+    assert ensure_safetensors(str(model)) == str(model / SAFETENSORS_NAME)
+    assert conversions == []
+
+
+def test_a_checkpoint_is_converted_once(tmp_path, conversions):
+    model = checkpoint(tmp_path / "model", b"0" * 10)
+    first = ensure_safetensors(model)
+    assert ensure_safetensors(model) == first
+    assert conversions == [first]
+
+
+def test_a_same_size_retrain_is_converted_again(tmp_path, conversions):
+    model = checkpoint(tmp_path / "model", b"0" * 10)
+    stale = ensure_safetensors(model)
+    checkpoint(tmp_path / "model", b"1" * 10)
+    fresh = ensure_safetensors(model)
+    assert fresh != stale
+    assert conversions == [stale, fresh]
+    with open(fresh, "rb") as f:
+        assert f.read() == b"1" * 10
@@ -0,0 +1,111 @@
+import json
+import os
+
+import pytest
+
+from model_store import MANIFEST_NAME, LocalBucket, sync_directory
+
+
+@pytest.fixture
+def bucket_root(tmp_path):
+    root = tmp_path / "bucket"
+    model = root / "political_model"
+    (model / "tokenizer").mkdir(parents=True)
+    (model / "config.json").write_text('{"labels": 3}')
+    (model / "model.safetensors").write_bytes(b"weights" * 100)
+    (model / "tokenizer" / "vocab.txt").write_text("a\nb\n")
+    return root
+
+
+class FailingBucket(LocalBucket):
+    """LocalBucket whose blobs named in `fail` break while downloading."""
+
+    def __init__(self, root, fail=(), corrupt=()):
+        super().__init__(root)
+        self.fail, self.corrupt = set(fail), set(corrupt)
+
+    def list_blobs(self, prefix=""):
+        for blob in super().list_blobs(prefix):
+            name = blob.name.split("/", 1)[1]
+            if name in self.fail:
+                blob.download_to_filename = _raise
+            elif name in self.corrupt:
+                blob.download_to_filename = _write_garbage
+            yield blob
+
+
+def _raise(filename):
+    raise ConnectionError("connection reset")
+
+
+def _write_garbage(filename):
+    with open(filename, "wb") as f:
+        f.write(b"garbage")
+
+
+def manifest(local):
+    with open(os.path.join(local, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def sync(bucket, local):
+    return sync_directory(bucket, "political_model", str(local), workers=2)
+
+
+def test_a_second_sync_downloads_nothing(bucket_root, tmp_path):
+    local = tmp_path / "local"
+    assert sync(LocalBucket(str(bucket_root)), local) == {"downloaded": 3, "skipped": 0, "deleted": 0}
+    assert (local / "tokenizer" / "vocab.txt").read_text() == "a\nb\n"
+    assert sorted(manifest(local)) == ["config.json", "model.safetensors", "tokenizer/vocab.txt"]
+    assert sync(LocalBucket(str(bucket_root)), local) == {"downloaded": 0, "skipped": 3, "deleted": 0}
+
+
+def test_only_changed_files_are_downloaded_again(bucket_root, tmp_path):
+    local = tmp_path / "local"
+    sync(LocalBucket(str(bucket_root)), local)
+    (bucket_root / "political_model" / "config.json").write_text('{"labels": 5}')
+    assert sync(LocalBucket(str(bucket_root)), local) == {"downloaded": 1, "skipped": 2, "deleted": 0}
+    assert (local / "config.json").read_text() == '{"labels": 5}'
+
+
+def test_a_locally_damaged_file_is_downloaded_again(bucket_root, tmp_path):
+    local = tmp_path / "local"
+    sync(LocalBucket(str(bucket_root)), local)
+    (local / "model.safetensors").write_bytes(b"truncated")
+    assert sync(LocalBucket(str(bucket_root)), local)["downloaded"] == 1
+    assert (local / "model.safetensors").read_bytes() == b"weights" * 100
+
+
+def test_files_gone_from_the_bucket_are_deleted(bucket_root, tmp_path):
+    local = tmp_path / "local"
+    sync(LocalBucket(str(bucket_root)), local)
+    (bucket_root / "political_model" / "tokenizer" / "vocab.txt").unlink()
+    assert sync(LocalBucket(str(bucket_root)), local) == {"downloaded": 0, "skipped": 2, "deleted": 1}
+    assert not (local / "tokenizer").exists()
+    assert sorted(manifest(local)) == ["config.json", "model.safetensors"]
+
+
+def test_an_empty_listing_deletes_nothing(bucket_root, tmp_path):
+    local = tmp_path / "local"
+    sync(LocalBucket(str(bucket_root)), local)
+    empty = tmp_path / "empty"
+    (empty / "political_model").mkdir(parents=True)
+    assert sync(LocalBucket(str(empty)), local)["deleted"] == 0
+    assert (local / "model.safetensors").exists()
+
+
+def test_an_interrupted_sync_resumes_with_the_missing_files(bucket_root, tmp_path):
+    local = tmp_path / "local"
+    with pytest.raises(IOError, match="1 of 3 downloads failed"):
+        sync(FailingBucket(str(bucket_root), fail={"model.safetensors"}), local)
+    assert sorted(manifest(local)) == ["config.json", "tokenizer/vocab.txt"]
+    assert sync(LocalBucket(str(bucket_root)), local) == {"downloaded": 1, "skipped": 2, "deleted": 0}
+
+
+def test_a_corrupt_download_is_not_kept(bucket_root, tmp_path):
+    local = tmp_path / "local"
+    with pytest.raises(IOError, match="Checksum mismatch"):
+        sync(FailingBucket(str(bucket_root), corrupt={"config.json"}), local)
+    assert not (local / "config.json").exists()
+    assert not (local / "config.json.part").exists()
+    assert "config.json" not in manifest(local)
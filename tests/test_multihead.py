@@ -0,0 +1,144 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+pytest.importorskip("safetensors")
+
+import ml_analysis
+from distill_multihead import distill, distillation_loss
+from multihead import HEADS, META_FILE, MultiHeadClassifier, has_multihead, load_multihead, save_multihead
+
+WORDS = ["the", "council", "voted", "on", "a", "new", "budget", "for", "buses", "and", "fares", "."]
+
+# What each teacher's label IDs mean to ml_analysis's result functions.
+TEACHER_LABELS = {
+    "political": [ml_analysis.political_label_map[i] for i in range(3)],
+    "sbic": [ml_analysis.sbic_label_map[i] for i in range(8)],
+    "fake_news": ["real", "fake"],
+    "dbias": [ml_analysis.DBIAS_LABEL_MAP[i] for i in range(2)],
+}
+
+
+@pytest.fixture
+def base_dir(tmp_path):
+    """A one-layer BERT encoder and its tokenizer, saved like a teacher."""
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    directory = tmp_path / "base"
+    directory.mkdir()
+    vocab_file = directory / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS) + "\n")
+    tokenizer = BertTokenizerFast(vocab_file=str(vocab_file), do_lower_case=True, model_max_length=64)
+    config = BertConfig(vocab_size=len(WORDS) + 5, hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+                        intermediate_size=32, max_position_embeddings=64)
+    torch.manual_seed(0)
+    BertModel(config).save_pretrained(directory)
+    tokenizer.save_pretrained(directory)
+    return str(directory)
+
+
+def tiny_model(base_dir):
+    from transformers import AutoModel, AutoTokenizer
+
+    sizes = {name: len(labels) for name, labels in TEACHER_LABELS.items()}
+    model = MultiHeadClassifier(AutoModel.from_pretrained(base_dir), sizes)
+    model.eval()
+    return AutoTokenizer.from_pretrained(base_dir), model
+
+
+def probabilities(tokenizer, model, texts):
+    inputs = tokenizer(texts, padding=True, return_tensors="pt")
+    with torch.no_grad():
+        logits = model(**inputs)
+    return {name: torch.softmax(value, dim=-1).numpy() for name, value in logits.items()}
+
+
+# ------------------------------------------------------------
+# Artifact round trip
+# ------------------------------------------------------------
+def test_a_saved_model_loads_with_the_same_outputs(base_dir, tmp_path):
+    tokenizer, model = tiny_model(base_dir)
+    out_dir = str(tmp_path / "multihead")
+    save_multihead(model, tokenizer, out_dir, {"base": "political", "epochs": 1})
+
+    assert has_multihead(out_dir)
+    assert not os.path.exists(out_dir + ".tmp")
+    with open(os.path.join(out_dir, META_FILE)) as f:
+        meta = json.load(f)
+    assert meta["heads"] == {name: len(labels) for name, labels in TEACHER_LABELS.items()}
+    assert meta["base"] == "political"
+
+    loaded_tokenizer, loaded = load_multihead(out_dir)
+    assert not loaded.training
+    texts = ["The council voted on a new budget.", "Fares for buses."]
+    before, after = probabilities(tokenizer, model, texts), probabilities(loaded_tokenizer, loaded, texts)
+    for name in HEADS:
+        assert after[name].shape == (2, len(TEACHER_LABELS[name]))
+        np.testing.assert_allclose(after[name], before[name], atol=1e-6)
+
+
+def test_heads_keep_their_teachers_label_order(base_dir, tmp_path):
+    tokenizer, model = tiny_model(base_dir)
+    # Each head always answers one label, picked from the teacher's map.
+    expected = {"political": "right", "sbic": "gender", "fake_news": "fake", "dbias": "bias"}
+    with torch.no_grad():
+        for name, label in expected.items():
+            last = model.heads[name][-1]
+            last.weight.zero_()
+            last.bias.fill_(-5.0)
+            last.bias[TEACHER_LABELS[name].index(label)] = 5.0
+
+    out_dir = str(tmp_path / "multihead")
+    save_multihead(model, tokenizer, out_dir)
+    probs = probabilities(*load_multihead(out_dir), ["The council voted."])
+
+    assert ml_analysis._political_result(probs["political"][0])["prediction"] == "right"
+    assert ml_analysis._social_result(probs["sbic"][0])["bias_category"] == "gender"
+    assert ml_analysis._fake_news_result(probs["fake_news"][0]) > 50
+    assert ml_analysis._dbias_result(probs["dbias"][0])[1] == "bias"
+
+
+def test_an_artifact_missing_a_head_is_refused(base_dir, tmp_path):
+    tokenizer, model = tiny_model(base_dir)
+    out_dir = str(tmp_path / "multihead")
+    save_multihead(model, tokenizer, out_dir)
+    meta_path = os.path.join(out_dir, META_FILE)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    del meta["heads"]["dbias"]
+    with open(meta_path, "w") as f:
+        json.dump(meta, f)
+    with pytest.raises(ValueError, match="no head for dbias"):
+        load_multihead(out_dir)
+
+
+# ------------------------------------------------------------
+# Distillation
+# ------------------------------------------------------------
+def test_the_loss_is_zero_when_the_student_matches_the_teacher():
+    teacher = torch.tensor([[0.7, 0.2, 0.1], [0.1, 0.1, 0.8]])
+    for temperature in (1.0, 2.0):
+        assert float(distillation_loss(torch.log(teacher), teacher, temperature)) == pytest.approx(0.0, abs=1e-6)
+    assert float(distillation_loss(torch.zeros(2, 3), teacher, 2.0)) > 0
+
+
+def test_distillation_gives_one_head_per_teacher(base_dir, tmp_path):
+    texts = ["The council voted on a new budget.", "Fares for buses.", "A new budget.", "The buses."]
+    rng = np.random.default_rng(0)
+    targets = {
+        name: rng.dirichlet(np.ones(len(labels)), size=len(texts)).astype(np.float32)
+        for name, labels in TEACHER_LABELS.items()
+    }
+    tokenizer, model = distill(base_dir, texts, targets, epochs=1, batch_size=2, max_length=32)
+    assert not model.training
+    assert model.head_sizes == {name: len(labels) for name, labels in TEACHER_LABELS.items()}
+
+    out_dir = str(tmp_path / "multihead")
+    save_multihead(model, tokenizer, out_dir)
+    probs = probabilities(*load_multihead(out_dir), texts)
+    for name in HEADS:
+        np.testing.assert_allclose(probs[name].sum(axis=1), 1.0, rtol=1e-5)
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from document import Document
+from near_duplicate import (NearDuplicateIndex, decode_signature, encode_signature, fingerprint,
+                            similarity, SHINGLE_WORDS)
+
+_rng = random.Random(7)
+_VOCAB = [f"word{i}" for i in range(2000)]
+
+
+def random_words(count):
+    return [_rng.choice(_VOCAB) for _ in range(count)]
+
+
+ARTICLE = random_words(300)
+# The same story with a wire header and a newsletter footer around it.
+SYNDICATED = ["breaking", "news", "from", "the", "wire"] + ARTICLE + ["subscribe", "now", "for", "more", "stories"]
+# The first half kept, the second rewritten.
+REWRITTEN = ARTICLE[:150] + random_words(150)
+UNRELATED = random_words(300)
+
+
+def text(words):
+    return Document(" ".join(words))
+
+
+def exact_jaccard(a, b):
+    def shingles(words):
+        return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+    a, b = shingles(a), shingles(b)
+    return len(a & b) / len(a | b)
+
+
+def index(**kwargs):
+    return NearDuplicateIndex(persistent=False, **kwargs)
+
+
+@pytest.mark.parametrize("other", [SYNDICATED, REWRITTEN, UNRELATED], ids=["syndicated", "rewritten", "unrelated"])
+def test_minhash_estimates_the_shingle_jaccard(other):
+    estimate = similarity(fingerprint(text(ARTICLE)), fingerprint(text(other)))
+    assert estimate == pytest.approx(exact_jaccard(ARTICLE, other), abs=0.1)
+
+
+def test_a_syndicated_copy_matches_above_the_threshold():
+    duplicates = index(threshold=0.8)
+    duplicates.add("original", text(ARTICLE))
+    match = duplicates.lookup(text(SYNDICATED))
+    assert match is not None
+    assert match.doc_id == "original"
+    assert match.similarity >= 0.8
+
+
+def test_partial_overlap_stays_below_the_threshold():
+    duplicates = index(threshold=0.8)
+    duplicates.add("original", text(ARTICLE))
+    assert duplicates.lookup(text(REWRITTEN)) is None
+    assert duplicates.lookup(text(UNRELATED)) is None
+
+
+def test_a_stricter_threshold_rejects_the_syndicated_copy():
+    duplicates = index(threshold=0.99)
+    duplicates.add("original", text(ARTICLE))
+    assert duplicates.lookup(text(SYNDICATED)) is None
+
+
+def test_short_texts_are_not_fingerprinted():
+    duplicates = index()
+    short = text(ARTICLE[:20])
+    assert fingerprint(short) is None
+    duplicates.add("short", short)
+    assert len(duplicates) == 0
+    assert duplicates.lookup(short) is None
+
+
+def test_the_oldest_entry_is_evicted():
+    duplicates = index(max_entries=1)
+    duplicates.add("original", text(ARTICLE))
+    duplicates.add("unrelated", text(UNRELATED))
+    assert len(duplicates) == 1
+    assert duplicates.lookup(text(SYNDICATED)) is None
+
+
+def test_signatures_survive_encoding():
+    signature = fingerprint(text(ARTICLE))
+    assert (decode_signature(encode_signature(signature)) == signature).all()
+
+
+def test_signatures_of_another_version_are_rejected():
+    encoded = encode_signature(fingerprint(text(ARTICLE)))
+    with pytest.raises(ValueError):
+        decode_signature(encoded.split(":", 1)[1])
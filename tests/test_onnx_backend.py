@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import onnx_backend
+from onnx_backend import ensure_onnx_artifact
+
+
+@pytest.fixture
+def steps(tmp_path, monkeypatch):
+    """Records exports and quantizations instead of running them."""
+    monkeypatch.setattr(onnx_backend, "ONNX_CACHE_DIR", str(tmp_path / "onnx"))
+    calls = []
+
+    def export(model_path, out_path):
+        calls.append(("export", out_path))
+        write(out_path, read(os.path.join(model_path, "model.safetensors")))
+
+    def quantize(in_path, out_path):
+        calls.append(("quantize", out_path))
+        write(out_path, read(in_path))
+
+    monkeypatch.setattr(onnx_backend, "export_onnx", export)
+    monkeypatch.setattr(onnx_backend, "quantize_onnx", quantize)
+    return calls
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def checkpoint(path, weights):
+    path.mkdir(exist_ok=True)
+    (path / "config.json").write_text('{"labels": 2}')
+    (path / "model.safetensors").write_bytes(weights)
+    return str(path)
+
+
+def test_artifacts_are_built_once(tmp_path, steps):
+    model = checkpoint(tmp_path / "political", b"0" * 10)
+    int8 = ensure_onnx_artifact("political", model, "onnx-int8")
+    assert ensure_onnx_artifact("political", model, "onnx-int8") == int8
+    assert [step for step, _ in steps] == ["export", "quantize"]
+
+
+def test_a_same_size_retrain_is_exported_again(tmp_path, steps):
+    model = checkpoint(tmp_path / "political", b"0" * 10)
+    stale = ensure_onnx_artifact("political", model, "onnx-int8")
+    checkpoint(tmp_path / "political", b"1" * 10)
+    fresh = ensure_onnx_artifact("political", model, "onnx-int8")
+    assert fresh != stale
+    assert [step for step, _ in steps] == ["export", "quantize", "export", "quantize"]
+    assert read(fresh) == b"1" * 10
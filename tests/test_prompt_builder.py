@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+import prompt_builder
+from prompt_builder import (build_summary_prompt, compact_json, estimate_tokens, regex_sentences,
+                            select_sentences, split_sentences, use_sentence_splitter)
+
+ANALYSIS = {
+    "political_bias": {"prediction": "left", "confidence": 0.87654321},
+    "dbias": {"score": 73.456789, "label": "Biased"},
+    "weighted_votes": {"left": 0.5, "center": 0.3333333, "right": 0.1666667},
+    "final_verdict": "left",
+}
+
+
+def article(count, topic=None, at=None):
+    sentences = [f"Reporters in city {i} described the local weather and traffic today." for i in range(count)]
+    if topic is not None:
+        sentences[at] = f"Reporters in city {at} described the local {topic} and traffic today."
+    return " ".join(sentences)
+
+
+@pytest.fixture(autouse=True)
+def no_spacy_splitter():
+    yield
+    use_sentence_splitter(None)
+
+
+def test_analysis_json_is_minified_and_rounded():
+    data = compact_json(dict(ANALYSIS, sentiment=("Positive", 61.23456), place="Zürich"))
+    assert " " not in data.replace("Zürich", "")
+    assert json.loads(data)["dbias"]["score"] == 73.457
+    assert json.loads(data)["sentiment"] == ["Positive", 61.235]
+    assert "Zürich" in data
+
+
+def test_a_short_article_is_sent_whole():
+    text = article(3)
+    prompt, stats = build_summary_prompt(text, ANALYSIS, token_budget=1200, sentence_splitter=regex_sentences)
+    assert text in prompt
+    assert stats["sentences_total"] is None
+    assert stats["prompt_tokens"] <= 1200
+
+
+def test_a_long_article_is_cut_to_the_budget_in_text_order():
+    text = article(200)
+    prompt, stats = build_summary_prompt(text, ANALYSIS, token_budget=600, sentence_splitter=regex_sentences)
+    assert stats["prompt_tokens"] <= 600 < stats["original_tokens"]
+    assert stats["sentences_total"] == 200
+    assert 0 < stats["sentences_kept"] < 200
+    assert "(most salient sentences, in order)" in prompt
+    kept = prompt.split("Article (most salient sentences, in order):\n", 1)[1].split("\n\n", 1)[0].split("\n")
+    cities = [int(sentence.split()[3]) for sentence in kept]
+    assert cities == sorted(cities)
+    # The lead sentence always makes it.
+    assert cities[0] == 0
+
+
+def test_signal_words_pull_their_sentence_in():
+    text = article(200, topic="immigration", at=150)
+    without, _ = build_summary_prompt(text, ANALYSIS, token_budget=600, sentence_splitter=regex_sentences)
+    with_signal, _ = build_summary_prompt(text, ANALYSIS, token_budget=600, signal_words=["immigration"],
+                                          sentence_splitter=regex_sentences)
+    assert "immigration" not in without
+    assert "immigration" in with_signal
+
+
+def test_a_run_on_sentence_is_truncated():
+    long_sentence = "word " * 2000 + "end."
+    kept = select_sentences([(long_sentence, 0)], [1.0], token_budget=1000)
+    assert len(kept) == 1
+    assert kept[0].endswith(" …")
+    assert estimate_tokens(kept[0]) <= prompt_builder.MAX_SENTENCE_TOKENS + 1
+
+
+def test_regex_sentences_count_capitalised_words_as_entities():
+    assert regex_sentences("Angela Merkel met Emmanuel Macron in Paris. it rained!\nThe end") == [
+        ("Angela Merkel met Emmanuel Macron in Paris.", 4),
+        ("it rained!", 0),
+        ("The end", 0),
+    ]
+
+
+def test_the_registered_splitter_replaces_spacy():
+    use_sentence_splitter(lambda text: [("remote", 1)])
+    assert split_sentences("Any text.") == [("remote", 1)]
+
+
+def test_a_failing_splitter_falls_back_to_the_regex():
+    def unavailable(text):
+        raise ConnectionError("inference server down")
+
+    use_sentence_splitter(unavailable)
+    assert split_sentences("One. Two.") == [("One.", 0), ("Two.", 0)]
@@ -0,0 +1,156 @@
+import pytest
+
+import result_cache
+from model_store import LocalBucket, sync_directory
+from result_cache import LRUCache, ResultCache, cache_key, fingerprint_directory, text_digest
+
+
+@pytest.fixture
+def table(monkeypatch):
+    """The analysis_cache table as a dict of key -> JSON payload."""
+    rows = {}
+    monkeypatch.setattr(result_cache, "load_cached_result", lambda key, ttl: rows.get(key))
+    monkeypatch.setattr(result_cache, "store_cached_result", lambda key, stage, payload: rows.__setitem__(key, payload))
+    return rows
+
+
+# ------------------------------------------------------------
+# Keys
+# ------------------------------------------------------------
+def test_whitespace_and_unicode_variants_share_a_digest():
+    assert text_digest("Breaking  news:\n the\tstory ") == text_digest("Breaking news: the story")
+    # NFKC folds the full-width letters and the non-breaking space.
+    assert text_digest("ＡBC News") == text_digest("ABC News")
+    assert text_digest("ABC News") != text_digest("ABC news")
+
+
+def test_keys_differ_by_stage_and_version():
+    digest = text_digest("text")
+    assert len({cache_key("tone", "v1", digest), cache_key("tone", "v2", digest), cache_key("spacy", "v1", digest)}) == 3
+
+
+def test_the_directory_fingerprint_follows_the_artifacts(tmp_path):
+    (tmp_path / "config.json").write_text('{"labels": 2}')
+    (tmp_path / "model.safetensors").write_bytes(b"0" * 10)
+    before = fingerprint_directory(str(tmp_path))
+    assert fingerprint_directory(str(tmp_path)) == before
+    (tmp_path / "config.json").write_text('{"labels": 3}')
+    assert fingerprint_directory(str(tmp_path)) != before
+    assert fingerprint_directory(str(tmp_path / "absent")) == "missing"
+
+
+def test_a_same_size_retrain_changes_the_fingerprint(tmp_path):
+    (tmp_path / "config.json").write_text('{"labels": 2}')
+    (tmp_path / "model.safetensors").write_bytes(b"0" * 10)
+    before = fingerprint_directory(str(tmp_path))
+    (tmp_path / "model.safetensors").write_bytes(b"1" * 10)
+    assert fingerprint_directory(str(tmp_path)) != before
+
+
+def test_synced_directories_are_fingerprinted_from_the_manifest(tmp_path):
+    bucket = tmp_path / "bucket" / "political_model"
+    bucket.mkdir(parents=True)
+    (bucket / "config.json").write_text('{"labels": 2}')
+    (bucket / "model.safetensors").write_bytes(b"0" * 10)
+    local = tmp_path / "local"
+    sync_directory(LocalBucket(str(tmp_path / "bucket")), "political_model", str(local))
+    # The manifest's MD5s give the same tag as hashing the files.
+    plain = tmp_path / "plain"
+    plain.mkdir()
+    (plain / "config.json").write_text('{"labels": 2}')
+    (plain / "model.safetensors").write_bytes(b"0" * 10)
+    assert fingerprint_directory(str(local)) == fingerprint_directory(str(plain))
+
+    before = fingerprint_directory(str(local))
+    (bucket / "model.safetensors").write_bytes(b"1" * 10)
+    sync_directory(LocalBucket(str(tmp_path / "bucket")), "political_model", str(local))
+    assert fingerprint_directory(str(local)) != before
+
+
+def test_a_retrained_model_misses_the_cache(tmp_path, table):
+    (tmp_path / "config.json").write_text('{"labels": 2}')
+    (tmp_path / "model.safetensors").write_bytes(b"0" * 10)
+    cache = ResultCache(LRUCache(), persistent=True)
+    cache.put("political", fingerprint_directory(str(tmp_path)), "d", "left")
+    assert cache.get("political", fingerprint_directory(str(tmp_path)), "d") == (True, "left")
+    (tmp_path / "model.safetensors").write_bytes(b"1" * 10)
+    assert cache.get("political", fingerprint_directory(str(tmp_path)), "d") == (False, None)
+
+
+# ------------------------------------------------------------
+# Memory tier
+# ------------------------------------------------------------
+def test_the_least_recently_used_entry_is_evicted():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == (True, 1)
+    cache.put("c", 3)
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, 1)
+    assert len(cache) == 2
+
+
+def test_expired_entries_miss():
+    cache = LRUCache(ttl_seconds=-1)
+    cache.put("a", 1)
+    assert cache.get("a") == (False, None)
+    assert len(cache) == 0
+
+
+# ------------------------------------------------------------
+# Two tiers
+# ------------------------------------------------------------
+def test_memory_hit_and_miss(table):
+    cache = ResultCache(LRUCache(), persistent=False)
+    assert cache.get("tone", "v1", "d") == (False, None)
+    cache.put("tone", "v1", "d", {"tone": "calm"})
+    assert cache.get("tone", "v1", "d") == (True, {"tone": "calm"})
+    assert cache.get("tone", "v2", "d") == (False, None)
+    assert table == {}
+
+
+def test_a_persistent_hit_fills_the_memory_tier(table):
+    ResultCache(LRUCache(), persistent=True).put("tone", "v1", "d", {"tone": "calm"})
+    assert len(table) == 1
+
+    memory = LRUCache()
+    cache = ResultCache(memory, persistent=True)
+    assert cache.get("tone", "v1", "d") == (True, {"tone": "calm"})
+    assert memory.get(cache_key("tone", "v1", "d")) == (True, {"tone": "calm"})
+    table.clear()
+    assert cache.get("tone", "v1", "d") == (True, {"tone": "calm"})
+
+
+def test_values_round_trip_through_json(table):
+    ResultCache(LRUCache(), persistent=True).put("dbias", "v1", "d", (87.5, "biased"))
+    # Tuples come back from Postgres as lists.
+    assert ResultCache(LRUCache(), persistent=True).get("dbias", "v1", "d") == (True, [87.5, "biased"])
+
+
+def test_get_or_compute_only_stores_cacheable_values(table):
+    cache = ResultCache(LRUCache(), persistent=True)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return (0, "error")
+
+    def cacheable(value):
+        return value[1] != "error"
+
+    assert cache.get_or_compute("dbias", "v1", "d", compute, cacheable) == ((0, "error"), "miss")
+    assert cache.get_or_compute("dbias", "v1", "d", compute, cacheable) == ((0, "error"), "miss")
+    assert len(calls) == 2
+    assert table == {}
+
+    assert cache.get_or_compute("tone", "v1", "d", lambda: "calm") == ("calm", "miss")
+    assert cache.get_or_compute("tone", "v1", "d", lambda: "other") == ("calm", "hit")
+
+
+def test_a_disabled_cache_never_hits(table, monkeypatch):
+    monkeypatch.setattr(result_cache, "CACHE_ENABLED", False)
+    cache = ResultCache(LRUCache(), persistent=True)
+    cache.put("tone", "v1", "d", "calm")
+    assert cache.get("tone", "v1", "d") == (False, None)
+    assert table == {}
@@ -0,0 +1,185 @@
+import re
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("spacy")
+pytest.importorskip("spacytextblob")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+# spacyanalyzer loads this model at import.
+pytest.importorskip("en_core_web_sm")
+
+import spacyanalyzer
+from document import Document
+
+_SENTENCE = re.compile(r"[^.!?\s][^.!?]*[.!?]*")
+
+
+class StubDoc:
+    """Sentences split on punctuation; no entities, neutral polarity."""
+
+    def __init__(self, text):
+        self.text = text
+        self.sents = [
+            SimpleNamespace(text=m.group(), start_char=m.start(), end_char=m.end(), ents=[])
+            for m in _SENTENCE.finditer(text)
+        ]
+        self.ents = []
+        self._ = SimpleNamespace(blob=SimpleNamespace(polarity=0.0))
+
+
+class CountingNlp:
+    """Stands in for the spaCy pipeline; records every text it parses."""
+
+    pipe_names = ["tok2vec", "parser", "ner", "spacytextblob"]
+
+    def __init__(self):
+        self.parsed = []
+
+    def __call__(self, text, disable=()):
+        self.parsed.append(str(text))
+        return StubDoc(str(text))
+
+    def pipe(self, texts, disable=(), batch_size=None, n_process=None):
+        for text in texts:
+            self.parsed.append(str(text))
+            yield StubDoc(str(text))
+
+
+class FakeEmotionPipeline:
+    """Anger when a sentence says "furious", joy otherwise."""
+
+    tokenizer = SimpleNamespace(model_max_length=512)
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts, batch_size=None, truncation=True, max_length=None):
+        self.calls.append(list(texts))
+        return [self.scores(text) for text in texts]
+
+    @staticmethod
+    def scores(text):
+        anger = 0.9 if "furious" in text.lower() else 0.1
+        return [{"label": "anger", "score": anger}, {"label": "joy", "score": 1 - anger}]
+
+
+@pytest.fixture
+def nlp(monkeypatch):
+    nlp = CountingNlp()
+    monkeypatch.setattr(spacyanalyzer, "nlp", nlp)
+    # Analyzers take a parsed Doc as is rather than parsing it again.
+    monkeypatch.setattr(spacyanalyzer, "Doc", StubDoc)
+    return nlp
+
+
+@pytest.fixture
+def emotion(monkeypatch, nlp):
+    pipe = FakeEmotionPipeline()
+    monkeypatch.setattr(spacyanalyzer, "_get_emotion_pipeline", lambda: pipe)
+    monkeypatch.setattr(spacyanalyzer, "CHUNKING_ENABLED", False)
+    monkeypatch.setattr(spacyanalyzer, "TONE_AGGREGATION", "length_weighted")
+    monkeypatch.setattr(spacyanalyzer, "TONE_MAX_SENTENCES", 32)
+    return pipe
+
+
+# ------------------------------------------------------------
+# Sentence tone
+# ------------------------------------------------------------
+def test_neutral_sentences_are_not_scored(emotion):
+    text = "The council met on Tuesday. Residents were furious about the fares. The vote is next week."
+    [result] = spacyanalyzer._sentence_tone_batch([text])
+    assert emotion.calls == [["Residents were furious about the fares."]]
+    assert result["sentences"] == 3
+    assert result["sentences_scored"] == 1
+    assert [step["sentence"] for step in result["trajectory"]] == [1]
+    assert result["primary_emotion"] == "anger"
+
+
+def test_at_most_tone_max_sentences_are_scored(emotion, monkeypatch):
+    monkeypatch.setattr(spacyanalyzer, "TONE_MAX_SENTENCES", 2)
+    sentences = ["We were happy.", "They were furious and outraged!", "It was sad.", "The rally was a joy."]
+    signals = [spacyanalyzer.emotion_signal(sentence) for sentence in sentences]
+    assert min(signals) > 0 and signals[1] == max(signals)
+
+    [result] = spacyanalyzer._sentence_tone_batch([" ".join(sentences)])
+    assert result["sentences"] == 4
+    assert result["sentences_scored"] == 2
+    assert sum(len(call) for call in emotion.calls) == 2
+    # The strongest signal is always kept; the picks stay in text order.
+    picked = [step["sentence"] for step in result["trajectory"]]
+    assert 1 in picked and picked == sorted(picked)
+
+
+def test_the_scored_sentences_are_aggregated_by_length(emotion):
+    angry, calm = "Residents were furious about the new fares.", "Some were happy."
+    [result] = spacyanalyzer._sentence_tone_batch([f"{angry} {calm}"])
+    anger = (0.9 * len(angry.split()) + 0.1 * len(calm.split())) / (len(angry.split()) + len(calm.split()))
+    assert result["emotion_scores"]["anger"] == round(anger, 4)
+    assert result["emotion_scores"]["joy"] == round(1 - anger, 4)
+    assert result["primary_emotion"] == "anger"
+    assert result["emotion_strength"] == round(anger, 4)
+    assert [step["primary_emotion"] for step in result["trajectory"]] == ["anger", "joy"]
+
+
+def test_a_text_without_emotional_sentences_is_scored_whole(emotion):
+    text = "The council met on Tuesday. The vote is next week."
+    [result] = spacyanalyzer._sentence_tone_batch([text])
+    assert emotion.calls == [[text]]
+    assert result["sentences_scored"] == 0
+    assert result["trajectory"] == []
+    assert result["primary_emotion"] == "joy"
+
+
+def test_sentences_of_every_text_share_one_call(emotion):
+    texts = ["Fans were furious about the referee.", "It was a sad day. Nothing else changed."]
+    results = spacyanalyzer._sentence_tone_batch(texts)
+    assert len(emotion.calls) == 1
+    # Shortest first, so each batch pads to a similar length.
+    assert emotion.calls[0] == ["It was a sad day.", "Fans were furious about the referee."]
+    assert [result["primary_emotion"] for result in results] == ["anger", "joy"]
+
+
+# ------------------------------------------------------------
+# One parse per Document
+# ------------------------------------------------------------
+def test_the_spacy_stage_tone_and_prompt_share_one_parse(emotion, nlp):
+    from prompt_builder import spacy_sentences
+
+    texts = [Document("Fans were furious about the referee. The match ended late."),
+             Document("It was a sad day. Nothing else changed.")]
+    spacyanalyzer.analyze_entities_and_sentiment_batch(texts)
+    spacyanalyzer._sentence_tone_batch(texts)
+    assert spacy_sentences(texts[0])[0] == ("Fans were furious about the referee.", 0)
+    assert nlp.parsed == [str(text) for text in texts]
+
+
+def test_concurrent_stages_wait_for_the_first_parse(emotion, nlp):
+    texts = [Document("Fans were furious about the referee."), Document("It was a sad day.")]
+    start = threading.Barrier(2)
+    errors = []
+
+    def run(stage):
+        try:
+            start.wait()
+            stage(texts)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(stage,)) for stage in
+               (spacyanalyzer.analyze_entities_and_sentiment_batch, spacyanalyzer._sentence_tone_batch)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert errors == []
+    assert sorted(nlp.parsed) == sorted(str(text) for text in texts)
+
+
+def test_plain_strings_are_parsed_per_call(nlp):
+    spacyanalyzer.analyze_entities_and_sentiment_batch(["Some text."])
+    spacyanalyzer.analyze_entities_and_sentiment_batch(["Some text."])
+    assert nlp.parsed == ["Some text.", "Some text."]
@@ -0,0 +1,53 @@
+import json
+
+from sse import sse_comment, sse_event
+
+
+def parse_stream(stream):
+    """(event, data) pairs the way an EventSource reads them; comments are skipped."""
+    messages = []
+    for block in stream.split("\n\n"):
+        event, data = "message", []
+        for line in block.split("\n"):
+            if not line or line.startswith(":"):
+                continue
+            field, _, value = line.partition(": ")
+            if field == "event":
+                event = value
+            elif field == "data":
+                data.append(value)
+        if data:
+            messages.append((event, json.loads("\n".join(data))))
+    return messages
+
+
+def test_a_message_is_one_event_line_and_one_data_line():
+    assert sse_event("tone", {"tone": "calm"}) == 'event: tone\ndata: {"tone": "calm"}\n\n'
+
+
+def test_newlines_in_the_payload_stay_inside_the_data_line():
+    message = sse_event("summary", {"overall_summary": "First line.\n\nSecond line."})
+    assert message.count("\n") == 3
+    assert parse_stream(message) == [("summary", {"overall_summary": "First line.\n\nSecond line."})]
+
+
+def test_a_stream_of_messages_and_keepalives_parses_back():
+    stream = "".join([
+        sse_event("start", {"words_analyzed": 3}),
+        sse_comment(),
+        sse_event("sentiment", ("Positive", 61.5)),
+        sse_event("entities", [["Paris", "GPE"]]),
+        sse_comment("still working"),
+        sse_event("result", {"bias_label": "neutral", "quote": "“fair”"}),
+    ])
+    assert parse_stream(stream) == [
+        ("start", {"words_analyzed": 3}),
+        ("sentiment", ["Positive", 61.5]),
+        ("entities", [["Paris", "GPE"]]),
+        ("result", {"bias_label": "neutral", "quote": "“fair”"}),
+    ]
+
+
+def test_a_keepalive_is_a_comment():
+    assert sse_comment() == ": keepalive\n\n"
+    assert parse_stream(sse_comment()) == []
@@ -0,0 +1,70 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import stages
+from deadline import Deadline
+
+
+@pytest.fixture
+def single_thread_pool(monkeypatch):
+    """A one-thread stage pool, so every stage after the first waits in the queue."""
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(stages, "_executor", executor)
+    monkeypatch.setattr(stages, "_executor_pid", os.getpid())
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def sleeper(seconds, value):
+    def run():
+        time.sleep(seconds)
+        return value
+    return run
+
+
+def test_time_spent_queued_does_not_count_against_the_timeout(single_thread_pool, monkeypatch):
+    monkeypatch.setattr(stages, "DEFAULT_STAGE_TIMEOUT", 0.3)
+    # Each stage takes 0.2s but the second only starts after the first, 0.4s in total.
+    results, errors = stages.run_stages({"a": sleeper(0.2, 1), "b": sleeper(0.2, 2)})
+    assert errors == {}
+    assert results == {"a": 1, "b": 2}
+
+
+def test_a_stage_over_its_timeout_is_reported(single_thread_pool, monkeypatch):
+    monkeypatch.setenv("CLEARIFY_STAGE_TIMEOUT_SLOW", "0.1")
+    started = time.monotonic()
+    results, errors = stages.run_stages({"slow": sleeper(0.5, "late")})
+    assert time.monotonic() - started < 0.4
+    assert results == {}
+    assert errors["slow"].startswith("timed out")
+
+
+def test_the_deadline_cuts_off_queued_and_running_stages(single_thread_pool):
+    started = time.monotonic()
+    results, errors = stages.run_stages(
+        {"running": sleeper(0.5, 1), "queued": sleeper(0.5, 2)}, deadline=Deadline(0.15)
+    )
+    assert time.monotonic() - started < 0.4
+    assert results == {}
+    assert set(errors) == {"running", "queued"}
+    assert all(error.startswith("request deadline reached") for error in errors.values())
+
+
+def test_results_arrive_in_completion_order(monkeypatch):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        monkeypatch.setattr(stages, "_executor", executor)
+        monkeypatch.setattr(stages, "_executor_pid", os.getpid())
+        order = [name for name, _, _ in stages.iter_stages({"slow": sleeper(0.2, 1), "fast": sleeper(0.01, 2)})]
+    assert order == ["fast", "slow"]
+
+
+def test_a_failing_stage_becomes_an_error(single_thread_pool):
+    def boom():
+        raise ValueError("broken model")
+
+    results, errors = stages.run_stages({"ok": lambda: "fine", "bad": boom})
+    assert results == {"ok": "fine"}
+    assert errors == {"bad": "broken model"}
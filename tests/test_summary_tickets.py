@@ -0,0 +1,60 @@
+import threading
+
+from summarizer import SummaryTickets
+
+GEMINI = {"overall_summary": "From Gemini."}
+FALLBACK = {"overall_summary": "Automated summary.", "source": "local"}
+
+
+def finished(tickets, ticket_id):
+    return tickets.wait(ticket_id, timeout=5)
+
+
+def test_a_pending_or_done_ticket_is_reused():
+    tickets = SummaryTickets(workers=1)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return GEMINI
+
+    tickets.submit(compute, ticket_id="t")
+    tickets.submit(compute, ticket_id="t")
+    release.set()
+    assert finished(tickets, "t")["gemini_summary"] == GEMINI
+    tickets.submit(compute, ticket_id="t")
+    assert finished(tickets, "t")["status"] == "done"
+    assert len(calls) == 1
+
+
+def test_a_fallback_summary_is_recomputed():
+    tickets = SummaryTickets(workers=1)
+    results = iter([FALLBACK, GEMINI])
+    tickets.submit(lambda: next(results), ticket_id="t")
+    assert finished(tickets, "t")["gemini_summary"] == FALLBACK
+    tickets.submit(lambda: next(results), ticket_id="t")
+    assert finished(tickets, "t")["gemini_summary"] == GEMINI
+
+
+def test_a_failed_job_is_retried():
+    tickets = SummaryTickets(workers=1)
+
+    def fail():
+        raise RuntimeError("quota")
+
+    tickets.submit(fail, ticket_id="t")
+    state = finished(tickets, "t")
+    assert state["status"] == "error"
+    assert state["error"] == "quota"
+    tickets.submit(lambda: GEMINI, ticket_id="t")
+    assert finished(tickets, "t")["status"] == "done"
+
+
+def test_expired_tickets_are_forgotten():
+    tickets = SummaryTickets(workers=1, ttl=0)
+    tickets.submit(lambda: GEMINI, ticket_id="old")
+    finished(tickets, "old")
+    tickets.submit(lambda: GEMINI, ticket_id="new")
+    assert tickets.get("old") is None
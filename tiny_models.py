@@ -0,0 +1,81 @@
+import os
+import re
+import itertools
+from collections import Counter
+
+from datasets_io import iter_fake_news, iter_sbic
+from model_store import MODELS
+
+# ============================================================
+# TINY RANDOM STAND-IN MODELS
+# ============================================================
+# Benchmarks and evaluations must run where the real artifacts are not
+# available (no GCS credentials, CI). These are 2-layer BERTs with random
+# weights and the real label sets, written in the bucket layout so
+# model_store can use them as a plain local model source. Scores are
+# meaningless; latency and plumbing are what they exercise.
+TINY_LABELS = {
+    "political": ["left", "center", "right"],
+    "sbic": ["none", "race", "gender", "social", "body", "culture", "disabled", "victim"],
+    "fake_news": ["real", "fake"],
+    "dbias": ["not bias", "bias"],
+    "emotion": ["anger", "joy", "optimism", "sadness"],
+}
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+
+
+def _build_vocab(size: int):
+    """Most frequent words of the bundled datasets plus single characters."""
+    counts = Counter()
+    texts = itertools.chain(
+        (text for text, _ in iter_fake_news(limit=200)),
+        (post for post, _ in iter_sbic(limit=2000)),
+    )
+    for text in texts:
+        counts.update(re.findall(r"\w+|[^\w\s]", text.lower()))
+    chars = sorted({c for word in counts for c in word})
+    words = [w for w, _ in counts.most_common(size) if w not in chars]
+    return SPECIAL_TOKENS + chars + ["##" + c for c in chars] + words
+
+
+def build_tiny_models(root: str, names=None, vocab_size: int = 3000, seed: int = 0) -> str:
+    """Writes tiny random models under `root` (skipping ones already there).
+
+    Returns `root`, usable as CLEARIFY_MODEL_SOURCE / model_store.use_source.
+    """
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    names = list(TINY_LABELS) if names is None else list(names)
+    vocab = None
+    for name in names:
+        out_dir = os.path.join(root, MODELS[name][0])
+        if os.path.isfile(os.path.join(out_dir, "config.json")):
+            continue
+        os.makedirs(out_dir, exist_ok=True)
+
+        if vocab is None:
+            vocab = _build_vocab(vocab_size)
+        vocab_file = os.path.join(out_dir, "vocab.txt")
+        with open(vocab_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(vocab) + "\n")
+        tokenizer = BertTokenizerFast(vocab_file=vocab_file, do_lower_case=True, model_max_length=512)
+
+        labels = TINY_LABELS[name]
+        config = BertConfig(
+            vocab_size=len(vocab),
+            hidden_size=32,
+            num_hidden_layers=2,
+            num_attention_heads=2,
+            intermediate_size=64,
+            max_position_embeddings=512,
+            num_labels=len(labels),
+            id2label=dict(enumerate(labels)),
+            label2id={label: i for i, label in enumerate(labels)},
+        )
+        torch.manual_seed(seed)
+        model = BertForSequenceClassification(config)
+        model.save_pretrained(out_dir)
+        tokenizer.save_pretrained(out_dir)
+    return root